@@ -0,0 +1,221 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import survey_engine as motor
+
+# Benchmarks sobre surveys sintéticos (sin interfaz gráfica).
+#
+#   python benchmark.py --puntos 100 1000 10000 50000 -o base.json
+#   python benchmark.py --puntos 100 1000 10000 50000 -o nuevo.json --comparar base.json
+#
+# Cada caso (puntos, BSSIDs, piso y escala del plano) se genera con la misma
+# semilla, así dos corridas miden exactamente los mismos datos. Se mide cada
+# etapa varias veces y se guarda mínimo, mediana y máximo en un JSON; con
+# --comparar se listan las etapas cuya mediana empeoró más que la tolerancia
+# (y más de DIFERENCIA_MINIMA en valor absoluto) y el script sale con código 1.
+
+VERSION_RESULTADOS = 1
+GRABACION_EJEMPLO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "escaneos_ejemplo.jsonl")
+RESOLUCION_HEATMAP = 200  # la misma que el heatmap interpolado de la aplicación
+RESOLUCION_FONDO = 1600
+APS_COBERTURA = 4
+DIFERENCIA_MINIMA = 0.01  # segundos; cambios más chicos son ruido de medición
+
+
+def _piso(texto):
+    try:
+        ancho, alto = (float(v) for v in texto.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"piso inválido: {texto} (se espera ANCHOxALTO en metros)")
+    return ancho, alto
+
+
+def medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return {"min": min(tiempos), "mediana": statistics.median(tiempos), "max": max(tiempos)}
+
+
+# --- Etapas ---
+# Cada una recibe el contexto del caso y devuelve la función a medir
+
+def etapa_ingesta(caso):
+    lote = caso["lote"]
+    return lambda: motor.AlmacenMediciones(capacidad=1024).agregar_lote(**lote)
+
+
+def etapa_escaneos(caso):
+    # Parseo de salidas crudas grabadas; no depende del tamaño del survey
+    return lambda: motor.medir_ingesta(GRABACION_EJEMPLO, repeticiones=20)
+
+
+def etapa_heatmap(caso):
+    # Lo mismo que "Ver Heatmap por SSID" interpolado sobre el plano, sin
+    # reutilizar la triangulación entre repeticiones
+    almacen = caso["almacen"]
+    ancho_m, alto_m = caso["piso"]
+    ssid = motor.ssid_mas_comun(almacen)
+
+    def heatmap():
+        x, y, valores = motor.datos_heatmap(almacen, ssid)
+        grid_x, grid_y = np.meshgrid(np.linspace(0, ancho_m, RESOLUCION_HEATMAP), np.linspace(0, alto_m, RESOLUCION_HEATMAP))
+        grid_z = motor.interpolar(x, y, valores, grid_x, grid_y, 'cubic', motor=motor.MotorInterpolacion())
+        motor.colorear(grid_z, motor.DBM_MIN, motor.DBM_MAX, fuera_de_rango_transparente=True)
+    return heatmap
+
+
+def etapa_cobertura(caso):
+    # "Ver cobertura estimada" a resolución de pantalla, con unos pocos APs
+    ancho_px, alto_px = caso["plano_px"]
+    escala = caso["escala"]
+    aps = [{"nombre": ap["BSSID"], "x_px": ap["x_m"] * escala, "y_px": ap["y_m"] * escala}
+           for ap in caso["aps"][:APS_COBERTURA]]
+    paso = max(1, max(ancho_px, alto_px) // RESOLUCION_FONDO)
+
+    def cobertura():
+        _, _, rssi = motor.cobertura_fspl(aps, ancho_px, alto_px, escala, paso=paso)
+        motor.colorear(rssi, motor.RSSI_PISO, motor.TX_POWER)
+    return cobertura
+
+
+def etapa_fondo(caso):
+    # Reducción del plano para el fondo de los gráficos
+    rgba = motor.plano_sintetico(*caso["plano_px"])
+    return lambda: motor.PlanoRaster(rgba).para_resolucion(RESOLUCION_FONDO)
+
+
+def etapa_exportar_json(caso):
+    return lambda: motor.guardar_mediciones(caso["almacen"], caso["ruta_json"])
+
+
+def etapa_cargar_json(caso):
+    if not os.path.exists(caso["ruta_json"]):
+        motor.guardar_mediciones(caso["almacen"], caso["ruta_json"])
+    return lambda: motor.cargar_survey(caso["ruta_json"])
+
+
+def etapa_pdf(caso):
+    return lambda: motor.construir_informe_resumido(caso["almacen"], caso["ruta_pdf"])
+
+
+ETAPAS = {
+    "ingesta": etapa_ingesta,
+    "escaneos": etapa_escaneos,
+    "heatmap": etapa_heatmap,
+    "cobertura": etapa_cobertura,
+    "fondo": etapa_fondo,
+    "exportar_json": etapa_exportar_json,
+    "cargar_json": etapa_cargar_json,
+    "pdf": etapa_pdf,
+}
+
+
+def clave_caso(caso):
+    return f"p{caso['puntos']}-b{caso['bssids']}-{caso['ancho_m']:g}x{caso['alto_m']:g}m-e{caso['escala']:g}"
+
+
+def correr_caso(puntos, bssids, piso, escala, semilla, etapas, repeticiones, carpeta):
+    lote, aps = motor.lote_sintetico(puntos, bssids, piso[0], piso[1], semilla)
+    almacen = motor.AlmacenMediciones(capacidad=max(puntos, 16))
+    almacen.agregar_lote(**lote)
+    contexto = {
+        "lote": lote, "aps": aps, "almacen": almacen, "piso": piso, "escala": escala,
+        "plano_px": (int(round(piso[0] * escala)), int(round(piso[1] * escala))),
+        "ruta_json": os.path.join(carpeta, f"survey_{puntos}_{bssids}.json"),
+        "ruta_pdf": os.path.join(carpeta, f"informe_{puntos}_{bssids}.pdf"),
+    }
+    resultado = {
+        "puntos": puntos, "bssids": bssids, "ancho_m": piso[0], "alto_m": piso[1], "escala": escala,
+        "semilla": semilla, "lecturas": almacen.n_lecturas, "etapas": {},
+    }
+    for nombre in etapas:
+        if nombre == "escaneos" and not os.path.exists(GRABACION_EJEMPLO):
+            continue
+        resultado["etapas"][nombre] = medir(ETAPAS[nombre](contexto), repeticiones)
+        print(f"  {nombre:14} {resultado['etapas'][nombre]['mediana']:9.3f} s")
+    return resultado
+
+
+def comparar(actual, anterior, tolerancia):
+    # Devuelve la cantidad de etapas que empeoraron más que la tolerancia
+    previos = {clave_caso(c): c for c in anterior["casos"]}
+    regresiones = 0
+    print(f"\n{'caso':36} {'etapa':14} {'antes':>9} {'ahora':>9} {'cambio':>8}")
+    for caso in actual["casos"]:
+        previo = previos.get(clave_caso(caso))
+        if previo is None:
+            continue
+        for nombre, tiempos in caso["etapas"].items():
+            if nombre not in previo["etapas"]:
+                continue
+            antes = previo["etapas"][nombre]["mediana"]
+            ahora = tiempos["mediana"]
+            cambio = ahora / antes - 1 if antes else 0.0
+            marca = ""
+            if cambio > tolerancia and ahora - antes > DIFERENCIA_MINIMA:
+                regresiones += 1
+                marca = "  <-- más lento"
+            print(f"{clave_caso(caso):36} {nombre:14} {antes:9.3f} {ahora:9.3f} {cambio:+8.1%}{marca}")
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mide ingesta, heatmaps, cobertura, JSON y PDF sobre surveys sintéticos.")
+    parser.add_argument("--puntos", type=int, nargs="+", default=[100, 1000, 10000], help="puntos por survey")
+    parser.add_argument("--bssids", type=int, nargs="+", default=[30], help="BSSIDs del piso")
+    parser.add_argument("--piso", type=_piso, default=(50.0, 30.0), help="ANCHOxALTO en metros (por defecto 50x30)")
+    parser.add_argument("--escala", type=float, nargs="+", default=[20.0], help="px/m del plano (resolución)")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--etapas", nargs="+", choices=list(ETAPAS), default=list(ETAPAS))
+    parser.add_argument("-r", "--repeticiones", type=int, default=3)
+    parser.add_argument("-o", "--salida", default="benchmark.json", help="JSON de resultados")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior")
+    parser.add_argument("--tolerancia", type=float, default=0.15, help="empeoramiento aceptado (0.15 = 15%%)")
+    args = parser.parse_args(argv)
+
+    resultados = {
+        "version": VERSION_RESULTADOS,
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "repeticiones": args.repeticiones,
+        "casos": [],
+    }
+    with tempfile.TemporaryDirectory(prefix="wifi_bench_") as carpeta:
+        for puntos in args.puntos:
+            for bssids in args.bssids:
+                for escala in args.escala:
+                    caso = {"puntos": puntos, "bssids": bssids, "ancho_m": args.piso[0], "alto_m": args.piso[1], "escala": escala}
+                    print(clave_caso(caso))
+                    resultados["casos"].append(correr_caso(
+                        puntos, bssids, args.piso, escala, args.semilla, args.etapas, args.repeticiones, carpeta
+                    ))
+
+    with open(args.salida, 'w', encoding='utf-8') as f:
+        json.dump(resultados, f, indent=2)
+    print(f"Resultados en {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as f:
+            anterior = json.load(f)
+        regresiones = comparar(resultados, anterior, args.tolerancia)
+        print(f"\n{regresiones} etapas más lentas que la tolerancia ({args.tolerancia:.0%}).")
+        return 1 if regresiones else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
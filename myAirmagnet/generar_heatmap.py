@@ -1,36 +1,260 @@
+import argparse
+import glob
+import hashlib
 import json
-import matplotlib.pyplot as plt
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 import numpy as np
-from scipy.interpolate import griddata
-
-# Cargar mediciones exportadas
-with open("mediciones.json", "r") as f:
-    datos = json.load(f)
-
-# Preparar coordenadas y señales promedio
-x, y, señal_prom = [], [], []
-
-for punto in datos:
-    señales = [r.get("Señal", 0) for r in punto["redes"] if "Señal" in r]
-    if señales:
-        x.append(punto["x_m"])
-        y.append(punto["y_m"])
-        señal_prom.append(sum(señales) / len(señales))
-
-# Interpolación para generar heatmap
-xi = np.linspace(min(x), max(x), 100)
-yi = np.linspace(min(y), max(y), 100)
-xi, yi = np.meshgrid(xi, yi)
-zi = griddata((x, y), señal_prom, (xi, yi), method='cubic')
-
-# Graficar
-plt.figure(figsize=(8, 6))
-plt.contourf(xi, yi, zi, levels=100, cmap="jet")
-plt.colorbar(label="Señal WiFi promedio (dBm)")
-plt.scatter(x, y, c="white", edgecolors="black", label="Mediciones")
-plt.title("Mapa de calor WiFi")
-plt.xlabel("X (m)")
-plt.ylabel("Y (m)")
-plt.legend()
-plt.tight_layout()
-plt.show()
+from matplotlib.figure import Figure
+
+import survey_engine as motor
+
+# Generación batch de heatmaps a partir de mediciones exportadas.
+#
+#   python generar_heatmap.py sitios/*/mediciones.json -o heatmaps --jobs 8
+#
+# Por cada survey se dibuja un mapa por SSID (y por BSSID, salvo con
+# --sin-bssid) más el promedio de todas las redes, y se escribe un
+# manifest.json con lo generado. Cada survey es una tarea del pool: el proceso
+# que lo toma lo carga una sola vez y reutiliza la triangulación entre los
+# mapas que comparten puntos. Si hay menos surveys que procesos, los mapas de
+# cada survey se reparten en tramos entre varios procesos. Los surveys que no
+# cambiaron desde la corrida anterior (mismo archivo y mismos parámetros) se
+# saltean.
+
+VERSION_MAPAS = 1
+MANIFEST = "manifest.json"
+METODOS = {"lineal": "linear", "cubico": "cubic"}
+
+
+def _slug(texto):
+    limpio = re.sub(r"[^A-Za-z0-9._-]+", "_", texto).strip("_") or "sin_nombre"
+    if limpio != texto:
+        # Dos nombres distintos pueden quedar iguales al limpiarlos
+        limpio += "-" + hashlib.blake2b(texto.encode("utf-8"), digest_size=3).hexdigest()
+    return limpio
+
+
+def carpeta_survey(ruta):
+    # Nombre estable y único por archivo de entrada
+    ruta = os.path.abspath(ruta)
+    base = os.path.splitext(os.path.basename(ruta))[0]
+    return f"{base}-{hashlib.blake2b(ruta.encode('utf-8'), digest_size=3).hexdigest()}"
+
+
+def firma_survey(ruta, parametros):
+    estado = os.stat(ruta)
+    datos = [estado.st_size, estado.st_mtime_ns, VERSION_MAPAS, sorted(parametros.items())]
+    return hashlib.blake2b(json.dumps(datos).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _dibujar(grid_x, grid_y, grid_z, x, y, titulo, modo, ruta_png):
+    vmin, vmax = motor.rango_modo(modo, grid_z)
+    fig = Figure(figsize=(8, 6))
+    ax = fig.subplots()
+    contorno = ax.contourf(grid_x, grid_y, grid_z, levels=np.linspace(vmin, vmax, 100), cmap="jet", extend="both")
+    fig.colorbar(contorno, ax=ax, label=modo)
+    ax.scatter(x, y, c="white", edgecolors="black", label="Mediciones")
+    ax.set_title(titulo)
+    ax.set_xlabel("X (m)")
+    ax.set_ylabel("Y (m)")
+    ax.legend()
+    fig.tight_layout()
+    fig.savefig(ruta_png)
+
+
+def _promedio_todas_las_redes(almacen):
+    # El mapa original del script: señal promedio de todas las redes por punto
+    conteo = np.bincount(almacen.punto, minlength=almacen.n_puntos)
+    suma = np.bincount(almacen.punto, weights=almacen.dbm(), minlength=almacen.n_puntos)
+    con_datos = conteo > 0
+    return almacen.x_m[con_datos], almacen.y_m[con_datos], suma[con_datos] / conteo[con_datos]
+
+
+def procesar_survey(ruta, salida, parametros, parte=0, partes=1):
+    # Corre en los procesos del pool. Devuelve la entrada del manifest, o la
+    # parte de ella que corresponde al tramo 'parte' de 'partes' de los mapas.
+    almacen = motor.cargar_survey(ruta)
+    carpeta = carpeta_survey(ruta)
+    os.makedirs(os.path.join(salida, carpeta), exist_ok=True)
+    modo = parametros["modo"]
+    metodo = METODOS[parametros["metodo"]]
+
+    # Misma grilla para todos los mapas del survey, así se pueden comparar
+    grid_x, grid_y = np.meshgrid(
+        np.linspace(almacen.x_m.min(), almacen.x_m.max(), parametros["resolucion"]),
+        np.linspace(almacen.y_m.min(), almacen.y_m.max(), parametros["resolucion"])
+    ) if almacen.n_puntos else (None, None)
+
+    mapas = [(None, None)]
+    for ssid in motor.listar_ssids(almacen):
+        mapas.append((ssid, None))
+        if not parametros["sin_bssid"]:
+            mapas.extend((ssid, bssid) for bssid in motor.listar_bssids(almacen, ssid))
+    # Tramos contiguos: cada SSID queda casi siempre junto a sus BSSID
+    mapas = mapas[len(mapas) * parte // partes:len(mapas) * (parte + 1) // partes]
+
+    entrada = {"firma": firma_survey(ruta, parametros), "puntos": almacen.n_puntos, "mapas": [], "errores": []}
+    for ssid, bssid in mapas:
+        if ssid is None:
+            x, y, valores = _promedio_todas_las_redes(almacen)
+            nombre, titulo, modo_mapa = "promedio_redes.png", "Señal promedio de todas las redes", motor.MODO_SEÑAL
+        else:
+            x, y, valores = motor.datos_heatmap(almacen, ssid, modo, bssid, parametros["estadistico"])
+            nombre = f"ssid_{_slug(ssid)}" + (f"__{_slug(bssid)}" if bssid else "") + ".png"
+            titulo = f"{modo} - {ssid}" + (f" ({bssid})" if bssid else "")
+            modo_mapa = modo
+        try:
+            if len(x) < motor.MIN_PUNTOS:
+                raise motor.DatosInsuficientes("menos de 3 puntos")
+            if modo_mapa in motor.MODOS_CANAL:
+                # Cada BSSID se interpola por separado y se combina por celda
+                grid_z = motor.heatmap_canal(almacen, ssid, modo, bssid, motor.TIPO_CELDAS,
+                                             resolucion=parametros["resolucion"], estadistico=parametros["estadistico"])[2]
+            else:
+                grid_z = motor.interpolar(x, y, valores, grid_x, grid_y, metodo)
+            ruta_png = os.path.join(salida, carpeta, nombre)
+            _dibujar(grid_x, grid_y, grid_z, x, y, titulo, modo_mapa, ruta_png)
+        except Exception as e:
+            entrada["errores"].append({"ssid": ssid, "bssid": bssid, "error": str(e)})
+            continue
+        entrada["mapas"].append({
+            "ssid": ssid, "bssid": bssid, "png": os.path.join(carpeta, nombre),
+            "puntos": int(len(x)), "min": float(np.min(valores)), "max": float(np.max(valores)),
+        })
+    return entrada
+
+
+def expandir_entradas(patrones):
+    rutas = []
+    for patron in patrones:
+        encontrados = sorted(glob.glob(patron, recursive=True)) if glob.has_magic(patron) else [patron]
+        if not encontrados:
+            print(f"Sin coincidencias para {patron}", file=sys.stderr)
+        rutas.extend(os.path.abspath(r) for r in encontrados)
+    return list(dict.fromkeys(rutas))
+
+
+def al_dia(entrada, ruta, salida, parametros):
+    if not entrada or entrada.get("firma") != firma_survey(ruta, parametros):
+        return False
+    return all(os.path.exists(os.path.join(salida, m["png"])) for m in entrada["mapas"])
+
+
+def cargar_manifest(salida):
+    ruta = os.path.join(salida, MANIFEST)
+    if not os.path.exists(ruta):
+        return {"surveys": {}}
+    with open(ruta, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def guardar_manifest(salida, manifest):
+    # Se escribe a un temporal y se renombra: un corte no deja el manifest a medias
+    ruta = os.path.join(salida, MANIFEST)
+    with open(ruta + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(ruta + ".tmp", ruta)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera heatmaps por SSID/BSSID de uno o más surveys exportados.")
+    parser.add_argument("entradas", nargs="*", default=["mediciones.json"],
+                        help="archivos mediciones.json o patrones glob (por defecto mediciones.json)")
+    parser.add_argument("-o", "--salida", default="heatmaps", help="carpeta de salida (por defecto heatmaps)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="procesos en paralelo")
+    parser.add_argument("--resolucion", type=int, default=100, help="puntos por lado de la grilla (por defecto 100)")
+    parser.add_argument("--metodo", choices=sorted(METODOS), default="cubico", help="interpolación")
+    parser.add_argument("--modo", choices=motor.MODOS_ANALISIS, default=motor.MODO_SEÑAL)
+    parser.add_argument("--estadistico", choices=motor.ESTADISTICOS, default=motor.MEDIA,
+                        help="resumen de las muestras de cada punto (por defecto media)")
+    parser.add_argument("--sin-bssid", action="store_true", help="sólo un mapa por SSID")
+    parser.add_argument("--forzar", action="store_true", help="regenerar aunque los mapas estén al día")
+    args = parser.parse_args(argv)
+
+    parametros = {"resolucion": args.resolucion, "metodo": args.metodo, "modo": args.modo,
+                  "estadistico": args.estadistico, "sin_bssid": args.sin_bssid}
+    salida = os.path.abspath(args.salida)
+    os.makedirs(salida, exist_ok=True)
+    manifest = cargar_manifest(salida)
+    manifest["parametros"] = parametros
+
+    rutas = expandir_entradas(args.entradas)
+    pendientes = [r for r in rutas if os.path.exists(r)
+                  and (args.forzar or not al_dia(manifest["surveys"].get(r), r, salida, parametros))]
+    for ruta in rutas:
+        if not os.path.exists(ruta):
+            print(f"No existe {ruta}", file=sys.stderr)
+    print(f"{len(rutas)} surveys, {len(rutas) - len(pendientes)} al día, {len(pendientes)} a generar.")
+
+    inicio = time.monotonic()
+    fallidos = 0
+    for hechos, (ruta, entrada) in enumerate(ejecutar(pendientes, salida, parametros, args.jobs), 1):
+        if isinstance(entrada, Exception):
+            fallidos += 1
+            print(f"[{hechos}/{len(pendientes)}] ERROR {ruta}: {entrada}", file=sys.stderr)
+            continue
+        manifest["surveys"][ruta] = entrada
+        print(f"[{hechos}/{len(pendientes)}] {ruta}: {len(entrada['mapas'])} mapas")
+        # Guardar seguido permite cortar la corrida y retomarla
+        if hechos % 50 == 0:
+            guardar_manifest(salida, manifest)
+
+    guardar_manifest(salida, manifest)
+    print(f"Listo en {time.monotonic() - inicio:.1f} s. Manifest: {os.path.join(salida, MANIFEST)}")
+    return 1 if fallidos else 0
+
+
+def ejecutar(rutas, salida, parametros, jobs):
+    # Genera (ruta, entrada del manifest o la excepción) a medida que terminan
+    if jobs <= 1 or not rutas:
+        for ruta in rutas:
+            yield ruta, _capturar(procesar_survey, ruta, salida, parametros)
+        return
+    # Con pocos surveys, cada uno se parte para que --jobs no quede ocioso
+    partes = max(1, jobs // len(rutas))
+    try:
+        # 'spawn' como en el informe: nada de hilos heredados del padre
+        contexto = multiprocessing.get_context("spawn")
+        pool = ProcessPoolExecutor(max_workers=jobs, mp_context=contexto)
+    except Exception as e:
+        print(f"No se pudo generar en paralelo, se sigue en serie: {str(e)}", file=sys.stderr)
+        yield from ejecutar(rutas, salida, parametros, 1)
+        return
+    with pool:
+        futuros = {pool.submit(procesar_survey, ruta, salida, parametros, parte, partes): (ruta, parte)
+                   for ruta in rutas for parte in range(partes)}
+        tramos = {}
+        for futuro in as_completed(futuros):
+            ruta, parte = futuros[futuro]
+            tramos.setdefault(ruta, {})[parte] = _capturar(futuro.result)
+            if len(tramos[ruta]) == partes:
+                yield ruta, _unir(tramos.pop(ruta))
+
+
+def _unir(tramos):
+    # Junta las entradas parciales de un survey en el orden de los mapas
+    for entrada in tramos.values():
+        if isinstance(entrada, Exception):
+            return entrada
+    entrada = dict(tramos[0], mapas=[], errores=[])
+    for parte in sorted(tramos):
+        entrada["mapas"].extend(tramos[parte]["mapas"])
+        entrada["errores"].extend(tramos[parte]["errores"])
+    return entrada
+
+
+def _capturar(funcion, *args):
+    try:
+        return funcion(*args)
+    except Exception as e:
+        return e
+
+
+if __name__ == "__main__":
+    sys.exit(main())
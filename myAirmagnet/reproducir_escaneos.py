@@ -0,0 +1,33 @@
+import argparse
+
+import survey_engine as motor
+
+# Pasa escaneos grabados (WIFI_SURVEY_GRABAR=ruta al usar la aplicación) por
+# los parsers: muestra las redes de cada escaneo o mide la velocidad de
+# ingesta para comparar versiones sin placa WiFi.
+#
+#   python reproducir_escaneos.py escaneos_ejemplo.jsonl --mostrar
+#   python reproducir_escaneos.py escaneos_ejemplo.jsonl --repeticiones 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reproduce escaneos WiFi grabados.")
+    parser.add_argument("grabaciones", nargs="+", help="archivos .jsonl grabados")
+    parser.add_argument("--mostrar", action="store_true", help="listar las redes de cada escaneo")
+    parser.add_argument("--repeticiones", type=int, default=200, help="pasadas para medir la ingesta")
+    args = parser.parse_args(argv)
+
+    for ruta in args.grabaciones:
+        if args.mostrar:
+            for n, (formato, salida) in enumerate(motor.leer_grabacion(ruta), 1):
+                redes = motor.parsear_salida(formato, salida)
+                print(f"Escaneo #{n} ({formato}): {len(redes)} redes")
+                for red in redes:
+                    print(f"  {red['SSID']!r:32} {red['BSSID']:17} {red['Señal']:3}%  canal {red['Canal']}")
+        resultado = motor.medir_ingesta(ruta, args.repeticiones)
+        print(f"{ruta}: {resultado['lecturas']} lecturas en {resultado['segundos']:.3f} s "
+              f"({resultado['lecturas_por_segundo']:.0f} lecturas/s, {resultado['mb_por_segundo']:.1f} MB/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# Motor del site survey WiFi, sin dependencias de Qt.
+# Lo usa la aplicación de escritorio y se puede importar tal cual desde
+# procesos batch en servidores sin display.
+
+from .modelo import (
+    RUIDO_ESTIMADO, CLASES_VELOCIDAD, señal_a_dbm, estimar_velocidad_dbm, clase_velocidad_dbm,
+    clasificar_banda, BANDAS, banda_canal,
+    crear_medicion, resumir_muestras, es_punto_duplicado, guardar_mediciones, cargar_mediciones,
+)
+from .almacen import (
+    AlmacenMediciones, como_almacen, FUSIONAR, RECHAZAR, MEDIA, MEDIANA, MINIMO, MAXIMO, ESTADISTICOS,
+)
+from .espacial import IndiceEspacial
+from .escaneo import (
+    escanear_wifi, salida_escaneo, parsear_salida, parsear_nmcli, parsear_nmcli_terse, parsear_netsh,
+    FORMATO_NMCLI, FORMATO_NMCLI_TABLA, FORMATO_NETSH,
+)
+from .grabacion import GrabadorEscaneos, BackendReproduccion, leer_grabacion, medir_ingesta
+from .servicio_escaneo import (
+    ServicioEscaneo, Escaneo, BackendNmcli, BackendNetsh, BackendFalso, backend_del_sistema, INTERVALO_ESCANEO,
+    MUESTRAS_POR_PUNTO, PRESUPUESTO_MUESTREO,
+)
+from .heatmap import (
+    MODO_SEÑAL, MODO_SNR, MODO_INTERFERENCIA, MODO_COCANAL, MODO_ADYACENTE, MODO_SINR, MODOS_ANALISIS, MODOS_CANAL,
+    DBM_MIN, DBM_MAX, SINR_MIN, SINR_MAX,
+    TIPO_CELDAS, TIPO_INTERPOLADO, VALOR_SIN_DATOS, MIN_PUNTOS, DatosInsuficientes, rango_modo,
+    listar_ssids, listar_bssids, ssid_mas_comun, datos_heatmap, valores_por_punto, valor_en_punto, interpolar,
+    heatmap_interpolado, heatmap_por_celdas, heatmap_ssid, heatmap_canal,
+)
+from .interferencia import (
+    mapa_interferencia, interferencia_en_puntos, matriz_solapamiento, frecuencia_canal, banda_frecuencia,
+    canales_por_bssid, señales_apiladas, SOLAPAMIENTO_24, SOLAPAMIENTO_OFDM, UMBRAL_CCA,
+)
+from .interpolacion import CacheInterpolacion, MotorInterpolacion, motor_compartido
+from .render import construir_lut, colorear
+from .overlay import HeatmapIncremental
+from .raster import PlanoRaster
+from .cobertura import cobertura_fspl, iterar_tiles_cobertura, alcance_px, TX_POWER, RSSI_PISO
+from .paredes import MapaParedes, mascara_paredes, contar_cruces, DB_POR_PARED, UMBRAL_PARED
+from .optimizacion import optimizar_aps, rssi_fspl, ModeloConParedes, RSSI_OBJETIVO
+from .carga import cargar_survey, leer_survey, iterar_mediciones_json
+from .recorrido import Recorrido, posiciones_en_recorrido
+from .instrumentacion import (
+    tramo, medido, limpiar_tramos, ultimos_tramos, resumen_tramos, activar_perfilado, perfilado_activo,
+    volcar_perfil,
+)
+from .sintetico import generar_survey, lote_sintetico, aps_sinteticos, plano_sintetico
+from .journal import (
+    JournalSesion, JournalInconsistente, leer_eventos, reproducir_journal, huella_archivo,
+    EVENTO_PLANO, EVENTO_ESCALA, EVENTO_AP, EVENTO_MEDICION, EVENTO_FUSION, EVENTO_CONFIG_FUSION,
+    EVENTO_SURVEY, EVENTO_MOVER_AP,
+)
+from .informe import (
+    construir_informe_pdf, construir_informe_resumido, resumen_informe, escribir_anexo_lecturas,
+    generar_graficos_analisis, renderizar_graficos,
+)
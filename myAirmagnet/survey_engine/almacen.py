@@ -0,0 +1,507 @@
+import numpy as np
+
+from .espacial import IndiceEspacial
+
+# Almacén columnar de mediciones.
+# Los SSID y BSSID se internan a ids enteros y las lecturas se guardan en
+# arrays de NumPy (punto, ssid, bssid, señal), en lugar de una lista de dicts
+# con strings repetidos en cada punto. Se puede iterar como la lista vieja
+# para el código que todavía espera {"x_m", "y_m", "redes"}.
+
+CANAL_DESCONOCIDO = 0
+
+# Qué hacer con un clic dentro del radio de fusión de un punto existente
+FUSIONAR = "fusionar"
+RECHAZAR = "rechazar"
+
+# Estadísticos que se guardan por lectura cuando se promedian varios escaneos
+# (todos en % de calidad, como la señal). Es un registro de tamaño fijo: las
+# muestras crudas no se guardan.
+MEDIA = "media"
+MEDIANA = "mediana"
+MINIMO = "min"
+MAXIMO = "max"
+ESTADISTICOS = [MEDIA, MEDIANA, MINIMO, MAXIMO]
+
+
+def _crecer(arr, minimo):
+    # Arrays con capacidad que se duplica: agregar es O(1) amortizado
+    if len(arr) >= minimo:
+        return arr
+    nuevo = np.empty(max(minimo, 2 * len(arr)), dtype=arr.dtype)
+    nuevo[:len(arr)] = arr
+    return nuevo
+
+
+def _estadisticas_red(red, señal):
+    # (muestras, media, mediana, mín, máx, desvío) de una red; una lectura
+    # suelta es una muestra sola
+    if "Muestras" not in red:
+        return 1, señal, señal, señal, señal, 0.0
+    return (
+        int(red["Muestras"]), float(red.get("Media", señal)), float(red.get("Mediana", señal)),
+        int(red.get("Min", señal)), int(red.get("Max", señal)), float(red.get("Desvio", 0.0)),
+    )
+
+
+def _señal_red(red):
+    return min(max(int(red.get("Señal", 0)), 0), 100)
+
+
+def _canal_a_int(canal):
+    try:
+        return int(canal)
+    except (TypeError, ValueError):
+        return CANAL_DESCONOCIDO
+
+
+def _a_mhz(frecuencia):
+    try:
+        return min(max(int(frecuencia or 0), 0), 65535)
+    except (TypeError, ValueError):
+        return 0
+
+
+class AlmacenMediciones:
+    def __init__(self, capacidad=256, radio_fusion=0.0, politica_duplicados=RECHAZAR):
+        self.ssids = []  # id -> nombre
+        self.bssids = []
+        self._id_ssid = {}
+        self._id_bssid = {}
+
+        self.n_puntos = 0
+        self._x = np.empty(capacidad, dtype=np.float64)
+        self._y = np.empty(capacidad, dtype=np.float64)
+        # Lecturas de cada punto: las de su escaneo original son contiguas
+        # (primera y cantidad); las que suma una fusión van aparte
+        self._primera = np.empty(capacidad, dtype=np.int64)
+        self._cantidad = np.empty(capacidad, dtype=np.int32)
+        self._lecturas_extra = {}  # punto -> [lecturas agregadas al fusionar]
+
+        self.n_lecturas = 0
+        self._punto = np.empty(capacidad * 8, dtype=np.int32)
+        self._ssid = np.empty(capacidad * 8, dtype=np.int32)
+        self._bssid = np.empty(capacidad * 8, dtype=np.int32)
+        self._señal = np.empty(capacidad * 8, dtype=np.int8)  # calidad en % (0-100)
+        self._canal = np.empty(capacidad * 8, dtype=np.int16)
+        self._frecuencia = np.empty(capacidad * 8, dtype=np.uint16)  # MHz, 0 = desconocida
+        self._muestras = np.empty(capacidad * 8, dtype=np.uint16)  # escaneos promediados
+        self._media = np.empty(capacidad * 8, dtype=np.float32)
+        self._mediana = np.empty(capacidad * 8, dtype=np.float32)
+        self._min = np.empty(capacidad * 8, dtype=np.int8)
+        self._max = np.empty(capacidad * 8, dtype=np.int8)
+        self._desvio = np.empty(capacidad * 8, dtype=np.float32)
+
+        self.politica_duplicados = politica_duplicados
+        self._indice = IndiceEspacial(radio_fusion)
+        self._errores = {}  # punto -> mensaje, para escaneos fallidos
+
+        # Índice invertido ssid -> bssid -> lecturas, actualizado al insertar
+        self._indice_ssid = {}
+        self._cache_lecturas = {}
+        self._revision_ssid = {}  # ssid -> última revisión que lo modificó
+        self.revision = 0
+        self._orden_cache = None
+
+    @classmethod
+    def desde_lista(cls, mediciones):
+        almacen = cls(capacidad=max(len(mediciones), 16))
+        for medicion in mediciones:
+            almacen.append(medicion)
+        return almacen
+
+    # --- Interning ---
+
+    def _internar(self, nombre, tabla, ids):
+        id_ = ids.get(nombre)
+        if id_ is None:
+            id_ = len(tabla)
+            tabla.append(nombre)
+            ids[nombre] = id_
+        return id_
+
+    def id_ssid(self, ssid):
+        return self._id_ssid.get(ssid)
+
+    def id_bssid(self, bssid):
+        return self._id_bssid.get(bssid)
+
+    # --- Carga ---
+
+    def agregar_medicion(self, x_m, y_m, redes):
+        i = self.n_puntos
+        self._reservar_puntos(i + 1)
+        self._x[i] = x_m
+        self._y[i] = y_m
+        self.n_puntos += 1
+
+        tocados = self._agregar_lecturas(i, redes)
+        self._indice.agregar(i, x_m, y_m)
+
+        self._nueva_revision(tocados)
+        return i
+
+    def _nueva_revision(self, ssids_tocados):
+        self.revision += 1
+        for id_ssid in ssids_tocados:
+            self._revision_ssid[id_ssid] = self.revision
+
+    def _reservar_puntos(self, fin):
+        for nombre in ("_x", "_y", "_primera", "_cantidad"):
+            setattr(self, nombre, _crecer(getattr(self, nombre), fin))
+
+    def _reservar_lecturas(self, fin):
+        for nombre in ("_punto", "_ssid", "_bssid", "_señal", "_canal", "_frecuencia", "_muestras",
+                       "_media", "_mediana", "_min", "_max", "_desvio"):
+            setattr(self, nombre, _crecer(getattr(self, nombre), fin))
+
+    def _guardar_estadisticas(self, j, estadisticas):
+        (self._muestras[j], self._media[j], self._mediana[j],
+         self._min[j], self._max[j], self._desvio[j]) = estadisticas
+
+    def _agregar_lecturas(self, i, redes, fusion=False):
+        n = self.n_lecturas
+        fin = n + len(redes)
+        self._reservar_lecturas(fin)
+        if fusion:
+            if fin > n:
+                self._lecturas_extra.setdefault(i, []).extend(range(n, fin))
+        else:
+            self._primera[i] = n
+            self._cantidad[i] = fin - n
+
+        self._punto[n:fin] = i
+        tocados = set()
+        for j, red in enumerate(redes, n):
+            id_ssid = self._internar(red.get("SSID", "Desconocido"), self.ssids, self._id_ssid)
+            id_bssid = self._internar(red.get("BSSID", "N/A"), self.bssids, self._id_bssid)
+            self._ssid[j] = id_ssid
+            self._bssid[j] = id_bssid
+            self._indice_ssid.setdefault(id_ssid, {}).setdefault(id_bssid, []).append(j)
+            tocados.add(id_ssid)
+            self._señal[j] = _señal_red(red)
+            self._guardar_estadisticas(j, _estadisticas_red(red, int(self._señal[j])))
+            self._canal[j] = _canal_a_int(red.get("Canal"))
+            self._frecuencia[j] = _a_mhz(red.get("Frecuencia"))
+            if "error" in red:
+                self._errores[i] = red["error"]
+        self.n_lecturas = fin
+        return tocados
+
+    def agregar_lote(self, x_m, y_m, conteos, ssids, bssids, señales, canales, errores=None, estadisticas=None,
+                     frecuencias=None):
+        # Carga masiva ya en columnas: x_m/y_m y conteos (redes por punto)
+        # por punto, el resto por lectura en el mismo orden. El interning y el
+        # índice invertido se hacen por valor distinto y no por lectura.
+        # `estadisticas` es {índice de lectura en el lote: red} sólo para las
+        # redes que traen varias muestras; `frecuencias` (MHz, None o 0 si no
+        # se conoce) es opcional.
+        n_nuevos = len(x_m)
+        i0 = self.n_puntos
+        self._reservar_puntos(i0 + n_nuevos)
+        self._x[i0:i0 + n_nuevos] = x_m
+        self._y[i0:i0 + n_nuevos] = y_m
+        self.n_puntos += n_nuevos
+
+        n = self.n_lecturas
+        fin = n + len(ssids)
+        self._reservar_lecturas(fin)
+        self._cantidad[i0:i0 + n_nuevos] = conteos
+        self._primera[i0:i0 + n_nuevos] = n
+        self._primera[i0 + 1:i0 + n_nuevos] += np.cumsum(self._cantidad[i0:i0 + n_nuevos - 1])
+
+        self._punto[n:fin] = np.repeat(np.arange(i0, i0 + n_nuevos, dtype=np.int32), conteos)
+        for nombre in dict.fromkeys(ssids):
+            self._internar(nombre, self.ssids, self._id_ssid)
+        for nombre in dict.fromkeys(bssids):
+            self._internar(nombre, self.bssids, self._id_bssid)
+        self._ssid[n:fin] = np.fromiter(map(self._id_ssid.__getitem__, ssids), dtype=np.int32, count=fin - n)
+        self._bssid[n:fin] = np.fromiter(map(self._id_bssid.__getitem__, bssids), dtype=np.int32, count=fin - n)
+        self._señal[n:fin] = np.clip(np.asarray(señales, dtype=np.int64), 0, 100)
+        self._muestras[n:fin] = 1
+        for columna in (self._media, self._mediana, self._min, self._max):
+            columna[n:fin] = self._señal[n:fin]
+        self._desvio[n:fin] = 0
+        for j, red in (estadisticas or {}).items():
+            self._guardar_estadisticas(n + j, _estadisticas_red(red, int(self._señal[n + j])))
+        valor_canal = {c: _canal_a_int(c) for c in dict.fromkeys(canales)}
+        self._canal[n:fin] = np.fromiter(map(valor_canal.__getitem__, canales), dtype=np.int16, count=fin - n)
+        if frecuencias is None:
+            self._frecuencia[n:fin] = 0
+        else:
+            self._frecuencia[n:fin] = np.fromiter(map(_a_mhz, frecuencias), dtype=np.uint16, count=fin - n)
+        self.n_lecturas = fin
+
+        # Índice invertido: un grupo por par (ssid, bssid)
+        ssid_nuevo = self._ssid[n:fin]
+        bssid_nuevo = self._bssid[n:fin]
+        orden = np.lexsort((bssid_nuevo, ssid_nuevo))
+        claves = ssid_nuevo[orden].astype(np.int64) * len(self.bssids) + bssid_nuevo[orden]
+        cortes = np.flatnonzero(np.diff(claves)) + 1
+        for grupo in np.split(orden, cortes) if len(orden) else []:
+            id_ssid = int(ssid_nuevo[grupo[0]])
+            id_bssid = int(bssid_nuevo[grupo[0]])
+            self._indice_ssid.setdefault(id_ssid, {}).setdefault(id_bssid, []).extend((grupo + n).tolist())
+
+        for i in range(i0, i0 + n_nuevos):
+            self._indice.agregar(i, float(self._x[i]), float(self._y[i]))
+        for i, error in (errores or {}).items():
+            self._errores[i0 + i] = error
+
+        self._nueva_revision(np.unique(ssid_nuevo).tolist())
+        return i0
+
+    def agregar_almacen(self, otro):
+        # Agrega todos los puntos de otro almacén en un solo lote, con las
+        # lecturas agrupadas por punto como las espera agregar_lote
+        orden, offsets = otro.lecturas_por_punto()
+        estadisticas = {int(k): otro._red(orden[k]) for k in np.flatnonzero(otro.muestras[orden] > 1)}
+        return self.agregar_lote(
+            otro.x_m, otro.y_m, np.diff(offsets),
+            np.array(otro.ssids, dtype=object)[otro.ssid[orden]],
+            np.array(otro.bssids, dtype=object)[otro.bssid[orden]],
+            otro.señal[orden], otro.canal[orden], dict(otro._errores), estadisticas,
+            frecuencias=otro.frecuencia[orden],
+        )
+
+    def append(self, medicion):
+        return self.agregar_medicion(medicion["x_m"], medicion["y_m"], medicion["redes"])
+
+    def clear(self):
+        # La revisión sigue creciendo para que ninguna cache confunda el
+        # survey nuevo con el anterior
+        revision = self.revision
+        self.__init__(radio_fusion=self.radio_fusion, politica_duplicados=self.politica_duplicados)
+        self.revision = revision + 1
+
+    # --- Puntos cercanos y fusión ---
+
+    @property
+    def radio_fusion(self):
+        return self._indice.radio
+
+    def configurar_fusion(self, radio, politica=None):
+        if politica is not None:
+            self.politica_duplicados = politica
+        self._indice = IndiceEspacial(radio)
+        for i in range(self.n_puntos):
+            self._indice.agregar(i, float(self._x[i]), float(self._y[i]))
+
+    def punto_cercano(self, x_m, y_m):
+        return self._indice.cercano(x_m, y_m)
+
+    def fusionar_medicion(self, i, redes):
+        # Promedia un nuevo escaneo con las lecturas del punto i; los BSSID
+        # que el punto no tenía se agregan como lecturas nuevas
+        por_bssid = {int(self._bssid[j]): j for j in self._lecturas_de_punto(i)}
+        nuevas = []
+        tocados = set()
+        for red in redes:
+            if "error" in red:
+                continue
+            j = por_bssid.get(self._id_bssid.get(red.get("BSSID", "N/A")))
+            if j is None:
+                nuevas.append(red)
+                continue
+            self._combinar_estadisticas(j, _estadisticas_red(red, _señal_red(red)))
+            tocados.add(int(self._ssid[j]))
+            canal = _canal_a_int(red.get("Canal"))
+            if canal != CANAL_DESCONOCIDO:
+                self._canal[j] = canal
+            if _a_mhz(red.get("Frecuencia")):
+                self._frecuencia[j] = _a_mhz(red.get("Frecuencia"))
+
+        tocados |= self._agregar_lecturas(i, nuevas, fusion=True)
+
+        self._nueva_revision(tocados)
+        return i
+
+    def _lecturas_de_punto(self, i):
+        primera = int(self._primera[i])
+        return list(range(primera, primera + int(self._cantidad[i]))) + self._lecturas_extra.get(i, [])
+
+    def _combinar_estadisticas(self, j, nuevas):
+        # Media y desvío exactos (varianzas combinadas); la mediana combinada
+        # es aproximada: promedio de las medianas pesado por muestras
+        n1, media1, mediana1, min1, max1, desvio1 = (
+            int(self._muestras[j]), float(self._media[j]), float(self._mediana[j]),
+            int(self._min[j]), int(self._max[j]), float(self._desvio[j]),
+        )
+        n2, media2, mediana2, min2, max2, desvio2 = nuevas
+        n = n1 + n2
+        media = (n1 * media1 + n2 * media2) / n
+        varianza = (n1 * (desvio1 ** 2 + media1 ** 2) + n2 * (desvio2 ** 2 + media2 ** 2)) / n - media ** 2
+        self._guardar_estadisticas(j, (
+            min(n, np.iinfo(np.uint16).max), media, (n1 * mediana1 + n2 * mediana2) / n,
+            min(min1, min2), max(max1, max2), max(varianza, 0.0) ** 0.5,
+        ))
+        self._señal[j] = round(media)
+
+    def agregar_o_fusionar(self, x_m, y_m, redes):
+        # Devuelve (índice, acción) con acción "nuevo", FUSIONAR o RECHAZAR
+        cercano = self.punto_cercano(x_m, y_m)
+        if cercano is None:
+            return self.agregar_medicion(x_m, y_m, redes), "nuevo"
+        if self.politica_duplicados == FUSIONAR:
+            return self.fusionar_medicion(cercano, redes), FUSIONAR
+        return cercano, RECHAZAR
+
+    # --- Índice invertido por SSID/BSSID ---
+
+    def ssids_presentes(self):
+        return list(self._indice_ssid)
+
+    def bssids_de(self, id_ssid):
+        return list(self._indice_ssid.get(id_ssid, ()))
+
+    def conteo_ssid(self, id_ssid):
+        return sum(len(lecturas) for lecturas in self._indice_ssid.get(id_ssid, {}).values())
+
+    def lecturas_de(self, id_ssid, id_bssid=None):
+        # Índices de lecturas (ordenados) de un SSID, opcionalmente de un solo
+        # BSSID. Las listas del índice sólo crecen, así que el array cacheado
+        # sigue valiendo mientras tenga el mismo largo.
+        por_bssid = self._indice_ssid.get(id_ssid, {})
+        if id_bssid is not None:
+            listas = [por_bssid.get(id_bssid, [])]
+        else:
+            listas = list(por_bssid.values())
+        total = sum(len(lista) for lista in listas)
+
+        clave = (id_ssid, id_bssid)
+        cacheado = self._cache_lecturas.get(clave)
+        if cacheado is None or len(cacheado) != total:
+            if len(listas) == 1:
+                cacheado = np.array(listas[0], dtype=np.int64)
+            else:
+                cacheado = np.sort(np.concatenate([np.array(lista, dtype=np.int64) for lista in listas] or [np.empty(0, dtype=np.int64)]))
+            self._cache_lecturas[clave] = cacheado
+        return cacheado
+
+    def revision_ssid(self, ssid):
+        # Cambia sólo cuando se agregan o promedian lecturas de ese SSID
+        return self._revision_ssid.get(self.id_ssid(ssid), 0)
+
+    def lecturas_por_punto_conteo(self):
+        _, offsets = self.lecturas_por_punto()
+        return np.diff(offsets)
+
+    # --- Vistas columnares (sin copia) ---
+
+    @property
+    def x_m(self):
+        return self._x[:self.n_puntos]
+
+    @property
+    def y_m(self):
+        return self._y[:self.n_puntos]
+
+    @property
+    def punto(self):
+        return self._punto[:self.n_lecturas]
+
+    @property
+    def ssid(self):
+        return self._ssid[:self.n_lecturas]
+
+    @property
+    def bssid(self):
+        return self._bssid[:self.n_lecturas]
+
+    @property
+    def señal(self):
+        return self._señal[:self.n_lecturas]
+
+    @property
+    def canal(self):
+        return self._canal[:self.n_lecturas]
+
+    @property
+    def frecuencia(self):
+        return self._frecuencia[:self.n_lecturas]
+
+    @property
+    def muestras(self):
+        return self._muestras[:self.n_lecturas]
+
+    @property
+    def desvio(self):
+        return self._desvio[:self.n_lecturas]
+
+    def estadistico(self, nombre=MEDIA):
+        # Columna del estadístico pedido, en % de calidad
+        columnas = {MEDIA: self._media, MEDIANA: self._mediana, MINIMO: self._min, MAXIMO: self._max}
+        return columnas[nombre][:self.n_lecturas]
+
+    def dbm(self, estadistico=None):
+        # Misma conversión que modelo.señal_a_dbm, vectorizada. Sin
+        # estadístico usa la señal redondeada, como siempre
+        señal = self.señal if estadistico is None else self.estadistico(estadistico)
+        return señal.astype(np.float32) / 2 - 100
+
+    def lecturas_por_punto(self):
+        # Orden de las lecturas agrupadas por punto y offsets (estilo CSR),
+        # recalculado sólo cuando cambia la revisión
+        if self._orden_cache is None or self._orden_cache[0] != self.revision:
+            orden = np.argsort(self.punto, kind='stable')
+            offsets = np.zeros(self.n_puntos + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.punto, minlength=self.n_puntos), out=offsets[1:])
+            self._orden_cache = (self.revision, orden, offsets)
+        return self._orden_cache[1], self._orden_cache[2]
+
+    # --- Compatibilidad con la lista de dicts ---
+
+    def __len__(self):
+        return self.n_puntos
+
+    def __bool__(self):
+        return self.n_puntos > 0
+
+    def _red(self, j):
+        red = {
+            "SSID": self.ssids[self._ssid[j]],
+            "BSSID": self.bssids[self._bssid[j]],
+            "Señal": int(self._señal[j]),
+            "Canal": str(self._canal[j]) if self._canal[j] != CANAL_DESCONOCIDO else "N/A",
+        }
+        if self._frecuencia[j]:
+            red["Frecuencia"] = int(self._frecuencia[j])
+        if self._muestras[j] > 1:
+            red.update(
+                Muestras=int(self._muestras[j]),
+                Media=round(float(self._media[j]), 2),
+                Mediana=round(float(self._mediana[j]), 2),
+                Min=int(self._min[j]),
+                Max=int(self._max[j]),
+                Desvio=round(float(self._desvio[j]), 2),
+            )
+        return red
+
+    def _medicion(self, i, lecturas):
+        redes = [self._red(j) for j in lecturas]
+        if i in self._errores:
+            for red in redes:
+                red["error"] = self._errores[i]
+        return {"x_m": float(self._x[i]), "y_m": float(self._y[i]), "redes": redes}
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.n_puntos
+        if not 0 <= i < self.n_puntos:
+            raise IndexError("índice de medición fuera de rango")
+        orden, offsets = self.lecturas_por_punto()
+        return self._medicion(i, orden[offsets[i]:offsets[i + 1]])
+
+    def __iter__(self):
+        orden, offsets = self.lecturas_por_punto()
+        for i in range(self.n_puntos):
+            yield self._medicion(i, orden[offsets[i]:offsets[i + 1]])
+
+    def a_lista(self):
+        return list(self)
+
+
+def como_almacen(mediciones):
+    if isinstance(mediciones, AlmacenMediciones):
+        return mediciones
+    return AlmacenMediciones.desde_lista(mediciones)
@@ -0,0 +1,104 @@
+import json
+
+from .almacen import AlmacenMediciones
+
+# Carga rápida de un mediciones.json exportado.
+# En lugar de json.load sobre todo el archivo (que arma la lista completa de
+# dicts anidados antes de poder usarla), se lee por bloques y se decodifica
+# una medición a la vez; sus redes se vuelcan enseguida a listas planas por
+# columna y el dict se descarta. Al final de cada lote se hace una sola carga
+# masiva en el AlmacenMediciones.
+
+TAM_BLOQUE = 1 << 20  # caracteres leídos por vez
+PUNTOS_POR_LOTE = 20000
+
+
+def iterar_mediciones_json(ruta, tam_bloque=TAM_BLOQUE):
+    # Genera las mediciones de un archivo con una lista JSON, sin cargarlo
+    # entero en memoria
+    decodificador = json.JSONDecoder()
+    with open(ruta, 'r', encoding='utf-8') as f:
+        buffer = f.read(tam_bloque)
+        pos = _saltar(buffer, 0, "")
+        if pos >= len(buffer) or buffer[pos] != "[":
+            raise ValueError(f"{ruta} no contiene una lista de mediciones")
+        pos += 1
+        fin_archivo = False
+
+        while True:
+            pos = _saltar(buffer, pos, ",")
+            if pos < len(buffer) and buffer[pos] == "]":
+                return
+            try:
+                medicion, fin = decodificador.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # El objeto quedó cortado al final del bloque: se lee más
+                if fin_archivo:
+                    raise
+                bloque = f.read(tam_bloque)
+                fin_archivo = not bloque
+                buffer = buffer[pos:] + bloque
+                pos = 0
+                continue
+            yield medicion
+            pos = fin
+            if pos > tam_bloque:
+                buffer = buffer[pos:]
+                pos = 0
+
+
+def _saltar(buffer, pos, separadores):
+    while pos < len(buffer) and (buffer[pos].isspace() or buffer[pos] in separadores):
+        pos += 1
+    return pos
+
+
+def cargar_survey(ruta, almacen=None, puntos_por_lote=PUNTOS_POR_LOTE):
+    # Agrega las mediciones del archivo al almacén (uno nuevo si no se pasa)
+    # y lo devuelve
+    if almacen is None:
+        almacen = AlmacenMediciones(capacidad=1024)
+
+    lote = _lote_vacio()
+    for medicion in iterar_mediciones_json(ruta):
+        _agregar_a_lote(lote, medicion["x_m"], medicion["y_m"], medicion.get("redes", []))
+        if len(lote["x_m"]) >= puntos_por_lote:
+            almacen.agregar_lote(**lote)
+            lote = _lote_vacio()
+    if lote["x_m"]:
+        almacen.agregar_lote(**lote)
+    return almacen
+
+
+def leer_survey(ruta):
+    # Carga el archivo entero en un almacén nuevo. Un archivo roto levanta
+    # OSError o ValueError y no deja nada a medio cargar: quien lo llama
+    # agrega el resultado (agregar_almacen) sólo si salió bien
+    try:
+        return cargar_survey(ruta)
+    except (KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f"{ruta} no tiene el formato de un survey exportado ({e!r})") from e
+
+
+def _agregar_a_lote(lote, x_m, y_m, redes):
+    # Vuelca una medición a las listas por columna del lote
+    i = len(lote["x_m"])
+    lote["x_m"].append(x_m)
+    lote["y_m"].append(y_m)
+    lote["conteos"].append(len(redes))
+    lote["ssids"].extend([red.get("SSID", "Desconocido") for red in redes])
+    lote["bssids"].extend([red.get("BSSID", "N/A") for red in redes])
+    lote["señales"].extend([red.get("Señal", 0) for red in redes])
+    lote["canales"].extend([red.get("Canal") for red in redes])
+    lote["frecuencias"].extend([red.get("Frecuencia") for red in redes])
+    base = len(lote["ssids"]) - len(redes)
+    for j, red in enumerate(redes, base):
+        if "error" in red:
+            lote["errores"][i] = red["error"]
+        if "Muestras" in red:
+            lote["estadisticas"][j] = red
+
+
+def _lote_vacio():
+    return {"x_m": [], "y_m": [], "conteos": [], "ssids": [], "bssids": [],
+            "señales": [], "canales": [], "frecuencias": [], "errores": {}, "estadisticas": {}}
@@ -0,0 +1,119 @@
+import numpy as np
+
+from .instrumentacion import medido
+from .paredes import DB_POR_PARED
+
+# Cobertura proyectada desde APs ubicados a mano (modelo FSPL simplificado).
+#
+# El plano se procesa por tiles con buffers float32 que se reutilizan entre
+# APs y entre tiles, así la memoria pico depende del tamaño del tile y no del
+# plano: se puede calcular a resolución de píxel completo en planos enormes.
+# Como todos los APs usan la misma potencia, el mejor RSSI de una celda es el
+# del AP más cercano: se acumula la distancia² mínima y el logaritmo se
+# calcula una sola vez por celda.
+# Con un MapaParedes cada AP pierde además `db_por_pared` por cada pared que
+# cruza hasta la celda; ahí el más cercano ya no es siempre el mejor, así que
+# se calcula el RSSI de cada AP y se queda el máximo.
+
+TX_POWER = -30  # dBm asumido cerca del AP
+RSSI_PISO = -100.0
+TILE = 512
+
+
+def alcance_px(escala, tx_power=TX_POWER, rssi_min=RSSI_PISO):
+    # Distancia a partir de la cual un AP ya no supera el piso de señal
+    return 10 ** ((tx_power - rssi_min) / 20) * escala
+
+
+def iterar_tiles_cobertura(aps, ancho_px, alto_px, escala, paso=1, tile=TILE,
+                           tx_power=TX_POWER, rssi_min=RSSI_PISO, paredes=None, db_por_pared=DB_POR_PARED):
+    # Genera (fila0, col0, rssi) por tile, en celdas de `paso` píxeles.
+    # El array rssi es un buffer reutilizado: copiarlo si se lo quiere guardar.
+    x_px = np.arange(0, ancho_px, paso, dtype=np.float32)
+    y_px = np.arange(0, alto_px, paso, dtype=np.float32)
+    ap_x = np.array([ap["x_px"] for ap in aps], dtype=np.float32)
+    ap_y = np.array([ap["y_px"] for ap in aps], dtype=np.float32)
+    alcance2 = alcance_px(escala, tx_power, rssi_min) ** 2
+    if paredes is not None:
+        filas_pared, columnas_pared = paredes.indices(x_px, y_px)
+
+    mejor_buf = np.empty((tile, tile), dtype=np.float32)
+    d2_buf = np.empty((tile, tile), dtype=np.float32)
+
+    for f0 in range(0, len(y_px), tile):
+        ys = y_px[f0:f0 + tile]
+        for c0 in range(0, len(x_px), tile):
+            xs = x_px[c0:c0 + tile]
+            mejor = mejor_buf[:len(ys), :len(xs)]
+            d2 = d2_buf[:len(ys), :len(xs)]
+            mejor.fill(np.inf)
+
+            # Distancia de cada AP al rectángulo del tile: si ni el punto más
+            # cercano queda dentro del alcance, el AP no aporta nada acá
+            cerca_x = np.maximum(np.maximum(xs[0] - ap_x, ap_x - xs[-1]), 0)
+            cerca_y = np.maximum(np.maximum(ys[0] - ap_y, ap_y - ys[-1]), 0)
+            utiles = np.flatnonzero(cerca_x ** 2 + cerca_y ** 2 <= alcance2)
+
+            if paredes is not None:
+                yield f0, c0, _tile_con_paredes(
+                    mejor, d2, xs, ys, ap_x, ap_y, utiles, escala, tx_power, rssi_min,
+                    paredes, db_por_pared, filas_pared[f0:f0 + tile], columnas_pared[c0:c0 + tile]
+                )
+                continue
+
+            for k in utiles:
+                dx2 = (xs - ap_x[k]) ** 2
+                dy2 = (ys - ap_y[k]) ** 2
+                np.add(dy2[:, None], dx2[None, :], out=d2)
+                np.minimum(mejor, d2, out=mejor)
+
+            # rssi = tx - 20 log10(d_m) = tx - 10 log10(d2_px / escala²), con d >= 1 m
+            np.divide(mejor, escala ** 2, out=mejor)
+            np.maximum(mejor, 1, out=mejor)  # evitar log(0)
+            np.log10(mejor, out=mejor)
+            np.multiply(mejor, -10, out=mejor)
+            np.add(mejor, tx_power, out=mejor)
+            np.maximum(mejor, rssi_min, out=mejor)
+            yield f0, c0, mejor
+
+
+def _tile_con_paredes(mejor, d2, xs, ys, ap_x, ap_y, utiles, escala, tx_power, rssi_min,
+                      paredes, db_por_pared, filas, columnas):
+    mejor.fill(-np.inf)
+    for k in utiles:
+        cruces = paredes.cruces(ap_x[k], ap_y[k])
+        dx2 = (xs - ap_x[k]) ** 2
+        dy2 = (ys - ap_y[k]) ** 2
+        np.add(dy2[:, None], dx2[None, :], out=d2)
+        np.divide(d2, escala ** 2, out=d2)
+        np.maximum(d2, 1, out=d2)
+        np.log10(d2, out=d2)
+        np.multiply(d2, -10, out=d2)
+        d2 -= cruces[filas[:, None], columnas[None, :]] * np.float32(db_por_pared)
+        np.maximum(mejor, d2, out=mejor)
+    np.add(mejor, tx_power, out=mejor)
+    np.maximum(mejor, rssi_min, out=mejor)
+    return mejor
+
+
+@medido("cobertura.fspl")
+def cobertura_fspl(aps, ancho_px, alto_px, escala, paso=10, tx_power=TX_POWER,
+                   rssi_min=RSSI_PISO, tile=TILE, dtype=np.float32, out=None,
+                   paredes=None, db_por_pared=DB_POR_PARED):
+    # Devuelve las coordenadas (1D, en píxeles) de la grilla y el RSSI por
+    # celda. `dtype=np.int8` guarda dBm enteros con un byte por celda; `out`
+    # puede ser un np.memmap para planos que no entran en memoria. Con
+    # `paredes` (un MapaParedes del mismo plano) se suma la pérdida por pared.
+    x_px = np.arange(0, ancho_px, paso)
+    y_px = np.arange(0, alto_px, paso)
+    if out is None:
+        out = np.empty((len(y_px), len(x_px)), dtype=dtype)
+
+    for f0, c0, rssi in iterar_tiles_cobertura(aps, ancho_px, alto_px, escala, paso, tile, tx_power, rssi_min,
+                                               paredes, db_por_pared):
+        h, w = rssi.shape
+        if np.issubdtype(out.dtype, np.integer):
+            np.rint(rssi, out=rssi)
+        out[f0:f0 + h, c0:c0 + w] = rssi
+
+    return x_px, y_px, out
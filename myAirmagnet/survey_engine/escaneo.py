@@ -0,0 +1,132 @@
+import platform
+import re
+import subprocess
+
+from .instrumentacion import tramo
+
+# Escaneo de redes WiFi con las herramientas del sistema operativo.
+# El parseo está separado de la ejecución para poder procesar salidas
+# guardadas sin tener una placa WiFi.
+
+# nmcli en modo terse (-t): un campo por columna separado por ':', con ':' y
+# '\\' escapados dentro de los valores, así que SSIDs con espacios o dos
+# puntos y los BSSID llegan enteros
+CAMPOS_NMCLI = ["SSID", "BSSID", "SIGNAL", "CHAN", "FREQ", "RATE"]
+COMANDO_NMCLI = ['nmcli', '-t', '-f', ",".join(CAMPOS_NMCLI), 'device', 'wifi', 'list']
+COMANDO_NETSH = ['netsh', 'wlan', 'show', 'networks', 'mode=bssid']
+
+_CAMPO_TERSE = r'((?:\\.|[^\\:])*)'
+_LINEA_NMCLI = re.compile(":".join([_CAMPO_TERSE] * len(CAMPOS_NMCLI)))
+_ESCAPE_TERSE = re.compile(r'\\(.)')
+_NUMERO = re.compile(r'\d+')
+
+# Claves de netsh en español e inglés
+_CLAVES_NETSH = {
+    "señal": "Señal", "signal": "Señal",
+    "canal": "Canal", "channel": "Canal",
+}
+
+
+def _red_error(mensaje):
+    return {"error": mensaje, "SSID": "Error", "BSSID": "N/A", "Señal": 0, "Canal": "N/A"}
+
+
+def parsear_nmcli(resultado):
+    redes = []
+    lineas = resultado.strip().split('\n')[1:]
+    for linea in lineas:
+        partes = [x.strip() for x in linea.split() if x.strip()]
+        if len(partes) >= 3:
+            ssid = ' '.join(partes[:-2])
+            signal = partes[-2]
+            bssid = partes[-1]
+            redes.append({'SSID': ssid, 'BSSID': bssid, 'Señal': int(signal), 'Canal': 'N/A'})
+    return redes
+
+
+def _numero(texto):
+    encontrado = _NUMERO.search(texto)
+    return int(encontrado.group()) if encontrado else None
+
+
+def parsear_nmcli_terse(resultado):
+    redes = []
+    for linea in resultado.splitlines():
+        campos = _LINEA_NMCLI.fullmatch(linea)
+        if not campos:
+            continue
+        ssid, bssid, señal, canal, frecuencia, tasa = (
+            _ESCAPE_TERSE.sub(r'\1', c) if '\\' in c else c for c in campos.groups()
+        )
+        señal = _numero(señal)
+        if señal is None:
+            continue
+        red = {'SSID': ssid, 'BSSID': bssid, 'Señal': señal, 'Canal': canal or 'N/A'}
+        if _numero(frecuencia) is not None:
+            red['Frecuencia'] = _numero(frecuencia)  # MHz
+        if _numero(tasa) is not None:
+            red['Tasa'] = _numero(tasa)  # Mbit/s
+        redes.append(red)
+    return redes
+
+
+def parsear_netsh(resultado):
+    # Una sola pasada: cada BSSID abre una red nueva y las líneas siguientes
+    # (señal, canal, en cualquier orden) completan la red abierta
+    redes = []
+    ssid = None
+    red = None
+    for linea in resultado.splitlines():
+        clave, separador, valor = linea.partition(":")
+        if not separador:
+            continue
+        clave = clave.strip()
+        valor = valor.strip()
+        if clave.startswith("SSID"):
+            ssid = valor or ssid
+            red = None
+        elif clave.startswith("BSSID"):
+            red = {'SSID': ssid or "Desconocido", 'BSSID': valor, 'Señal': None, 'Canal': "N/A"}
+            redes.append(red)
+        elif red is not None:
+            campo = _CLAVES_NETSH.get(clave.lower())
+            if campo == "Señal":
+                red['Señal'] = _numero(valor)
+            elif campo == "Canal":
+                red['Canal'] = valor
+    return [red for red in redes if red['Señal'] is not None]
+
+
+FORMATO_NMCLI = "nmcli"
+FORMATO_NMCLI_TABLA = "nmcli-tabla"  # salida sin -t de versiones anteriores
+FORMATO_NETSH = "netsh"
+PARSERS = {
+    FORMATO_NMCLI: parsear_nmcli_terse,
+    FORMATO_NMCLI_TABLA: parsear_nmcli,
+    FORMATO_NETSH: parsear_netsh,
+}
+
+
+def parsear_salida(formato, salida):
+    return PARSERS[formato](salida)
+
+
+def salida_escaneo(sistema=None):
+    # Ejecuta la herramienta del sistema y devuelve (formato, salida cruda)
+    sistema = sistema or platform.system()
+    if sistema == "Linux":
+        return FORMATO_NMCLI, subprocess.check_output(COMANDO_NMCLI, encoding='utf-8')
+    if sistema == "Windows":
+        return FORMATO_NETSH, subprocess.check_output(COMANDO_NETSH, encoding='utf-8')
+    raise OSError("Sistema operativo no soportado")
+
+
+def escanear_wifi(sistema=None):
+    try:
+        with tramo("escaneo.comando"):
+            formato, salida = salida_escaneo(sistema)
+        with tramo("escaneo.parseo"):
+            return parsear_salida(formato, salida)
+    except Exception as e:
+        return [_red_error(str(e))]
+
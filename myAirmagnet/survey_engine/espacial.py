@@ -0,0 +1,49 @@
+import math
+
+# Índice espacial por grilla hash para detectar puntos cercanos en O(1).
+# Con radio 0 sólo coinciden puntos idénticos (redondeados al centímetro),
+# que era el criterio original de "punto duplicado".
+
+
+class IndiceEspacial:
+    def __init__(self, radio=0.0):
+        self.radio = float(radio)
+        self._celdas = {}
+        self._coords = {}
+
+    def _celda(self, x, y):
+        if self.radio <= 0:
+            return (round(x, 2), round(y, 2))
+        return (math.floor(x / self.radio), math.floor(y / self.radio))
+
+    def agregar(self, id_punto, x, y):
+        self._celdas.setdefault(self._celda(x, y), []).append(id_punto)
+        self._coords[id_punto] = (x, y)
+
+    def quitar(self, id_punto):
+        x, y = self._coords.pop(id_punto)
+        celda = self._celda(x, y)
+        self._celdas[celda].remove(id_punto)
+        if not self._celdas[celda]:
+            del self._celdas[celda]
+
+    def cercano(self, x, y):
+        # Punto más cercano dentro del radio, o None. Revisa sólo las 9 celdas
+        # vecinas: el costo no depende de la cantidad de puntos del survey.
+        if self.radio <= 0:
+            ids = self._celdas.get(self._celda(x, y))
+            return ids[0] if ids else None
+
+        cx, cy = self._celda(x, y)
+        mejor, mejor_d2 = None, self.radio ** 2
+        for i in (cx - 1, cx, cx + 1):
+            for j in (cy - 1, cy, cy + 1):
+                for id_punto in self._celdas.get((i, j), ()):
+                    px, py = self._coords[id_punto]
+                    d2 = (px - x) ** 2 + (py - y) ** 2
+                    if d2 <= mejor_d2:
+                        mejor, mejor_d2 = id_punto, d2
+        return mejor
+
+    def __len__(self):
+        return len(self._coords)
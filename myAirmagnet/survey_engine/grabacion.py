@@ -0,0 +1,76 @@
+import json
+import threading
+import time
+
+from .escaneo import parsear_salida, PARSERS
+
+# Grabación y reproducción de la salida cruda de los escáneres.
+# Cada escaneo se guarda como una línea JSON {"momento", "formato", "salida"};
+# después se puede reproducir como backend del ServicioEscaneo (sin placa
+# WiFi) o pasar por los parsers para medir cuántas lecturas por segundo se
+# procesan y detectar regresiones (ver reproducir_escaneos.py).
+
+
+class GrabadorEscaneos:
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+
+    def guardar(self, formato, salida):
+        linea = json.dumps({"momento": time.time(), "formato": formato, "salida": salida}, ensure_ascii=False)
+        with self._lock, open(self.ruta, 'a', encoding='utf-8') as f:
+            f.write(linea + "\n")
+
+
+def leer_grabacion(ruta):
+    # Genera (formato, salida) en el orden en que se grabaron
+    with open(ruta, 'r', encoding='utf-8') as f:
+        for linea in f:
+            if linea.strip():
+                registro = json.loads(linea)
+                if registro["formato"] not in PARSERS:
+                    raise ValueError(f"Formato de escaneo desconocido: {registro['formato']}")
+                yield registro["formato"], registro["salida"]
+
+
+class BackendReproduccion:
+    # Devuelve los escaneos grabados de a uno; al terminar vuelve a empezar
+    # (o falla, con ciclo=False)
+    def __init__(self, ruta, ciclo=True, demora=0.0):
+        self.grabados = list(leer_grabacion(ruta))
+        if not self.grabados:
+            raise ValueError(f"La grabación {ruta} está vacía")
+        self.ciclo = ciclo
+        self.demora = demora
+        self._siguiente = 0
+
+    def escanear(self):
+        if self._siguiente >= len(self.grabados):
+            if not self.ciclo:
+                raise EOFError("No quedan escaneos grabados")
+            self._siguiente = 0
+        formato, salida = self.grabados[self._siguiente]
+        self._siguiente += 1
+        if self.demora:
+            time.sleep(self.demora)
+        return parsear_salida(formato, salida)
+
+
+def medir_ingesta(ruta, repeticiones=200):
+    # Parsea la grabación completa `repeticiones` veces
+    grabados = list(leer_grabacion(ruta))
+    total_bytes = sum(len(salida.encode('utf-8')) for _, salida in grabados) * repeticiones
+    lecturas = 0
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        for formato, salida in grabados:
+            lecturas += len(parsear_salida(formato, salida))
+    segundos = time.perf_counter() - inicio
+    return {
+        "escaneos": len(grabados) * repeticiones,
+        "lecturas": lecturas,
+        "segundos": segundos,
+        "lecturas_por_segundo": lecturas / segundos if segundos else float("inf"),
+        "mb_por_segundo": total_bytes / 1e6 / segundos if segundos else float("inf"),
+    }
+
@@ -0,0 +1,256 @@
+import numpy as np
+
+from .almacen import como_almacen
+from .instrumentacion import tramo
+from .interferencia import interferencia_en_puntos, mapa_interferencia
+from .interpolacion import motor_compartido
+from .modelo import RUIDO_ESTIMADO
+
+# Extracción de datos por SSID e interpolación de heatmaps.
+
+MODO_SEÑAL = "Señal (dBm)"
+MODO_SNR = "Señal/Ruido (SNR)"
+MODO_INTERFERENCIA = "Interferencia estimada"
+MODO_COCANAL = "Interferencia co-canal (dBm)"
+MODO_ADYACENTE = "Interferencia de canal adyacente (dBm)"
+MODO_SINR = "SINR (dB)"
+MODOS_ANALISIS = [MODO_SEÑAL, MODO_SNR, MODO_INTERFERENCIA, MODO_COCANAL, MODO_ADYACENTE, MODO_SINR]
+# Modos que salen del motor de interferencia por canal (clave de su resultado)
+MODOS_CANAL = {MODO_COCANAL: "cocanal", MODO_ADYACENTE: "adyacente", MODO_SINR: "sinr"}
+
+TIPO_CELDAS = "celdas"
+TIPO_INTERPOLADO = "interpolado"
+
+# Escala de colores común a todos los heatmaps de señal
+DBM_MIN = -90
+DBM_MAX = -30
+VALOR_SIN_DATOS = -100
+SINR_MIN = 0
+SINR_MAX = 40
+MIN_PUNTOS = 3
+
+
+class DatosInsuficientes(ValueError):
+    pass
+
+
+def rango_modo(modo, valores=None):
+    # Rango de la escala de colores según lo que se está mostrando
+    if modo == MODO_SNR:
+        return DBM_MIN - RUIDO_ESTIMADO, DBM_MAX - RUIDO_ESTIMADO
+    if modo == MODO_INTERFERENCIA:
+        maximo = float(np.nanmax(valores)) if valores is not None and np.size(valores) else 1.0
+        return 0.0, max(maximo, 1.0)
+    if modo == MODO_SINR:
+        return SINR_MIN, SINR_MAX
+    return DBM_MIN, DBM_MAX
+
+
+def listar_ssids(mediciones):
+    almacen = como_almacen(mediciones)
+    return sorted(almacen.ssids[i] for i in almacen.ssids_presentes() if almacen.ssids[i].strip())
+
+
+def listar_bssids(mediciones, ssid):
+    almacen = como_almacen(mediciones)
+    id_ssid = almacen.id_ssid(ssid)
+    if id_ssid is None:
+        return []
+    return sorted(almacen.bssids[i] for i in almacen.bssids_de(id_ssid) if almacen.bssids[i])
+
+
+def ssid_mas_comun(mediciones):
+    almacen = como_almacen(mediciones)
+    validos = [i for i in almacen.ssids_presentes() if almacen.ssids[i].strip()]
+    if not validos:
+        return None
+    # max se queda con el primero en empatar, igual que el conteo original
+    return almacen.ssids[max(validos, key=almacen.conteo_ssid)]
+
+
+def _promedio_por_punto(almacen, lecturas, valores):
+    # Promedio de los valores de las lecturas indicadas, agrupados por punto
+    puntos = almacen.punto[lecturas]
+    suma = np.bincount(puntos, weights=valores, minlength=almacen.n_puntos)
+    cuenta = np.bincount(puntos, minlength=almacen.n_puntos)
+    con_datos = cuenta > 0
+    return con_datos, suma[con_datos] / cuenta[con_datos]
+
+
+def _lecturas_ssid(almacen, ssid, bssid=None):
+    id_ssid = almacen.id_ssid(ssid)
+    if id_ssid is None:
+        return None
+    id_bssid = None
+    if bssid:
+        id_bssid = almacen.id_bssid(bssid)
+        if id_bssid is None:
+            return None
+    return almacen.lecturas_de(id_ssid, id_bssid)
+
+
+def valores_por_punto(mediciones, ssid, modo=MODO_SEÑAL, bssid=None, estadistico=None):
+    # Índices de los puntos con datos y su valor promedio para el SSID/BSSID.
+    # `estadistico` (media, mediana, min, max) elige qué resumen de las
+    # muestras de cada lectura usar; sin él, la señal guardada.
+    almacen = como_almacen(mediciones)
+
+    if modo == MODO_INTERFERENCIA:
+        # Contar redes distintas al SSID seleccionado
+        valores = almacen.lecturas_por_punto_conteo().astype(float)
+        propias = _lecturas_ssid(almacen, ssid)
+        if propias is not None:
+            valores -= np.bincount(almacen.punto[propias], minlength=almacen.n_puntos)
+        return np.arange(almacen.n_puntos), valores
+
+    if modo in MODOS_CANAL:
+        valores = interferencia_en_puntos(almacen, ssid, bssid, estadistico)[MODOS_CANAL[modo]]
+        con_datos = ~np.isnan(valores)
+        return np.flatnonzero(con_datos), _acotar_canal(valores[con_datos], modo)
+
+    lecturas = _lecturas_ssid(almacen, ssid, bssid)
+    if lecturas is None:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+
+    dbm = almacen.dbm(estadistico)[lecturas].astype(np.float64)
+    if modo == MODO_SNR:
+        dbm -= RUIDO_ESTIMADO
+    con_datos, valores = _promedio_por_punto(almacen, lecturas, dbm)
+    return np.flatnonzero(con_datos), valores
+
+
+def datos_heatmap(mediciones, ssid, modo=MODO_SEÑAL, bssid=None, estadistico=None):
+    # Devuelve coordenadas y valor promedio por punto para el SSID/BSSID elegido
+    almacen = como_almacen(mediciones)
+    puntos, valores = valores_por_punto(almacen, ssid, modo, bssid, estadistico)
+    return almacen.x_m[puntos], almacen.y_m[puntos], valores
+
+
+def valor_en_punto(mediciones, i, ssid, modo=MODO_SEÑAL, bssid=None, estadistico=None):
+    # Valor de un solo punto sin recorrer todo el survey (None si no vio el SSID)
+    almacen = como_almacen(mediciones)
+    if modo == MODO_INTERFERENCIA or modo in MODOS_CANAL:
+        return None
+    lecturas = _lecturas_ssid(almacen, ssid, bssid)
+    if lecturas is None:
+        return None
+    lecturas = lecturas[almacen.punto[lecturas] == i]
+    if not len(lecturas):
+        return None
+    señal = almacen.señal if estadistico is None else almacen.estadistico(estadistico)
+    valor = float(np.mean(señal[lecturas].astype(np.float64) / 2 - 100))
+    if modo == MODO_SNR:
+        valor -= RUIDO_ESTIMADO
+    return valor
+
+
+def datos_primer_bssid(mediciones, ssid, estadistico=None):
+    # Una lectura por punto (la primera del SSID), como usa el informe PDF
+    almacen = como_almacen(mediciones)
+    lecturas = _lecturas_ssid(almacen, ssid)
+    if lecturas is None:
+        vacio = np.empty(0)
+        return vacio, vacio, vacio
+    puntos, primeras = np.unique(almacen.punto[lecturas], return_index=True)
+    dbm = almacen.dbm(estadistico)[lecturas[primeras]].astype(np.float64)
+    return almacen.x_m[puntos], almacen.y_m[puntos], dbm
+
+
+def interpolar(x, y, valores, grid_x, grid_y, metodo='cubic', motor=None):
+    # Equivalente a griddata, pero reutilizando la triangulación de los puntos
+    motor = motor or motor_compartido
+    grid_z = motor.interpolar(x, y, valores, grid_x, grid_y, metodo)
+    if grid_z is None or np.all(np.isnan(grid_z)):
+        raise ValueError("No se pudo interpolar correctamente.")
+    return np.nan_to_num(grid_z, nan=VALOR_SIN_DATOS)
+
+
+def heatmap_interpolado(x, y, valores, ancho_m, alto_m, resolucion=200):
+    # Grilla sobre todo el plano, interpolación cúbica
+    grid_x, grid_y = np.meshgrid(
+        np.linspace(0, ancho_m, resolucion),
+        np.linspace(0, alto_m, resolucion)
+    )
+    return grid_x, grid_y, interpolar(x, y, valores, grid_x, grid_y, 'cubic')
+
+
+def heatmap_por_celdas(x, y, valores, resolucion=100):
+    # Grilla acotada a la zona medida, interpolación lineal
+    grid_x, grid_y = np.meshgrid(
+        np.linspace(min(x), max(x), resolucion),
+        np.linspace(min(y), max(y), resolucion)
+    )
+    return grid_x, grid_y, interpolar(x, y, valores, grid_x, grid_y, 'linear')
+
+
+def _acotar_canal(valores, modo):
+    # Sin interferencia la potencia es -inf: se lleva al borde de la escala
+    # para que se pinte (fuera de rango quedaría transparente); NaN (sin
+    # datos) queda en VALOR_SIN_DATOS
+    vmin, vmax = rango_modo(modo)
+    return np.where(np.isnan(valores), VALOR_SIN_DATOS, np.clip(valores, vmin, vmax))
+
+
+def _extension(almacen, ancho_m, alto_m):
+    # Sin medidas del plano, el interpolado cubre hasta el punto más lejano
+    # medido (el origen del plano es siempre 0, 0)
+    if ancho_m is None:
+        ancho_m = float(almacen.x_m.max()) if almacen.n_puntos else 0.0
+    if alto_m is None:
+        alto_m = float(almacen.y_m.max()) if almacen.n_puntos else 0.0
+    return ancho_m, alto_m
+
+
+def heatmap_canal(mediciones, ssid, modo, bssid=None, tipo=TIPO_INTERPOLADO, ancho_m=None, alto_m=None,
+                  resolucion=200, estadistico=None):
+    # Interferencia por canal: cada BSSID se interpola por separado sobre la
+    # grilla y se combina celda por celda (siempre lineal: la cúbica de
+    # cientos de BSSIDs sería demasiado lenta)
+    almacen = como_almacen(mediciones)
+    if tipo == TIPO_INTERPOLADO:
+        ancho_m, alto_m = _extension(almacen, ancho_m, alto_m)
+        grid_x, grid_y = np.meshgrid(np.linspace(0, ancho_m, resolucion), np.linspace(0, alto_m, resolucion))
+    else:
+        grid_x, grid_y = np.meshgrid(
+            np.linspace(almacen.x_m.min(), almacen.x_m.max(), resolucion),
+            np.linspace(almacen.y_m.min(), almacen.y_m.max(), resolucion)
+        )
+    valores = mapa_interferencia(almacen, grid_x, grid_y, ssid, bssid, estadistico)[MODOS_CANAL[modo]]
+    if np.all(np.isnan(valores)):
+        raise ValueError("No se pudo interpolar correctamente.")
+    return grid_x, grid_y, _acotar_canal(valores, modo)
+
+
+def heatmap_ssid(mediciones, ssid, modo=MODO_SEÑAL, bssid=None, tipo=TIPO_INTERPOLADO,
+                 ancho_m=None, alto_m=None, resolucion=None, cache=None, estadistico=None):
+    # Heatmap completo de un SSID: extrae los datos del almacén, interpola y,
+    # si se pasa un CacheInterpolacion, reutiliza la grilla mientras no cambien
+    # las mediciones de ese SSID.
+    almacen = como_almacen(mediciones)
+    if resolucion is None:
+        resolucion = 200 if tipo == TIPO_INTERPOLADO else 100
+    if tipo == TIPO_INTERPOLADO:
+        ancho_m, alto_m = _extension(almacen, ancho_m, alto_m)
+
+    def calcular():
+        with tramo("heatmap.datos"):
+            x, y, valores = datos_heatmap(almacen, ssid, modo, bssid, estadistico)
+        if len(x) < MIN_PUNTOS:
+            raise DatosInsuficientes(f"No hay suficientes puntos para {ssid}.")
+        with tramo("heatmap.interpolar"):
+            if modo in MODOS_CANAL:
+                return heatmap_canal(almacen, ssid, modo, bssid, tipo, ancho_m, alto_m, resolucion, estadistico)
+            if tipo == TIPO_INTERPOLADO:
+                return heatmap_interpolado(x, y, valores, ancho_m, alto_m, resolucion)
+            return heatmap_por_celdas(x, y, valores, resolucion)
+
+    if cache is None:
+        return calcular()
+
+    # La interferencia depende de todas las redes, no sólo del SSID elegido
+    todas = modo == MODO_INTERFERENCIA or modo in MODOS_CANAL
+    revision = almacen.revision if todas else almacen.revision_ssid(ssid)
+    metodo = 'cubic' if tipo == TIPO_INTERPOLADO else 'linear'
+    extension = (ancho_m, alto_m) if tipo == TIPO_INTERPOLADO else None
+    base = (ssid, bssid, modo, estadistico, metodo, resolucion, extension)
+    return cache.obtener(base, revision, calcular)
@@ -0,0 +1,445 @@
+import csv
+import io
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from fpdf import FPDF
+from matplotlib.figure import Figure
+
+from .almacen import como_almacen, MEDIA, MEDIANA, MINIMO, MAXIMO
+from .heatmap import ssid_mas_comun, datos_primer_bssid, interpolar, DBM_MIN, DBM_MAX
+from .instrumentacion import medido, tramo
+from .modelo import (
+    señal_a_dbm, estimar_velocidad_dbm, clasificar_banda, clase_velocidad_dbm, VELOCIDADES_CLASE,
+    CLASES_VELOCIDAD, BANDAS, banda_canal,
+)
+
+# Construcción del informe PDF del survey (gráficos por SSID, heatmap y tabla).
+# Los gráficos se renderizan a PNG en memoria, en paralelo en varios procesos
+# cuando son muchos, y se pasan a FPDF sin archivos temporales.
+#
+# Hay dos variantes: el informe detallado lista cada red de cada punto (como
+# siempre) y el resumido calcula las estadísticas de una sola pasada sobre las
+# columnas del almacén y escribe una fila por punto; el listado crudo completo
+# puede ir aparte a un anexo CSV que se escribe por bloques.
+
+TABLA_REFERENCIA = [
+    "Señal (dBm) | Estimación | Tecnología | Velocidad estimada",
+    "-30 a -50    | Excelente  | 802.11ac/n 5GHz | 200-600 Mbps",
+    "-51 a -65    | Buena      | 802.11n/g       | 50-150 Mbps",
+    "-66 a -75    | Regular    | 802.11g/b       | 20-50 Mbps",
+    "-76 a -85    | Mala       | 802.11b         | 1-11 Mbps",
+    "< -85        | Crítica    | Sin conexión    | 0-1 Mbps",
+]
+
+# Con pocos gráficos levantar procesos cuesta más de lo que ahorra
+MIN_TAREAS_PARALELO = 8
+
+# Lecturas dibujadas como máximo por gráfico de SSID en el informe resumido
+MAX_PUNTOS_GRAFICO_RESUMIDO = 300
+
+# Puntos por bloque al escribir el anexo de lecturas
+PUNTOS_POR_BLOQUE_ANEXO = 512
+
+COLUMNAS_ANEXO = ["Punto", "x_m", "y_m", "SSID", "BSSID", "Señal (%)", "Señal (dBm)", "Canal", "Banda",
+                  "Muestras", "Mediana (%)", "Mín (%)", "Máx (%)", "Desvío (dB)"]
+# Clave de cada estadístico en los dicts de redes
+CLAVES_ESTADISTICO = {MEDIA: "Media", MEDIANA: "Mediana", MINIMO: "Min", MAXIMO: "Max"}
+
+
+def _png(fig):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png')
+    return buffer.getvalue()
+
+
+def _grafico_ssid(ssid, dbm, vel):
+    # Se usa Figure directamente (sin pyplot): no hay estado global y se
+    # puede llamar desde procesos o hilos de trabajo
+    fig = Figure(figsize=(6, 4))
+    ax = fig.subplots()
+    ax.plot(dbm, label="Señal (dBm)", marker='o')
+    ax.plot(vel, label="Velocidad (Mbps)", marker='x')
+    ax.set_title(f"Análisis por SSID: {ssid}")
+    ax.set_xlabel("Punto de Medición")
+    ax.set_ylabel("Valor")
+    ax.legend()
+    ax.grid(True)
+    fig.tight_layout()
+    return _png(fig)
+
+
+def _grafico_heatmap(ssid, grid_x, grid_y, grid_z):
+    fig = Figure(figsize=(8, 4))
+    ax = fig.subplots()
+    contorno = ax.contourf(grid_x, grid_y, grid_z, levels=np.linspace(DBM_MIN, DBM_MAX, 20), cmap="jet")
+    fig.colorbar(contorno, ax=ax, label="dBm")
+    ax.set_title(f"Mapa de calor de señal - {ssid}")
+    return _png(fig)
+
+
+def _ejecutar_tarea(tarea):
+    funcion, args = tarea
+    try:
+        return funcion(*args)
+    except Exception as e:
+        print(f"Error al generar gráfico para {args[0]}: {str(e)}")
+        return None
+
+
+def renderizar_graficos(tareas, procesos=None):
+    # tareas: lista de (función, args). Devuelve los PNG en el mismo orden
+    # (None para los que fallaron).
+    if procesos is None:
+        procesos = min(os.cpu_count() or 1, 8)
+    if procesos <= 1 or len(tareas) < MIN_TAREAS_PARALELO:
+        return [_ejecutar_tarea(t) for t in tareas]
+    try:
+        # 'spawn' para no heredar hilos ni el estado de Qt del proceso padre
+        contexto = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto) as pool:
+            return list(pool.map(_ejecutar_tarea, tareas, chunksize=4))
+    except Exception as e:
+        print(f"No se pudo renderizar en paralelo, se sigue en serie: {str(e)}")
+        return [_ejecutar_tarea(t) for t in tareas]
+
+
+def tareas_graficos_analisis(mediciones, max_puntos=None, estadistico=None):
+    # Con max_puntos se toma una de cada k lecturas: el costo de dibujar deja
+    # de depender del tamaño del survey
+    almacen = como_almacen(mediciones)
+    dbm = almacen.dbm(estadistico)
+    velocidad = VELOCIDADES_CLASE[clase_velocidad_dbm(dbm)]
+
+    # Los ids se asignan en orden de aparición, igual que el orden de los gráficos
+    tareas = []
+    for id_ssid in np.unique(almacen.ssid):
+        lecturas = almacen.lecturas_de(int(id_ssid))
+        if max_puntos and len(lecturas) > max_puntos:
+            lecturas = lecturas[::-(-len(lecturas) // max_puntos)]
+        tareas.append((_grafico_ssid, (almacen.ssids[id_ssid], dbm[lecturas], velocidad[lecturas])))
+    return tareas
+
+
+@medido("informe.graficos")
+def generar_graficos_analisis(mediciones, procesos=None):
+    tareas = tareas_graficos_analisis(mediciones)
+    imagenes = {}
+    for (_, args), png in zip(tareas, renderizar_graficos(tareas, procesos)):
+        if png is not None:
+            imagenes[args[0]] = png
+    return imagenes
+
+
+def tarea_heatmap_informe(mediciones, estadistico=None):
+    # Heatmap simplificado del SSID más visto; None si no alcanzan los datos
+    if len(mediciones) < 3:
+        return None
+    ssid_comun = ssid_mas_comun(mediciones)
+    if ssid_comun is None:
+        return None
+
+    x, y, señal = datos_primer_bssid(mediciones, ssid_comun, estadistico)
+    if len(x) < 3:
+        return None
+
+    grid_x, grid_y = np.meshgrid(
+        np.linspace(min(x), max(x), 50),
+        np.linspace(min(y), max(y), 50)
+    )
+    try:
+        grid_z = interpolar(x, y, señal, grid_x, grid_y, 'cubic')
+    except Exception:
+        # Si falla la interpolación, ignoramos
+        return None
+    return (_grafico_heatmap, (ssid_comun, grid_x, grid_y, grid_z))
+
+
+@medido("informe.graficos")
+def _renderizar_imagenes(mediciones, procesos, max_puntos=None, estadistico=None):
+    # Heatmap y gráficos por SSID se renderizan juntos en el pool
+    tarea_heatmap = tarea_heatmap_informe(mediciones, estadistico)
+    tareas = tareas_graficos_analisis(mediciones, max_puntos, estadistico)
+    pngs = renderizar_graficos(([tarea_heatmap] if tarea_heatmap else []) + tareas, procesos)
+    heatmap_png = pngs.pop(0) if tarea_heatmap else None
+    imagenes = [(args[0], png) for (_, args), png in zip(tareas, pngs) if png is not None]
+    return heatmap_png, imagenes
+
+
+def _portada(pdf, heatmap_png):
+    pdf.add_page()
+    pdf.set_font("Arial", 'B', 16)
+    pdf.cell(0, 10, "Informe de Site Survey WiFi", ln=True, align="C")
+    pdf.ln(10)
+    pdf.set_font("Arial", size=12)
+
+    # Si tenemos un heatmap, lo añadimos al PDF
+    if heatmap_png:
+        pdf.image(io.BytesIO(heatmap_png), x=10, y=None, w=180)
+        pdf.ln(5)
+
+
+def _pagina_referencia(pdf):
+    pdf.add_page()
+    pdf.set_font("Arial", 'B', 14)
+    pdf.cell(0, 10, "Tabla de referencia de velocidad estimada", ln=True)
+    pdf.set_font("Arial", size=11)
+    for linea in TABLA_REFERENCIA:
+        pdf.cell(0, 8, linea, ln=True)
+
+
+def _paginas_graficos(pdf, imagenes):
+    for ssid, png in imagenes:
+        pdf.add_page()
+        pdf.set_font("Arial", 'B', 14)
+        pdf.cell(0, 10, f"Gráfico de Análisis - SSID: {ssid}", ln=True)
+        pdf.image(io.BytesIO(png), x=10, y=None, w=180)
+
+
+def _señal_red(red, estadistico):
+    # Señal (%) de una red según el estadístico elegido; las lecturas de un
+    # solo escaneo no traen estadísticos y usan la señal
+    return red.get(CLAVES_ESTADISTICO.get(estadistico), red.get("Señal", 0))
+
+
+def _detalle_muestras(red):
+    if red.get("Muestras", 1) <= 1:
+        return ""
+    return f" | {red['Muestras']} muestras ±{red.get('Desvio', 0) / 2:.1f} dB"
+
+
+def construir_informe_pdf(mediciones, file_name, procesos=None, estadistico=None):
+    mediciones = como_almacen(mediciones)
+    heatmap_png, imagenes = _renderizar_imagenes(mediciones, procesos, estadistico=estadistico)
+
+    pdf = FPDF()
+    _portada(pdf, heatmap_png)
+
+    total_velocidad = 0
+    total_puntos = 0
+    clasificacion_contador = {"Excelente": 0, "Buena": 0, "Regular": 0, "Mala": 0, "Crítica": 0}
+
+    for i, punto in enumerate(mediciones, 1):
+        x, y = punto['x_m'], punto['y_m']
+        pdf.set_font("Arial", 'B', 12)
+        pdf.cell(0, 10, f"Punto #{i} - Coordenadas: ({x} m, {y} m)", ln=True)
+
+        for red in punto['redes']:
+            ssid = red.get("SSID", "N/A")
+            bssid = red.get("BSSID", "N/A")
+            canal = red.get("Canal", "N/A")
+            banda = clasificar_banda(canal)
+
+            señal_dbm = señal_a_dbm(_señal_red(red, estadistico))
+            velocidad, clasificacion, tecnologia = estimar_velocidad_dbm(señal_dbm)
+            pdf.set_font("Arial", size=11)
+            pdf.cell(0, 8,
+                f"SSID: {ssid} | BSSID: {bssid} | Señal: {señal_dbm:.1f} dBm | "
+                f"Velocidad: {velocidad} Mbps | {clasificacion} ({tecnologia}) | "
+                f"Canal: {canal} | Banda: {banda}{_detalle_muestras(red)}",
+                ln=True
+            )
+
+            total_velocidad += velocidad
+            total_puntos += 1
+            clasificacion_contador[clasificacion] += 1
+        pdf.ln(4)
+
+    if total_puntos:
+        velocidad_prom = total_velocidad / total_puntos
+        pdf.set_font("Arial", 'B', 12)
+        pdf.cell(0, 10, f"Velocidad promedio estimada: {velocidad_prom:.2f} Mbps", ln=True)
+        for clas, count in clasificacion_contador.items():
+            porcentaje = (count / total_puntos) * 100
+            pdf.cell(0, 8, f"{clas}: {count} puntos ({porcentaje:.1f}%)", ln=True)
+
+    _pagina_referencia(pdf)
+    _paginas_graficos(pdf, imagenes)
+    with tramo("informe.escritura"):
+        pdf.output(file_name)
+
+
+# --- Informe resumido ---
+
+@medido("informe.resumen")
+def resumen_informe(mediciones, estadistico=None):
+    # Estadísticas del survey en una pasada vectorizada sobre las columnas:
+    # clases de velocidad, promedios, conteos por banda, por SSID y por punto
+    almacen = como_almacen(mediciones)
+    dbm = almacen.dbm(estadistico)
+    clase = clase_velocidad_dbm(dbm)
+    velocidad = VELOCIDADES_CLASE[clase]
+    banda = banda_canal(almacen.canal)
+    n_ssids = len(almacen.ssids)
+
+    por_ssid = []
+    if almacen.n_lecturas:
+        lecturas = np.bincount(almacen.ssid, minlength=n_ssids)
+        suma_dbm = np.bincount(almacen.ssid, weights=dbm, minlength=n_ssids)
+        suma_vel = np.bincount(almacen.ssid, weights=velocidad, minlength=n_ssids)
+        suma_desvio = np.bincount(almacen.ssid, weights=almacen.desvio / 2, minlength=n_ssids)
+        max_dbm = np.full(n_ssids, -np.inf)
+        np.maximum.at(max_dbm, almacen.ssid, dbm)
+        puntos = np.bincount(np.unique(almacen.punto.astype(np.int64) * n_ssids + almacen.ssid) % n_ssids,
+                             minlength=n_ssids)
+        for id_ssid in np.flatnonzero(lecturas):
+            por_ssid.append({
+                "SSID": almacen.ssids[id_ssid],
+                "bssids": len(almacen.bssids_de(int(id_ssid))),
+                "puntos": int(puntos[id_ssid]),
+                "lecturas": int(lecturas[id_ssid]),
+                "dbm_prom": float(suma_dbm[id_ssid] / lecturas[id_ssid]),
+                "dbm_max": float(max_dbm[id_ssid]),
+                "velocidad_prom": float(suma_vel[id_ssid] / lecturas[id_ssid]),
+                "desvio_prom": float(suma_desvio[id_ssid] / lecturas[id_ssid]),
+            })
+
+    # Mejor lectura de cada punto: ordenando por (punto, señal) la última de
+    # cada grupo es la más fuerte
+    _, offsets = almacen.lecturas_por_punto()
+    conteo = np.diff(offsets)
+    orden = np.lexsort((dbm, almacen.punto))
+    con_datos = conteo > 0
+    mejor = np.full(almacen.n_puntos, -1, dtype=np.int64)
+    mejor[con_datos] = orden[offsets[1:][con_datos] - 1]
+
+    return {
+        "puntos": almacen.n_puntos,
+        "lecturas": almacen.n_lecturas,
+        "muestras_prom": float(almacen.muestras.mean()) if almacen.n_lecturas else 0.0,
+        "velocidad_prom": float(velocidad.mean()) if almacen.n_lecturas else 0.0,
+        "por_clase": np.bincount(clase, minlength=len(CLASES_VELOCIDAD)),
+        "por_banda": np.bincount(banda, minlength=len(BANDAS)),
+        "por_ssid": por_ssid,
+        "redes_por_punto": conteo,
+        "mejor_lectura": mejor,
+    }
+
+
+def _fila_tabla(pdf, anchos, valores, alto=6, negrita=False):
+    pdf.set_font("Arial", 'B' if negrita else '', 9)
+    for ancho, valor in zip(anchos, valores):
+        pdf.cell(ancho, alto, str(valor), border=1)
+    pdf.ln(alto)
+
+
+def _tabla(pdf, encabezado, anchos, filas, alto=6):
+    # Tabla paginada: el encabezado se repite al empezar cada página
+    _fila_tabla(pdf, anchos, encabezado, alto, negrita=True)
+    for fila in filas:
+        if pdf.will_page_break(alto):
+            pdf.add_page()
+            _fila_tabla(pdf, anchos, encabezado, alto, negrita=True)
+        _fila_tabla(pdf, anchos, fila, alto)
+
+
+def _recortar(texto, largo=28):
+    return texto if len(texto) <= largo else texto[:largo - 3] + "..."
+
+
+def construir_informe_resumido(mediciones, file_name, ruta_anexo=None, procesos=None, estadistico=None):
+    # Informe compacto para surveys grandes: el tamaño depende de la cantidad
+    # de SSIDs y de puntos, no de las lecturas crudas
+    almacen = como_almacen(mediciones)
+    resumen = resumen_informe(almacen, estadistico)
+    heatmap_png, imagenes = _renderizar_imagenes(almacen, procesos, MAX_PUNTOS_GRAFICO_RESUMIDO, estadistico)
+    multimuestra = resumen["muestras_prom"] > 1
+
+    pdf = FPDF()
+    _portada(pdf, heatmap_png)
+
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(0, 8, f"Puntos medidos: {resumen['puntos']} | Lecturas: {resumen['lecturas']} | "
+                   f"SSIDs: {len(resumen['por_ssid'])}", ln=True)
+    if multimuestra:
+        pdf.set_font("Arial", size=11)
+        pdf.cell(0, 7, f"Muestras por lectura: {resumen['muestras_prom']:.1f} en promedio | "
+                       f"Estadístico: {estadistico or MEDIA}", ln=True)
+        pdf.set_font("Arial", 'B', 12)
+    if resumen["lecturas"]:
+        pdf.cell(0, 10, f"Velocidad promedio estimada: {resumen['velocidad_prom']:.2f} Mbps", ln=True)
+        pdf.set_font("Arial", size=11)
+        for (_, _, clas, _), count in zip(CLASES_VELOCIDAD, resumen["por_clase"]):
+            porcentaje = (count / resumen["lecturas"]) * 100
+            pdf.cell(0, 7, f"{clas}: {count} lecturas ({porcentaje:.1f}%)", ln=True)
+        pdf.ln(2)
+        for banda, count in zip(BANDAS, resumen["por_banda"]):
+            pdf.cell(0, 7, f"Banda {banda}: {count} lecturas", ln=True)
+    if ruta_anexo:
+        pdf.set_font("Arial", 'I', 10)
+        pdf.cell(0, 8, f"Listado completo de lecturas en: {os.path.basename(ruta_anexo)}", ln=True)
+
+    pdf.add_page()
+    pdf.set_font("Arial", 'B', 14)
+    pdf.cell(0, 10, "Resumen por SSID", ln=True)
+    encabezado = ["SSID", "BSSIDs", "Puntos", "Lecturas", "dBm prom.", "dBm máx.", "Mbps prom."]
+    anchos = [58, 18, 18, 20, 24, 24, 28]
+    if multimuestra:
+        # La variabilidad entre escaneos sólo tiene sentido con varias muestras
+        encabezado.append("± dB")
+        anchos = [46, 16, 16, 18, 22, 22, 24, 26]
+    _tabla(pdf, encabezado, anchos,
+           ([_recortar(f["SSID"], 22 if multimuestra else 28), f["bssids"], f["puntos"], f["lecturas"],
+             f"{f['dbm_prom']:.1f}", f"{f['dbm_max']:.1f}", f"{f['velocidad_prom']:.1f}"]
+            + ([f"{f['desvio_prom']:.1f}"] if multimuestra else []) for f in resumen["por_ssid"]))
+
+    pdf.add_page()
+    pdf.set_font("Arial", 'B', 14)
+    pdf.cell(0, 10, "Resumen por punto", ln=True)
+    dbm = almacen.dbm(estadistico)
+    clase = clase_velocidad_dbm(dbm)
+
+    def filas_puntos():
+        for i, (n, j) in enumerate(zip(resumen["redes_por_punto"], resumen["mejor_lectura"])):
+            if j < 0:
+                mejor = ["-", "-", "-"]
+            else:
+                mejor = [_recortar(almacen.ssids[almacen.ssid[j]], 24), f"{dbm[j]:.1f}", CLASES_VELOCIDAD[clase[j]][2]]
+            yield [i + 1, f"{almacen.x_m[i]:.2f}", f"{almacen.y_m[i]:.2f}", int(n)] + mejor
+
+    _tabla(pdf, ["#", "x (m)", "y (m)", "Redes", "Mejor SSID", "dBm", "Clasificación"],
+           [14, 20, 20, 16, 60, 20, 40], filas_puntos())
+
+    _pagina_referencia(pdf)
+    _paginas_graficos(pdf, imagenes)
+    with tramo("informe.escritura"):
+        pdf.output(file_name)
+
+    if ruta_anexo:
+        escribir_anexo_lecturas(almacen, ruta_anexo)
+
+
+@medido("informe.anexo")
+def escribir_anexo_lecturas(mediciones, ruta, puntos_por_bloque=PUNTOS_POR_BLOQUE_ANEXO):
+    # Listado crudo de todas las lecturas en CSV, escrito por bloques de
+    # puntos para no armar nunca la lista completa en memoria
+    almacen = como_almacen(mediciones)
+    orden, offsets = almacen.lecturas_por_punto()
+    dbm = almacen.dbm()
+    banda = banda_canal(almacen.canal)
+    with open(ruta, 'w', newline='', encoding='utf-8') as f:
+        escritor = csv.writer(f)
+        escritor.writerow(COLUMNAS_ANEXO)
+        for p0 in range(0, almacen.n_puntos, puntos_por_bloque):
+            p1 = min(p0 + puntos_por_bloque, almacen.n_puntos)
+            lecturas = orden[offsets[p0]:offsets[p1]]
+            puntos = almacen.punto[lecturas]
+            canales = almacen.canal[lecturas]
+            escritor.writerows(zip(
+                (puntos + 1).tolist(),
+                np.char.mod("%.2f", almacen.x_m[puntos]).tolist(),
+                np.char.mod("%.2f", almacen.y_m[puntos]).tolist(),
+                [almacen.ssids[k] for k in almacen.ssid[lecturas].tolist()],
+                [almacen.bssids[k] for k in almacen.bssid[lecturas].tolist()],
+                almacen.señal[lecturas].tolist(),
+                np.char.mod("%.1f", dbm[lecturas]).tolist(),
+                [c or "N/A" for c in canales.tolist()],
+                [BANDAS[b] for b in banda[lecturas].tolist()],
+                almacen.muestras[lecturas].tolist(),
+                np.char.mod("%.1f", almacen.estadistico(MEDIANA)[lecturas]).tolist(),
+                almacen.estadistico(MINIMO)[lecturas].tolist(),
+                almacen.estadistico(MAXIMO)[lecturas].tolist(),
+                np.char.mod("%.1f", almacen.desvio[lecturas] / 2).tolist(),
+            ))
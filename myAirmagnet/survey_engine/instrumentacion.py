@@ -0,0 +1,131 @@
+import bisect
+import cProfile
+import functools
+import json
+import threading
+import time
+
+# Tiempos de las etapas pesadas (escaneo, interpolación, dibujo, PDF).
+# Cada etapa va dentro de un tramo("grupo.etapa") que guarda siempre su
+# última duración, para mostrarla en la barra de estado; son dos lecturas del
+# reloj, así que el costo es despreciable frente a cualquier etapa medida.
+# El modo de perfilado es opcional: mientras está activo se acumula además un
+# histograma por etapa y corre cProfile (sólo en el hilo que lo activó, el de
+# la GUI). volcar_perfil() escribe los dos a disco y lo desactiva.
+
+LIMITES_HISTOGRAMA_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000]
+
+_ultimos = {}  # etapa -> segundos de la última vez
+_histogramas = {}  # etapa -> acumulados, sólo con el perfilado activo
+_perfil = None
+_lock = threading.Lock()
+
+
+class _Tramo:
+    __slots__ = ("nombre", "inicio")
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *excepcion):
+        segundos = time.perf_counter() - self.inicio
+        _ultimos[self.nombre] = segundos
+        if _perfil is not None:
+            _acumular(self.nombre, segundos)
+        return False
+
+
+def tramo(nombre):
+    return _Tramo(nombre)
+
+
+def medido(nombre):
+    # Decorador: toda la función es un tramo
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with _Tramo(nombre):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def _acumular(nombre, segundos):
+    ms = segundos * 1000
+    with _lock:
+        h = _histogramas.get(nombre)
+        if h is None:
+            h = _histogramas[nombre] = {
+                "cuenta": 0, "total_ms": 0.0, "min_ms": ms, "max_ms": ms,
+                "cubetas": [0] * (len(LIMITES_HISTOGRAMA_MS) + 1),
+            }
+        h["cuenta"] += 1
+        h["total_ms"] += ms
+        h["min_ms"] = min(h["min_ms"], ms)
+        h["max_ms"] = max(h["max_ms"], ms)
+        h["cubetas"][bisect.bisect_left(LIMITES_HISTOGRAMA_MS, ms)] += 1
+
+
+# --- Últimos tiempos ---
+
+def limpiar_tramos(grupo):
+    # Olvida los tiempos del grupo antes de empezar una operación, así el
+    # resumen no mezcla etapas de corridas anteriores
+    prefijo = grupo + "."
+    for nombre in [n for n in _ultimos if n.startswith(prefijo)]:
+        _ultimos.pop(nombre, None)
+
+
+def ultimos_tramos(grupo):
+    # [(etapa, segundos)] del grupo, en el orden en que se midieron
+    prefijo = grupo + "."
+    return [(n[len(prefijo):], s) for n, s in list(_ultimos.items()) if n.startswith(prefijo)]
+
+
+def _formatear(segundos):
+    return f"{segundos * 1000:.0f} ms" if segundos < 1 else f"{segundos:.1f} s"
+
+
+def resumen_tramos(grupo):
+    # Texto corto para la barra de estado: "datos 3 ms | interpolar 1.2 s"
+    return " | ".join(f"{etapa} {_formatear(s)}" for etapa, s in ultimos_tramos(grupo))
+
+
+# --- Perfilado opcional ---
+
+def activar_perfilado():
+    global _perfil
+    with _lock:
+        if _perfil is not None:
+            return
+        _histogramas.clear()
+        _perfil = cProfile.Profile()
+    _perfil.enable()
+
+
+def perfilado_activo():
+    return _perfil is not None
+
+
+def volcar_perfil(ruta_base):
+    # Escribe <ruta_base>.prof (para pstats/snakeviz) y <ruta_base>_tramos.json
+    # con los histogramas; devuelve las dos rutas o None si no estaba activo
+    global _perfil
+    with _lock:
+        perfil, _perfil = _perfil, None
+        histogramas = dict(_histogramas)
+    if perfil is None:
+        return None
+    perfil.disable()
+    ruta_prof = ruta_base + ".prof"
+    ruta_tramos = ruta_base + "_tramos.json"
+    perfil.dump_stats(ruta_prof)
+    for h in histogramas.values():
+        h["promedio_ms"] = h["total_ms"] / h["cuenta"]
+    with open(ruta_tramos, 'w', encoding='utf-8') as f:
+        json.dump({"limites_ms": LIMITES_HISTOGRAMA_MS, "etapas": histogramas}, f, indent=2, ensure_ascii=False)
+    return ruta_prof, ruta_tramos
@@ -0,0 +1,202 @@
+import numpy as np
+
+from .almacen import como_almacen, CANAL_DESCONOCIDO
+from .instrumentacion import tramo
+from .interpolacion import motor_compartido
+from .modelo import RUIDO_ESTIMADO
+
+# Interferencia co-canal y de canal adyacente según el canal de cada BSSID.
+# En cada celda (o punto medido) el AP que atiende es el BSSID más fuerte del
+# SSID elegido; interfieren todos los demás BSSIDs, de cualquier SSID,
+# incluidos los de la misma red en el mismo canal. La potencia de cada uno se
+# pesa por el solapamiento espectral entre su canal y el del que atiende:
+#   - 2.4 GHz: canales de 22 MHz separados 5 MHz, se solapan hasta 4-5
+#     canales de distancia (tabla por separación en pasos de 5 MHz);
+#   - 5 y 6 GHz: canales OFDM de 20 MHz sin solapamiento; el canal vecino
+#     sólo aporta la fuga de la máscara espectral (~-20 dB).
+# El ancho de canal real (40/80/160 MHz) no viene en los escaneos, así que se
+# asume 20 MHz. Las señales de todos los BSSIDs se apilan en un array
+# (BSSIDs x celdas) y la interferencia sale de dos productos matriciales con
+# la tabla de solapamiento, sin recorrer BSSIDs en Python.
+
+SOLAPAMIENTO_24 = np.array([1.0, 0.7272, 0.2714, 0.0375, 0.0054, 0.0008], dtype=np.float32)
+SOLAPAMIENTO_OFDM = {0: 1.0, 20: 0.01}  # separación en MHz -> fracción de potencia
+UMBRAL_CCA = -82.0  # dBm: un co-canal más fuerte que esto ocupa el canal (CSMA/CA)
+DBM_NO_OIDO = -100.0  # BSSID que no se vio en un punto
+BSSIDS_POR_BLOQUE = 32  # BSSIDs interpolados por vez (memoria acotada)
+CELDAS_POR_BLOQUE = 65536
+
+BANDA_24, BANDA_5, BANDA_6 = 0, 1, 2
+
+
+def frecuencia_canal(canal, frecuencia=0):
+    # MHz del centro del canal (0 si no se sabe). Con la frecuencia medida
+    # se usa esa; si no, se deduce del número de canal (2.4 o 5 GHz: los
+    # números de 6 GHz se repiten con los otros dos y sin frecuencia no se
+    # pueden distinguir)
+    canal = np.asarray(canal, dtype=np.int64)
+    frecuencia = np.broadcast_to(np.asarray(frecuencia, dtype=np.int64), canal.shape)
+    deducida = np.select(
+        [canal == 14, (canal >= 1) & (canal <= 13), (canal >= 32) & (canal <= 177)],
+        [2484, 2407 + 5 * canal, 5000 + 5 * canal], default=0,
+    )
+    return np.where(frecuencia > 0, frecuencia, deducida)
+
+
+def banda_frecuencia(frecuencia):
+    # BANDA_24, BANDA_5, BANDA_6 o -1 si no se sabe
+    f = np.asarray(frecuencia)
+    return np.select(
+        [(f >= 2400) & (f < 2500), (f >= 5150) & (f < 5925), (f >= 5925) & (f < 7125)],
+        [BANDA_24, BANDA_5, BANDA_6], default=-1,
+    )
+
+
+def matriz_solapamiento(frecuencias):
+    # (solapamiento, cocanal): fracción de la potencia de cada BSSID (columna)
+    # que cae en el canal de cada otro (fila), y si están en el mismo canal
+    f = np.asarray(frecuencias, dtype=np.int64)
+    banda = banda_frecuencia(f)
+    separacion = np.abs(f[:, None] - f[None, :])
+    conocida = (banda[:, None] == banda[None, :]) & (banda[:, None] >= 0)
+
+    solapamiento = np.zeros(separacion.shape, dtype=np.float32)
+    es_24 = conocida & (banda[:, None] == BANDA_24)
+    pasos = np.minimum(np.rint(separacion / 5).astype(np.int64), len(SOLAPAMIENTO_24))
+    tabla_24 = np.append(SOLAPAMIENTO_24, np.float32(0))
+    solapamiento[es_24] = tabla_24[pasos[es_24]]
+    for mhz, fraccion in SOLAPAMIENTO_OFDM.items():
+        solapamiento[conocida & ~es_24 & (separacion == mhz)] = fraccion
+    cocanal = conocida & (separacion == 0)
+    return solapamiento, cocanal
+
+
+def canales_por_bssid(mediciones):
+    # (canal, MHz) de cada BSSID del almacén, con la última lectura que lo traía
+    almacen = como_almacen(mediciones)
+    canal = np.full(len(almacen.bssids), CANAL_DESCONOCIDO, dtype=np.int64)
+    frecuencia = np.zeros(len(almacen.bssids), dtype=np.int64)
+    con_canal = almacen.canal != CANAL_DESCONOCIDO
+    canal[almacen.bssid[con_canal]] = almacen.canal[con_canal]
+    con_frecuencia = almacen.frecuencia > 0
+    frecuencia[almacen.bssid[con_frecuencia]] = almacen.frecuencia[con_frecuencia]
+    return canal, frecuencia_canal(canal, frecuencia)
+
+
+def señales_apiladas(mediciones, estadistico=None):
+    # (BSSIDs x puntos) en dBm, DBM_NO_OIDO donde el BSSID no se vio
+    almacen = como_almacen(mediciones)
+    dbm = np.full((len(almacen.bssids), almacen.n_puntos), DBM_NO_OIDO, dtype=np.float32)
+    dbm[almacen.bssid, almacen.punto] = almacen.dbm(estadistico)
+    return dbm
+
+
+def _servidores(almacen, ssid, bssid):
+    if bssid:
+        id_bssid = almacen.id_bssid(bssid)
+        return np.array([] if id_bssid is None else [id_bssid], dtype=np.int64)
+    if ssid is None:
+        return np.arange(len(almacen.bssids))
+    id_ssid = almacen.id_ssid(ssid)
+    return np.array(sorted(almacen.bssids_de(id_ssid)) if id_ssid is not None else [], dtype=np.int64)
+
+
+def _interferencia(dbm, servidores, solapamiento, cocanal, ruido_dbm):
+    # dbm: (BSSIDs x N). Devuelve dict de arrays (N,) para el mejor servidor
+    n = dbm.shape[1]
+    señal_servidores = dbm[servidores]
+    mejor = np.argmax(señal_servidores, axis=0)
+    columnas = np.arange(n)
+    señal = señal_servidores[mejor, columnas]
+
+    # El propio servidor no se interfiere a sí mismo
+    pesos = solapamiento[servidores].copy()
+    pesos[np.arange(len(servidores)), servidores] = 0
+    es_co = cocanal[servidores].copy()
+    es_co[np.arange(len(servidores)), servidores] = False
+    peso_co = np.where(es_co, pesos, 0).astype(np.float32)
+    peso_ady = np.where(es_co, 0, pesos).astype(np.float32)
+
+    mw = np.power(np.float32(10), dbm / np.float32(10))
+    mw[dbm <= DBM_NO_OIDO] = 0
+    co = (peso_co @ mw)[mejor, columnas]
+    ady = (peso_ady @ mw)[mejor, columnas]
+    audibles = (es_co.astype(np.float32) @ (dbm >= UMBRAL_CCA).astype(np.float32))[mejor, columnas]
+
+    ruido = 10 ** (ruido_dbm / 10)
+    with np.errstate(divide='ignore'):
+        return {
+            "señal": señal,
+            "servidor": servidores[mejor],
+            "cocanal": 10 * np.log10(co),
+            "adyacente": 10 * np.log10(ady),
+            "total": 10 * np.log10(co + ady),
+            "sinr": señal - 10 * np.log10(co + ady + ruido),
+            "cocanal_audibles": audibles.astype(np.int32),
+        }
+
+
+def _combinar(dbm, servidores, solapamiento, cocanal, ruido_dbm, dentro):
+    # Aplica _interferencia por bloques de columnas; NaN donde no hay datos
+    n = dbm.shape[1]
+    salida = _sin_servidor(n)
+    columnas = np.flatnonzero(dentro)
+    for i in range(0, len(columnas), CELDAS_POR_BLOQUE):
+        bloque = columnas[i:i + CELDAS_POR_BLOQUE]
+        for nombre, valores in _interferencia(dbm[:, bloque], servidores, solapamiento, cocanal, ruido_dbm).items():
+            salida[nombre][bloque] = valores
+    return salida
+
+
+def _sin_servidor(n):
+    salida = {nombre: np.full(n, np.nan, dtype=np.float32) for nombre in ("señal", "cocanal", "adyacente", "total", "sinr")}
+    salida["servidor"] = np.full(n, -1, dtype=np.int64)
+    salida["cocanal_audibles"] = np.full(n, -1, dtype=np.int32)
+    return salida
+
+
+def interferencia_en_puntos(mediciones, ssid=None, bssid=None, estadistico=None, ruido_dbm=RUIDO_ESTIMADO):
+    # Interferencia en cada punto medido con las señales vistas ahí. Sin
+    # ssid atiende el BSSID más fuerte de cualquier red. Las claves son las
+    # de mapa_interferencia; los puntos donde no se vio el SSID quedan en NaN.
+    almacen = como_almacen(mediciones)
+    servidores = _servidores(almacen, ssid, bssid)
+    if not len(servidores) or not almacen.n_puntos:
+        return _sin_servidor(almacen.n_puntos)
+    _, frecuencias = canales_por_bssid(almacen)
+    solapamiento, cocanal = matriz_solapamiento(frecuencias)
+    dbm = señales_apiladas(almacen, estadistico)
+    oido = (dbm[servidores] > DBM_NO_OIDO).any(axis=0)
+    return _combinar(dbm, servidores, solapamiento, cocanal, ruido_dbm, oido)
+
+
+def mapa_interferencia(mediciones, grid_x, grid_y, ssid=None, bssid=None, estadistico=None,
+                       ruido_dbm=RUIDO_ESTIMADO, motor=None):
+    # Interpola la señal de cada BSSID sobre la grilla (lineal, con la
+    # triangulación compartida) y calcula por celda: señal del que atiende,
+    # potencia co-canal, de canal adyacente y total (dBm), SINR (dB),
+    # co-canales por encima del umbral CCA y el BSSID que atiende. Arrays con
+    # la forma de grid_x; NaN fuera de la zona medida.
+    almacen = como_almacen(mediciones)
+    motor = motor or motor_compartido
+    forma = np.shape(grid_x)
+    servidores = _servidores(almacen, ssid, bssid)
+    if not len(servidores) or not almacen.n_puntos:
+        return {nombre: valores.reshape(forma) for nombre, valores in _sin_servidor(int(np.prod(forma))).items()}
+
+    with tramo("interferencia.apilar"):
+        _, frecuencias = canales_por_bssid(almacen)
+        solapamiento, cocanal = matriz_solapamiento(frecuencias)
+        por_punto = señales_apiladas(almacen, estadistico)
+    with tramo("interferencia.interpolar"):
+        dbm = np.empty((len(por_punto), int(np.prod(forma))), dtype=np.float32)
+        for b0 in range(0, len(por_punto), BSSIDS_POR_BLOQUE):
+            bloque = motor.interpolar_varios(
+                almacen.x_m, almacen.y_m, por_punto[b0:b0 + BSSIDS_POR_BLOQUE], grid_x, grid_y, 'linear'
+            )
+            dbm[b0:b0 + len(bloque)] = bloque.reshape(len(bloque), -1)
+    with tramo("interferencia.combinar"):
+        dentro = ~np.isnan(dbm[0])
+        dentro &= (dbm[servidores] > DBM_NO_OIDO).any(axis=0)
+        salida = _combinar(np.nan_to_num(dbm, nan=DBM_NO_OIDO), servidores, solapamiento, cocanal, ruido_dbm, dentro)
+    return {nombre: valores.reshape(forma) for nombre, valores in salida.items()}
@@ -0,0 +1,161 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from scipy.interpolate import CloughTocher2DInterpolator
+from scipy.spatial import Delaunay
+
+# Cache de grillas interpoladas con desalojo LRU acotado por cantidad de
+# entradas y por memoria. Las claves incluyen la revisión de las mediciones
+# del SSID, así que un resultado viejo nunca se devuelve: simplemente deja de
+# pedirse y se desaloja.
+
+
+class CacheInterpolacion:
+    def __init__(self, max_entradas=32, max_bytes=256 * 1024 * 1024):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self._entradas = OrderedDict()
+        self._por_base = {}  # clave sin revisión -> clave completa vigente
+        self._bytes = 0
+        self.aciertos = 0
+        self.fallos = 0
+
+    @staticmethod
+    def _tamaño(valor):
+        return sum(getattr(v, "nbytes", 0) for v in valor)
+
+    def obtener(self, base, revision, calcular):
+        # base: (ssid, bssid, modo, método, resolución, extensión)
+        clave = base + (revision,)
+        if clave in self._entradas:
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return self._entradas[clave]
+
+        self.fallos += 1
+        valor = calcular()
+        for arr in valor:
+            arr.setflags(write=False)  # compartido entre llamadas
+
+        # La versión anterior de la misma vista ya no sirve
+        anterior = self._por_base.pop(base, None)
+        if anterior is not None:
+            self._quitar(anterior)
+
+        self._entradas[clave] = valor
+        self._por_base[base] = clave
+        self._bytes += self._tamaño(valor)
+        while self._entradas and (len(self._entradas) > self.max_entradas or self._bytes > self.max_bytes):
+            viejo, _ = next(iter(self._entradas.items()))
+            self._quitar(viejo)
+            self._por_base.pop(viejo[:-1], None)
+        return valor
+
+    def _quitar(self, clave):
+        valor = self._entradas.pop(clave, None)
+        if valor is not None:
+            self._bytes -= self._tamaño(valor)
+
+    def invalidar(self):
+        self._entradas.clear()
+        self._por_base.clear()
+        self._bytes = 0
+
+    def __len__(self):
+        return len(self._entradas)
+
+
+# Triangulación compartida. griddata arma un Delaunay nuevo en cada llamada,
+# pero casi todos los SSID se ven en el mismo conjunto de puntos: acá se
+# triangula cada conjunto una vez y se reutiliza para todos los vectores de
+# valores. Para 'linear' además se cachean los simplices y pesos
+# baricéntricos de cada grilla, así evaluar es sólo una suma ponderada.
+
+def _huella(*arrays):
+    h = hashlib.blake2b(digest_size=16)
+    for arr in arrays:
+        arr = np.ascontiguousarray(arr, dtype=np.float64)
+        h.update(str(arr.shape).encode())
+        h.update(arr.tobytes())
+    return h.digest()
+
+
+class MotorInterpolacion:
+    def __init__(self, max_triangulaciones=16, max_grillas=8):
+        self.max_triangulaciones = max_triangulaciones
+        self.max_grillas = max_grillas
+        self._triangulaciones = OrderedDict()
+        self._pesos = OrderedDict()
+        self._lock = threading.Lock()
+        self.triangulaciones_calculadas = 0
+
+    @staticmethod
+    def _guardar(cache, clave, valor, maximo):
+        cache[clave] = valor
+        while len(cache) > maximo:
+            cache.popitem(last=False)
+
+    def triangulacion(self, x, y):
+        puntos = np.column_stack([np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)])
+        clave = _huella(puntos)
+        with self._lock:
+            tri = self._triangulaciones.get(clave)
+            if tri is not None:
+                self._triangulaciones.move_to_end(clave)
+                return clave, tri
+        tri = Delaunay(puntos)
+        with self._lock:
+            self.triangulaciones_calculadas += 1
+            self._guardar(self._triangulaciones, clave, tri, self.max_triangulaciones)
+        return clave, tri
+
+    def _pesos_grilla(self, clave_tri, tri, grid_x, grid_y):
+        clave = (clave_tri, _huella(grid_x, grid_y))
+        with self._lock:
+            pesos = self._pesos.get(clave)
+            if pesos is not None:
+                self._pesos.move_to_end(clave)
+                return pesos
+
+        xi = np.column_stack([np.ravel(grid_x), np.ravel(grid_y)])
+        simplex = tri.find_simplex(xi)
+        dentro = simplex >= 0
+        transform = tri.transform[simplex[dentro]]
+        b = np.einsum('ijk,ik->ij', transform[:, :2], xi[dentro] - transform[:, 2])
+        bary = np.column_stack([b, 1 - b.sum(axis=1)])
+        vertices = tri.simplices[simplex[dentro]]
+        pesos = (dentro, vertices, bary)
+        with self._lock:
+            self._guardar(self._pesos, clave, pesos, self.max_grillas)
+        return pesos
+
+    def interpolar_varios(self, x, y, valores, grid_x, grid_y, metodo='linear'):
+        # valores: (n_puntos,) o (n_vectores, n_puntos). Devuelve NaN fuera
+        # del casco convexo, igual que griddata.
+        valores = np.asarray(valores, dtype=np.float64)
+        un_vector = valores.ndim == 1
+        valores = np.atleast_2d(valores)
+        clave_tri, tri = self.triangulacion(x, y)
+        forma = np.shape(grid_x)
+
+        if metodo == 'linear':
+            dentro, vertices, bary = self._pesos_grilla(clave_tri, tri, grid_x, grid_y)
+            salida = np.full((len(valores), dentro.size), np.nan)
+            salida[:, dentro] = np.einsum('bij,ij->bi', valores[:, vertices], bary)
+        elif metodo == 'cubic':
+            salida = np.stack([
+                CloughTocher2DInterpolator(tri, v)(grid_x, grid_y).ravel() for v in valores
+            ])
+        else:
+            raise ValueError(f"Método de interpolación no soportado: {metodo}")
+
+        salida = salida.reshape((len(valores),) + forma)
+        return salida[0] if un_vector else salida
+
+    def interpolar(self, x, y, valores, grid_x, grid_y, metodo='linear'):
+        return self.interpolar_varios(x, y, valores, grid_x, grid_y, metodo)
+
+
+motor_compartido = MotorInterpolacion()
@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+from .almacen import AlmacenMediciones
+from .carga import leer_survey
+
+# Journal de la sesión: cada evento (medición, AP, calibración, plano...) se
+# agrega como una línea JSON al final del archivo en el momento en que pasa.
+# Escribir un punto cuesta lo mismo sin importar el tamaño del survey, y si la
+# aplicación se cae se recupera todo reproduciendo el archivo.
+#
+# Cada línea se pasa al sistema operativo enseguida (flush), así que un cierre
+# inesperado del programa no pierde nada; el fsync a disco, que es lo caro, se
+# hace por lotes cada `fsync_cada` eventos o `fsync_intervalo` segundos.
+#
+# Un survey cargado de un archivo no se copia línea por línea al journal: se
+# archiva una copia en `surveys/` junto al journal, con el nombre de su hash
+# SHA-256, y el evento guarda la copia y el hash. Al recuperar se carga esa
+# copia y sólo si el hash coincide; si no, la reproducción se corta ahí (los
+# eventos que siguen dependen de los índices de esos puntos).
+
+EVENTO_PLANO = "plano"
+EVENTO_ESCALA = "escala"
+EVENTO_AP = "ap"
+EVENTO_MOVER_AP = "mover_ap"
+EVENTO_MEDICION = "medicion"
+EVENTO_FUSION = "fusion"
+EVENTO_CONFIG_FUSION = "config_fusion"
+EVENTO_SURVEY = "survey"  # mediciones cargadas de un archivo exportado
+CARPETA_SURVEYS = "surveys"
+
+
+class JournalInconsistente(ValueError):
+    # La sesión no se puede reproducir completa. `estado` tiene lo
+    # reconstruido hasta el evento anterior al que falló
+    def __init__(self, mensaje, estado):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+def huella_archivo(ruta):
+    h = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+class JournalSesion:
+    def __init__(self, ruta, fsync_cada=20, fsync_intervalo=2.0):
+        self.ruta = ruta
+        self.fsync_cada = fsync_cada
+        self.fsync_intervalo = fsync_intervalo
+        self._sin_sincronizar = 0
+        self._ultimo_fsync = time.monotonic()
+
+        carpeta = os.path.dirname(os.path.abspath(ruta))
+        os.makedirs(carpeta, exist_ok=True)
+        self._archivo = open(ruta, 'a', encoding='utf-8')
+        # Si la última línea quedó cortada por un corte, se arranca en una
+        # línea nueva para no pegarle el próximo evento
+        if self._archivo.tell() > 0 and not _termina_en_salto(ruta):
+            self._archivo.write("\n")
+
+    def registrar(self, tipo, **datos):
+        datos["evento"] = tipo
+        self._archivo.write(json.dumps(datos, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._archivo.flush()
+        self._sin_sincronizar += 1
+        if (self._sin_sincronizar >= self.fsync_cada
+                or time.monotonic() - self._ultimo_fsync >= self.fsync_intervalo):
+            self.sincronizar()
+
+    def sincronizar(self):
+        if self._archivo.closed:
+            return
+        self._archivo.flush()
+        os.fsync(self._archivo.fileno())
+        self._sin_sincronizar = 0
+        self._ultimo_fsync = time.monotonic()
+
+    def reiniciar(self):
+        # Survey nuevo: el journal anterior ya no hace falta. Quien lo llama
+        # vuelve a registrar lo que sigue valiendo (plano, APs)
+        self._archivo.close()
+        self._archivo = open(self.ruta, 'w', encoding='utf-8')
+        self.sincronizar()
+        shutil.rmtree(self.carpeta_surveys, ignore_errors=True)
+
+    @property
+    def carpeta_surveys(self):
+        return os.path.join(os.path.dirname(os.path.abspath(self.ruta)), CARPETA_SURVEYS)
+
+    def archivar_survey(self, ruta):
+        # Copia el survey junto al journal y devuelve (copia, hash). Se carga
+        # la copia, así lo que se recupera es exactamente lo que se cargó
+        return archivar_survey(ruta, self.carpeta_surveys)
+
+    def cerrar(self):
+        if not self._archivo.closed:
+            self.sincronizar()
+            self._archivo.close()
+
+
+def archivar_survey(ruta, carpeta):
+    os.makedirs(carpeta, exist_ok=True)
+    temporal = os.path.join(carpeta, f".copia-{os.getpid()}.tmp")
+    shutil.copyfile(ruta, temporal)
+    huella = huella_archivo(temporal)
+    copia = os.path.join(carpeta, huella + ".json")
+    os.replace(temporal, copia)
+    return copia, huella
+
+
+def _termina_en_salto(ruta):
+    with open(ruta, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def leer_eventos(ruta):
+    # Las líneas incompletas o corruptas (p. ej. la última tras un corte de
+    # luz) se saltean
+    with open(ruta, 'r', encoding='utf-8') as f:
+        for linea in f:
+            linea = linea.strip()
+            if not linea:
+                continue
+            try:
+                yield json.loads(linea)
+            except json.JSONDecodeError:
+                print(f"Línea inválida en el journal, se ignora: {linea[:80]}")
+
+
+def reproducir_journal(ruta):
+    # Devuelve el estado de la sesión: plano, escala (y los dos puntos con los
+    # que se calibró), APs y un AlmacenMediciones con las mediciones
+    estado = {"plano": None, "escala": None, "calibracion": None, "aps": [], "mediciones": AlmacenMediciones()}
+    if not os.path.exists(ruta):
+        return estado
+    mediciones = estado["mediciones"]
+
+    for evento in leer_eventos(ruta):
+        tipo = evento.get("evento")
+        if tipo == EVENTO_MEDICION:
+            mediciones.agregar_medicion(evento["x_m"], evento["y_m"], evento["redes"])
+        elif tipo == EVENTO_FUSION:
+            if 0 <= evento["punto"] < len(mediciones):
+                mediciones.fusionar_medicion(evento["punto"], evento["redes"])
+        elif tipo == EVENTO_AP:
+            estado["aps"].append({"nombre": evento["nombre"], "x_px": evento["x_px"], "y_px": evento["y_px"]})
+        elif tipo == EVENTO_MOVER_AP:
+            if 0 <= evento["indice"] < len(estado["aps"]):
+                estado["aps"][evento["indice"]].update(x_px=evento["x_px"], y_px=evento["y_px"])
+        elif tipo == EVENTO_ESCALA:
+            estado["escala"] = evento["px_m"]
+            estado["calibracion"] = evento.get("puntos"), evento.get("metros")
+        elif tipo == EVENTO_PLANO:
+            estado["plano"] = evento["ruta"]
+        elif tipo == EVENTO_CONFIG_FUSION:
+            mediciones.configurar_fusion(evento["radio"], evento["politica"])
+        elif tipo == EVENTO_SURVEY:
+            _reproducir_survey(evento, estado)
+    return estado
+
+
+def _reproducir_survey(evento, estado):
+    copia, huella = evento.get("copia"), evento.get("huella")
+    origen = evento.get("origen", evento.get("ruta"))
+    if not copia or not huella:
+        motivo = "el journal no guardó una copia del archivo"
+    elif not os.path.exists(copia):
+        motivo = "falta la copia archivada del archivo"
+    elif huella_archivo(copia) != huella:
+        motivo = "la copia archivada del archivo cambió"
+    else:
+        motivo = None
+    if motivo is None:
+        try:
+            nuevo = leer_survey(copia)
+        except (OSError, ValueError) as e:
+            motivo = f"no se pudo leer la copia archivada ({e})"
+    if motivo is not None:
+        raise JournalInconsistente(f"No se puede reproducir la carga del survey {origen}: {motivo}.", estado)
+    if evento.get("reemplazar"):
+        estado["mediciones"].clear()
+    estado["mediciones"].agregar_almacen(nuevo)
@@ -0,0 +1,118 @@
+import json
+
+import numpy as np
+
+# Modelo de mediciones del survey.
+# Cada medición es un dict {"x_m", "y_m", "redes"} y cada red un dict
+# {"SSID", "BSSID", "Señal", "Canal"}; es el mismo formato que se exporta
+# a mediciones.json.
+
+RUIDO_ESTIMADO = -95  # dBm, piso de ruido asumido para el SNR
+
+
+def señal_a_dbm(señal):
+    # nmcli y netsh reportan calidad en %, la pasamos a dBm aproximado
+    return (señal / 2) - 100
+
+
+# (umbral dBm, velocidad Mbps, clasificación, tecnología), de mejor a peor
+CLASES_VELOCIDAD = [
+    (-50, 400, "Excelente", "802.11ac/n 5GHz"),
+    (-65, 100, "Buena", "802.11n/g"),
+    (-75, 35, "Regular", "802.11g/b"),
+    (-85, 8, "Mala", "802.11b"),
+    (None, 0.5, "Crítica", "Sin conexión"),
+]
+VELOCIDADES_CLASE = np.array([c[1] for c in CLASES_VELOCIDAD])
+
+
+def clase_velocidad_dbm(dbm):
+    # Índice en CLASES_VELOCIDAD de cada señal en dBm (acepta arrays)
+    umbrales = np.array([c[0] for c in CLASES_VELOCIDAD[:-1]], dtype=np.float64)
+    return np.searchsorted(-umbrales, -np.asarray(dbm, dtype=np.float64), side='left')
+
+
+def estimar_velocidad_dbm(señal):
+    # (velocidad Mbps, clasificación, tecnología) de la clase de la señal
+    return CLASES_VELOCIDAD[int(clase_velocidad_dbm(señal))][1:]
+
+
+def clasificar_banda(canal):
+    try:
+        canal = int(canal)
+        if 1 <= canal <= 14:
+            return "2.4 GHz"
+        elif 36 <= canal <= 165:
+            return "5 GHz"
+    except (TypeError, ValueError):
+        pass
+    return "Desconocido"
+
+
+BANDAS = ["2.4 GHz", "5 GHz", "Desconocido"]
+
+
+def banda_canal(canal):
+    # Versión vectorizada de clasificar_banda sobre canales enteros (0 =
+    # desconocido): índice en BANDAS
+    canal = np.asarray(canal)
+    return np.select(
+        [(canal >= 1) & (canal <= 14), (canal >= 36) & (canal <= 165)],
+        [0, 1], default=2,
+    )
+
+
+def crear_medicion(x_m, y_m, redes):
+    return {
+        "x_m": round(x_m, 2),
+        "y_m": round(y_m, 2),
+        "redes": redes
+    }
+
+
+def resumir_muestras(escaneos):
+    # Junta varios escaneos del mismo punto en una red por BSSID con el
+    # resumen de sus señales (Muestras, Media, Mediana, Min, Max, Desvio).
+    # "Señal" queda en la media redondeada, así el resto del código la usa
+    # igual que una lectura suelta. Las muestras crudas se descartan.
+    por_bssid = {}
+    errores = []
+    for redes in escaneos:
+        for red in redes:
+            if "error" in red:
+                errores.append(red)
+                continue
+            base, señales = por_bssid.setdefault(red.get("BSSID", "N/A"), (red, []))
+            señales.append(red.get("Señal", 0))
+    if not por_bssid:
+        return errores[-1:]
+
+    resumen = []
+    for base, señales in por_bssid.values():
+        señales = np.asarray(señales, dtype=np.float64)
+        media = float(señales.mean())
+        resumen.append(dict(
+            base,
+            Señal=int(round(media)),
+            Muestras=len(señales),
+            Media=round(media, 2),
+            Mediana=round(float(np.median(señales)), 2),
+            Min=int(señales.min()),
+            Max=int(señales.max()),
+            Desvio=round(float(señales.std()), 2),
+        ))
+    return resumen
+
+
+def es_punto_duplicado(mediciones, x_m, y_m):
+    return any(m["x_m"] == x_m and m["y_m"] == y_m for m in mediciones)
+
+
+def guardar_mediciones(mediciones, ruta):
+    with open(ruta, 'w') as f:
+        json.dump(list(mediciones), f, indent=2)
+
+
+def cargar_mediciones(ruta):
+    with open(ruta, 'r') as f:
+        return json.load(f)
@@ -0,0 +1,244 @@
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .cobertura import TX_POWER, RSSI_PISO
+from .instrumentacion import medido, tramo
+from .paredes import DB_POR_PARED, contar_cruces, _reducir_mascara
+
+# Ubicación automática de APs.
+# El plano se evalúa en una grilla gruesa de celdas y los APs sólo pueden ir
+# en una grilla de posiciones candidatas. Primero se calcula, una sola vez, el
+# RSSI de cada candidato en cada celda (en paralelo en varios procesos, es la
+# parte cara) y se guarda como int8 en dBm. Con esa matriz:
+#   - greedy: se agrega de a uno el candidato que más celdas nuevas lleva al
+#     RSSI objetivo (desempata la mejora en dB de las que siguen debajo, y
+#     si aún empatan, como cuando cualquiera cubre todo, el RSSI total: el
+#     margen por encima del objetivo);
+#   - refinamiento local: cada AP se prueba en los candidatos vecinos y se
+#     mueve si la cobertura total mejora, hasta que ninguno mejore.
+# Cada paso evalúa todos los candidatos juntos con operaciones vectorizadas.
+# El modelo de propagación es una función (ap_x, ap_y, celdas_x, celdas_y)
+# -> dBm; por defecto el mismo FSPL que cobertura_fspl, y ModeloConParedes
+# para sumar la atenuación de las paredes del plano como la cobertura estimada.
+
+RSSI_OBJETIVO = -67.0  # dBm, lo habitual para voz y video
+MAX_CELDAS = 20000  # la grilla de evaluación se agranda para no pasarse
+MAX_CANDIDATOS = 4000
+CANDIDATOS_POR_BLOQUE = 256
+MIN_BLOQUES_PARALELO = 4
+FILAS_POR_PASADA = 512  # filas de la matriz evaluadas por vez (memoria acotada)
+RADIO_REFINAMIENTO = 2  # en pasos de la grilla de candidatos
+MAX_PASADAS_REFINAMIENTO = 10
+LADO_MAX_PAREDES = 100  # celdas de pared en el lado mayor, para los rayos de los candidatos
+
+
+def rssi_fspl(ap_x, ap_y, celdas_x, celdas_y, tx_power=TX_POWER, rssi_min=RSSI_PISO):
+    # Matriz (APs x celdas) en dBm, coordenadas en metros
+    d2 = (np.asarray(ap_x, dtype=np.float32)[:, None] - celdas_x[None, :]) ** 2
+    d2 += (np.asarray(ap_y, dtype=np.float32)[:, None] - celdas_y[None, :]) ** 2
+    np.maximum(d2, 1, out=d2)
+    rssi = np.log10(d2, out=d2)
+    rssi *= -10
+    rssi += tx_power
+    return np.maximum(rssi, rssi_min, out=rssi)
+
+
+class ModeloConParedes:
+    # FSPL menos `db_por_pared` por cada pared que cruza el rayo del AP a la
+    # celda, como cobertura_fspl con paredes. Los rayos de miles de
+    # candidatos se cuentan sobre la grilla del MapaParedes reducida a
+    # `lado_max` celdas (máximo por bloques: las paredes finas no se
+    # pierden). Sólo guarda arrays, así que se puede mandar a otros procesos.
+    def __init__(self, paredes, escala, db_por_pared=DB_POR_PARED, lado_max=LADO_MAX_PAREDES,
+                 tx_power=TX_POWER, rssi_min=RSSI_PISO):
+        reduccion = max(1, int(math.ceil(max(paredes.celdas.shape) / lado_max)))
+        self.celdas = _reducir_mascara(paredes.celdas, reduccion)
+        self.m_por_celda = paredes.factor * reduccion / escala
+        self.db_por_pared = db_por_pared
+        self.tx_power = tx_power
+        self.rssi_min = rssi_min
+
+    def _indices(self, x_m, y_m):
+        alto, ancho = self.celdas.shape
+        filas = np.minimum((np.asarray(y_m) / self.m_por_celda).astype(np.intp), alto - 1)
+        columnas = np.minimum((np.asarray(x_m) / self.m_por_celda).astype(np.intp), ancho - 1)
+        return filas, columnas
+
+    def __call__(self, ap_x, ap_y, celdas_x, celdas_y):
+        rssi = rssi_fspl(ap_x, ap_y, celdas_x, celdas_y, self.tx_power, -np.inf)
+        filas, columnas = self._indices(celdas_x, celdas_y)
+        # El rayo sale del centro de la celda del AP, como en MapaParedes.cruces
+        for k, (fila, columna) in enumerate(zip(*self._indices(ap_x, ap_y))):
+            cruces = contar_cruces(self.celdas, columna + 0.5, fila + 0.5)
+            rssi[k] -= cruces[filas, columnas] * np.float32(self.db_por_pared)
+        return np.maximum(rssi, self.rssi_min, out=rssi)
+
+
+def _lado_grilla(ancho_m, alto_m, lado_m, maximo):
+    # Agranda el lado de la celda hasta que la grilla no supere `maximo`
+    if lado_m is None:
+        lado_m = 1.0
+    return max(lado_m, math.sqrt(ancho_m * alto_m / maximo))
+
+
+def _grilla(ancho_m, alto_m, lado_m, escala, zona):
+    xs = np.arange(lado_m / 2, ancho_m, lado_m, dtype=np.float32)
+    ys = np.arange(lado_m / 2, alto_m, lado_m, dtype=np.float32)
+    gx, gy = (g.ravel() for g in np.meshgrid(xs, ys))
+    if zona is not None:
+        # zona: máscara booleana (alto_px, ancho_px) de lo que cuenta
+        filas = np.minimum((gy * escala).astype(np.int64), zona.shape[0] - 1)
+        columnas = np.minimum((gx * escala).astype(np.int64), zona.shape[1] - 1)
+        adentro = zona[filas, columnas]
+        gx, gy = gx[adentro], gy[adentro]
+    return gx, gy
+
+
+def _bloque_rssi(modelo, ap_x, ap_y, celdas_x, celdas_y):
+    return np.rint(modelo(ap_x, ap_y, celdas_x, celdas_y)).astype(np.int8)
+
+
+def _matriz_candidatos(modelo, cand_x, cand_y, celdas_x, celdas_y, procesos):
+    bloques = [(modelo, cand_x[i:i + CANDIDATOS_POR_BLOQUE], cand_y[i:i + CANDIDATOS_POR_BLOQUE], celdas_x, celdas_y)
+               for i in range(0, len(cand_x), CANDIDATOS_POR_BLOQUE)]
+    if procesos is None:
+        procesos = min(os.cpu_count() or 1, 8)
+    if procesos > 1 and len(bloques) >= MIN_BLOQUES_PARALELO:
+        try:
+            # 'spawn' por lo mismo que en el informe: nada de hilos ni Qt heredados
+            contexto = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto) as pool:
+                return np.concatenate(list(pool.map(_bloque_rssi, *zip(*bloques))))
+        except Exception as e:
+            print(f"No se pudo evaluar en paralelo, se sigue en serie: {str(e)}")
+    return np.concatenate([_bloque_rssi(*b) for b in bloques])
+
+
+def _ganancias(matriz, mejor, objetivo):
+    # Por candidato: celdas que pasarían a cubrirse y mejora (en dB, hasta el
+    # objetivo) de las que quedan por debajo. Por tandas de filas.
+    nuevas = np.empty(len(matriz), dtype=np.int64)
+    mejora = np.empty(len(matriz), dtype=np.float64)
+    falta = mejor < objetivo
+    techo = np.minimum(mejor, objetivo)
+    for i in range(0, len(matriz), FILAS_POR_PASADA):
+        filas = matriz[i:i + FILAS_POR_PASADA, falta]
+        nuevas[i:i + len(filas)] = (filas >= objetivo).sum(axis=1)
+        mejora[i:i + len(filas)] = np.maximum(np.minimum(filas, objetivo) - techo[falta], 0).sum(axis=1)
+    return nuevas, mejora
+
+
+def _puntaje(cubiertas, mejora, n_celdas):
+    # Orden lexicográfico: primero celdas cubiertas, después la mejora en dB
+    return cubiertas + mejora / (n_celdas * 200.0 + 1)
+
+
+def _rssi_total(matriz, mejor, candidatos):
+    # Suma del RSSI de todas las celdas con cada candidato agregado. Cuenta
+    # también lo que pasa del objetivo, que _ganancias no ve
+    total = np.empty(len(candidatos), dtype=np.int64)
+    for i in range(0, len(candidatos), FILAS_POR_PASADA):
+        bloque = candidatos[i:i + FILAS_POR_PASADA]
+        total[i:i + len(bloque)] = np.maximum(matriz[bloque], mejor).sum(axis=1, dtype=np.int64)
+    return total
+
+
+def _desempatar(matriz, mejor, candidatos, puntajes):
+    # Entre los de mejor puntaje, el de más RSSI total (el primero si siguen
+    # empatados). Sólo se suma sobre los empatados
+    empatados = np.flatnonzero(puntajes == puntajes.max())
+    if len(empatados) == 1:
+        return int(empatados[0])
+    return int(empatados[np.argmax(_rssi_total(matriz, mejor, candidatos[empatados]))])
+
+
+def _refinar(matriz, elegidos, base, objetivo, vecinos):
+    # Mueve cada AP al candidato vecino que más mejora la cobertura total
+    n_celdas = matriz.shape[1]
+    for _ in range(MAX_PASADAS_REFINAMIENTO):
+        movido = False
+        for k in range(len(elegidos)):
+            otros = [elegidos[j] for j in range(len(elegidos)) if j != k]
+            sin_k = np.maximum.reduce([base] + [matriz[c] for c in otros]).astype(np.int16)
+            opciones = vecinos(elegidos[k])
+            filas = np.maximum(matriz[opciones], sin_k)
+            cubiertas = (filas >= objetivo).sum(axis=1)
+            margen = np.minimum(filas, objetivo).sum(axis=1, dtype=np.float64) - np.minimum(sin_k, objetivo).sum()
+            puntajes = _puntaje(cubiertas, margen, n_celdas)
+            totales = filas.sum(axis=1, dtype=np.int64)
+            actual = int(np.flatnonzero(opciones == elegidos[k])[0])
+            empatados = np.flatnonzero(puntajes == puntajes.max())
+            mejor_opcion = int(empatados[np.argmax(totales[empatados])])
+            if (puntajes[mejor_opcion], totales[mejor_opcion]) > (puntajes[actual], totales[actual]):
+                elegidos[k] = int(opciones[mejor_opcion])
+                movido = True
+        if not movido:
+            break
+    return elegidos
+
+
+@medido("optimizacion.total")
+def optimizar_aps(ancho_px, alto_px, escala, max_aps, rssi_objetivo=RSSI_OBJETIVO, cobertura_deseada=1.0,
+                  fijos=None, zona=None, celda_m=None, paso_candidatos_m=None, modelo=rssi_fspl,
+                  refinar=True, procesos=None):
+    # Propone hasta `max_aps` posiciones (en metros) para cubrir el plano con
+    # al menos `rssi_objetivo`. `fijos` son APs ya ubicados, en metros, que se
+    # respetan; `zona` es una máscara (alto_px, ancho_px) del área a cubrir.
+    # Se detiene antes si alcanza `cobertura_deseada` (fracción de celdas).
+    # `modelo` tiene que poder mandarse a otros procesos (función de módulo
+    # o functools.partial).
+    ancho_m, alto_m = ancho_px / escala, alto_px / escala
+    celda_m = _lado_grilla(ancho_m, alto_m, celda_m, MAX_CELDAS)
+    paso_candidatos_m = _lado_grilla(ancho_m, alto_m, paso_candidatos_m or 2 * celda_m, MAX_CANDIDATOS)
+    celdas_x, celdas_y = _grilla(ancho_m, alto_m, celda_m, escala, zona)
+    cand_x, cand_y = _grilla(ancho_m, alto_m, paso_candidatos_m, escala, zona)
+    objetivo = int(round(rssi_objetivo))
+    if not len(celdas_x) or not len(cand_x):
+        raise ValueError("No hay área para cubrir con esta zona y escala.")
+
+    with tramo("optimizacion.candidatos"):
+        matriz = _matriz_candidatos(modelo, cand_x, cand_y, celdas_x, celdas_y, procesos)
+
+    base = np.full(len(celdas_x), -128, dtype=np.int8)
+    if fijos:
+        fx, fy = zip(*fijos)
+        base = np.maximum(base, _bloque_rssi(modelo, np.array(fx), np.array(fy), celdas_x, celdas_y).max(axis=0))
+
+    elegidos = []
+    mejor = base.copy()
+    historial = []  # (APs, cobertura) después de cada AP agregado
+    with tramo("optimizacion.greedy"):
+        while len(elegidos) < max_aps and (mejor >= objetivo).mean() < cobertura_deseada:
+            nuevas, mejora = _ganancias(matriz, mejor, objetivo)
+            puntajes = _puntaje(nuevas, mejora, len(celdas_x))
+            c = _desempatar(matriz, mejor, np.arange(len(matriz)), puntajes)
+            if puntajes[c] <= 0:
+                break  # ningún candidato suma nada
+            elegidos.append(c)
+            np.maximum(mejor, matriz[c], out=mejor)
+            historial.append((len(elegidos), float((mejor >= objetivo).mean())))
+
+    if refinar and elegidos:
+        radio2 = (RADIO_REFINAMIENTO * paso_candidatos_m * 1.01) ** 2
+
+        def vecinos(c):
+            return np.flatnonzero((cand_x - cand_x[c]) ** 2 + (cand_y - cand_y[c]) ** 2 <= radio2)
+
+        with tramo("optimizacion.refinamiento"):
+            elegidos = _refinar(matriz, elegidos, base, objetivo, vecinos)
+            mejor = np.maximum.reduce([base] + [matriz[c] for c in elegidos])
+
+    return {
+        "aps": [(float(cand_x[c]), float(cand_y[c])) for c in elegidos],
+        "cobertura": float((mejor >= objetivo).mean()),
+        "rssi_objetivo": objetivo,
+        "celda_m": celda_m,
+        "celdas_x": celdas_x,
+        "celdas_y": celdas_y,
+        "rssi": mejor,
+        "historial": historial,
+    }
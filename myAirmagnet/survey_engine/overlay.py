@@ -0,0 +1,133 @@
+import math
+
+import numpy as np
+from scipy.spatial import Delaunay, QhullError
+
+from .heatmap import DBM_MIN, DBM_MAX
+from .render import colorear
+
+# Heatmap en vivo para superponer al plano mientras se mide.
+# Usa una triangulación de Delaunay incremental: al agregar un punto sólo
+# cambian los triángulos que lo tocan, así que se reinterpolan únicamente las
+# celdas de la grilla dentro de ese entorno y no el plano entero.
+
+ALFA_OVERLAY = 150
+
+
+class HeatmapIncremental:
+    def __init__(self, ancho_px, alto_px, escala, celda_px=8, vmin=DBM_MIN, vmax=DBM_MAX, cmap="jet"):
+        self.escala = escala
+        self.celda_px = celda_px
+        self.nx = max(1, math.ceil(ancho_px / celda_px))
+        self.ny = max(1, math.ceil(alto_px / celda_px))
+        self.vmin = vmin
+        self.vmax = vmax
+        self.cmap = cmap
+
+        # Centros de celda en metros
+        self._cx = (np.arange(self.nx) + 0.5) * celda_px / escala
+        self._cy = (np.arange(self.ny) + 0.5) * celda_px / escala
+
+        self.valores = np.full((self.ny, self.nx), np.nan, dtype=np.float32)
+        self.rgba = np.zeros((self.ny, self.nx, 4), dtype=np.uint8)
+
+        self._xy = []
+        self._v = []
+        self._vertice_de_punto = {}
+        self._tri = None
+
+    def __len__(self):
+        return len(self._xy)
+
+    def actualizar_punto(self, id_punto, x_m, y_m, valor):
+        # Agrega un punto nuevo o cambia el valor de uno existente (p. ej.
+        # tras promediar un escaneo). Devuelve la región de celdas modificada
+        # como (fila0, fila1, col0, col1) o None si no cambió nada visible.
+        k = self._vertice_de_punto.get(id_punto)
+        if k is not None:
+            self._v[k] = valor
+            return self._recalcular_entorno(k)
+
+        k = len(self._xy)
+        self._vertice_de_punto[id_punto] = k
+        self._xy.append((x_m, y_m))
+        self._v.append(valor)
+
+        if self._tri is None:
+            try:
+                self._tri = Delaunay(np.array(self._xy), incremental=True)
+            except (QhullError, ValueError):
+                return None  # menos de 3 puntos o todos alineados
+            return self._recalcular(0, self.ny, 0, self.nx)
+
+        self._tri.add_points(np.array([[x_m, y_m]]))
+        return self._recalcular_entorno(k)
+
+    def actualizar_puntos(self, ids, xs, ys, valores):
+        # Varios puntos juntos (p. ej. un tramo de recorrido continuo): una
+        # sola inserción en la triangulación y un solo recálculo del entorno
+        # de todos ellos
+        nuevos = []
+        tocados = []
+        for id_punto, x_m, y_m, valor in zip(ids, xs, ys, valores):
+            k = self._vertice_de_punto.get(id_punto)
+            if k is None:
+                k = len(self._xy)
+                self._vertice_de_punto[id_punto] = k
+                self._xy.append((x_m, y_m))
+                nuevos.append((x_m, y_m))
+                self._v.append(valor)
+            else:
+                self._v[k] = valor
+            tocados.append(k)
+        if not tocados:
+            return None
+
+        if self._tri is None:
+            try:
+                self._tri = Delaunay(np.array(self._xy), incremental=True)
+            except (QhullError, ValueError):
+                return None
+            return self._recalcular(0, self.ny, 0, self.nx)
+        if nuevos:
+            self._tri.add_points(np.array(nuevos))
+        return self._recalcular_entorno(tocados)
+
+    def _recalcular_entorno(self, k):
+        # k: un vértice o una lista de vértices
+        if self._tri is None:
+            return None
+        incidentes = np.isin(self._tri.simplices, k).any(axis=1)
+        if not incidentes.any():
+            return None  # punto repetido: no es vértice de la triangulación
+        vertices = np.unique(self._tri.simplices[incidentes])
+        xy = self._tri.points[vertices]
+        c0 = max(0, int(np.searchsorted(self._cx, xy[:, 0].min())) - 1)
+        c1 = min(self.nx, int(np.searchsorted(self._cx, xy[:, 0].max())) + 1)
+        f0 = max(0, int(np.searchsorted(self._cy, xy[:, 1].min())) - 1)
+        f1 = min(self.ny, int(np.searchsorted(self._cy, xy[:, 1].max())) + 1)
+        return self._recalcular(f0, f1, c0, c1)
+
+    def _recalcular(self, f0, f1, c0, c1):
+        if f0 >= f1 or c0 >= c1:
+            return None
+        gx, gy = np.meshgrid(self._cx[c0:c1], self._cy[f0:f1])
+        xi = np.column_stack([gx.ravel(), gy.ravel()])
+
+        simplex = self._tri.find_simplex(xi)
+        dentro = simplex >= 0
+        z = np.full(len(xi), np.nan, dtype=np.float32)
+        if dentro.any():
+            transform = self._tri.transform[simplex[dentro]]
+            b = np.einsum('ijk,ik->ij', transform[:, :2], xi[dentro] - transform[:, 2])
+            bary = np.column_stack([b, 1 - b.sum(axis=1)])
+            v = np.asarray(self._v, dtype=np.float64)
+            z[dentro] = np.sum(v[self._tri.simplices[simplex[dentro]]] * bary, axis=1)
+
+        z = z.reshape(gx.shape)
+        self.valores[f0:f1, c0:c1] = z
+        self._colorear(f0, f1, c0, c1)
+        return f0, f1, c0, c1
+
+    def _colorear(self, f0, f1, c0, c1):
+        self.rgba[f0:f1, c0:c1] = colorear(self.valores[f0:f1, c0:c1], self.vmin, self.vmax, self.cmap, ALFA_OVERLAY)
@@ -0,0 +1,105 @@
+import math
+from collections import OrderedDict
+
+import numpy as np
+
+# Paredes detectadas en el plano, para sumar atenuación a la cobertura.
+# Al cargar el plano se umbraliza una sola vez (los trazos oscuros son
+# paredes) y la máscara se reduce a una grilla de celdas de `factor` píxeles
+# con un "alguna es pared" por celda, así las paredes finas no desaparecen.
+# Las paredes que cruza el rayo de un AP a cada celda se cuentan recorriendo
+# los rayos de todas las celdas de un tile a la vez (ray marching con
+# muestras cada PASO_RAYO celdas): cada vez que el rayo entra en una pared
+# cuenta una, sea gruesa o fina. El resultado se guarda por posición del AP,
+# así mover un AP sólo recalcula los rayos de ese AP.
+
+UMBRAL_PARED = 100  # luminancia (0-255) por debajo de la cual un píxel es pared
+DB_POR_PARED = 5.0  # pared interior típica; ladrillo o concreto andan en 8-15 dB
+LADO_MAX_PAREDES = 320  # celdas en el lado mayor de la grilla de paredes
+TILE_RAYOS = 32
+PASO_RAYO = 0.5  # en celdas; con menos de una celda no se saltean paredes finas
+MAX_APS_CACHE = 128
+FILAS_POR_BANDA = 64  # filas de celdas umbralizadas por vez al cargar
+
+
+def mascara_paredes(rgba, umbral=UMBRAL_PARED):
+    # Píxeles oscuros y opacos; la luminancia se calcula en enteros
+    lum = rgba[..., 0].astype(np.uint16) * 77
+    lum += rgba[..., 1].astype(np.uint16) * 150
+    lum += rgba[..., 2].astype(np.uint16) * 29
+    return (lum < umbral * 256) & (rgba[..., 3] >= 128)
+
+
+def _reducir_mascara(mascara, factor):
+    # Máximo por bloques de factor x factor (la celda es pared si algún píxel lo es)
+    alto, ancho = mascara.shape
+    filas, columnas = -(-alto // factor), -(-ancho // factor)
+    relleno = np.zeros((filas * factor, columnas * factor), dtype=bool)
+    relleno[:alto, :ancho] = mascara
+    return relleno.reshape(filas, factor, columnas, factor).any(axis=(1, 3))
+
+
+def contar_cruces(celdas, ap_x, ap_y, tile=TILE_RAYOS, paso=PASO_RAYO):
+    # Paredes que atraviesa el rayo desde (ap_x, ap_y), en coordenadas de
+    # celda, hasta el centro de cada celda. uint8 con la forma de `celdas`.
+    alto, ancho = celdas.shape
+    cruces = np.zeros((alto, ancho), dtype=np.uint8)
+    for f0 in range(0, alto, tile):
+        cy = np.arange(f0, min(f0 + tile, alto), dtype=np.float32) + 0.5
+        for c0 in range(0, ancho, tile):
+            cx = np.arange(c0, min(c0 + tile, ancho), dtype=np.float32) + 0.5
+            # Todos los rayos del tile con la misma cantidad de muestras: la
+            # que necesita la esquina más lejana
+            lejos = math.hypot(max(abs(cx[0] - ap_x), abs(cx[-1] - ap_x)), max(abs(cy[0] - ap_y), abs(cy[-1] - ap_y)))
+            n = int(math.ceil(lejos / paso)) + 1
+            if n < 2:
+                continue
+            t = np.linspace(0, 1, n, dtype=np.float32)[:, None, None]
+            xs = np.minimum((ap_x + t * (cx[None, None, :] - ap_x)).astype(np.intp), ancho - 1)
+            ys = np.minimum((ap_y + t * (cy[None, :, None] - ap_y)).astype(np.intp), alto - 1)
+            muestras = celdas[ys, xs]  # (n, filas, columnas)
+            entradas = (muestras[1:] & ~muestras[:-1]).sum(axis=0)
+            cruces[f0:f0 + len(cy), c0:c0 + len(cx)] = np.minimum(entradas, 255)
+    return cruces
+
+
+class MapaParedes:
+    def __init__(self, rgba, umbral=UMBRAL_PARED, lado_max=LADO_MAX_PAREDES):
+        self.alto_px, self.ancho_px = rgba.shape[:2]
+        self.factor = max(1, int(math.ceil(max(self.alto_px, self.ancho_px) / lado_max)))
+        # Por bandas de filas, para no armar la máscara completa de un plano enorme
+        banda = FILAS_POR_BANDA * self.factor
+        self.celdas = np.concatenate([
+            _reducir_mascara(mascara_paredes(rgba[f0:f0 + banda], umbral), self.factor)
+            for f0 in range(0, self.alto_px, banda)
+        ])
+        self._cruces = OrderedDict()  # celda del AP -> cruces
+
+    @property
+    def fraccion_paredes(self):
+        return float(self.celdas.mean())
+
+    def celda(self, x_px, y_px):
+        fila = min(max(int(y_px // self.factor), 0), self.celdas.shape[0] - 1)
+        columna = min(max(int(x_px // self.factor), 0), self.celdas.shape[1] - 1)
+        return fila, columna
+
+    def cruces(self, x_px, y_px):
+        # Cruces desde un AP ubicado en (x_px, y_px); el rayo sale del centro
+        # de su celda, así que moverlo dentro de la misma celda no recalcula
+        clave = self.celda(x_px, y_px)
+        cruces = self._cruces.get(clave)
+        if cruces is None:
+            cruces = contar_cruces(self.celdas, clave[1] + 0.5, clave[0] + 0.5)
+            self._cruces[clave] = cruces
+            if len(self._cruces) > MAX_APS_CACHE:
+                self._cruces.popitem(last=False)
+        else:
+            self._cruces.move_to_end(clave)
+        return cruces
+
+    def indices(self, x_px, y_px):
+        # Celda de cada coordenada (1D, en píxeles) de una grilla de cobertura
+        filas = np.minimum(np.asarray(y_px) // self.factor, self.celdas.shape[0] - 1).astype(np.intp)
+        columnas = np.minimum(np.asarray(x_px) // self.factor, self.celdas.shape[1] - 1).astype(np.intp)
+        return filas, columnas
@@ -0,0 +1,49 @@
+import numpy as np
+
+# Raster del plano de fondo, armado una sola vez al cargarlo.
+# El nivel 0 es una vista uint8 RGBA sobre el buffer de la imagen original
+# (sin copia); los siguientes son reducciones 2x2 para dibujar el fondo a la
+# resolución del gráfico sin tocar la imagen completa en cada render.
+
+LADO_MINIMO = 256
+
+
+def _reducir(rgba):
+    h, w = rgba.shape[0] // 2, rgba.shape[1] // 2
+    suma = rgba[0:2 * h:2, 0:2 * w:2].astype(np.uint16)
+    suma += rgba[1:2 * h:2, 0:2 * w:2]
+    suma += rgba[0:2 * h:2, 1:2 * w:2]
+    suma += rgba[1:2 * h:2, 1:2 * w:2]
+    suma += 2  # redondeo
+    return (suma >> 2).astype(np.uint8)
+
+
+class PlanoRaster:
+    def __init__(self, rgba, lado_minimo=LADO_MINIMO):
+        if rgba.dtype != np.uint8 or rgba.ndim != 3 or rgba.shape[2] != 4:
+            raise ValueError("El plano tiene que ser un array uint8 de forma (alto, ancho, 4).")
+        self.niveles = [rgba]
+        while min(self.niveles[-1].shape[:2]) // 2 >= lado_minimo:
+            self.niveles.append(_reducir(self.niveles[-1]))
+
+    @property
+    def alto(self):
+        return self.niveles[0].shape[0]
+
+    @property
+    def ancho(self):
+        return self.niveles[0].shape[1]
+
+    @property
+    def rgba(self):
+        return self.niveles[0]
+
+    def para_resolucion(self, max_lado):
+        # El nivel más chico que todavía tiene al menos max_lado píxeles en
+        # su lado mayor (o el original si ya es más chico que eso)
+        elegido = self.niveles[0]
+        for nivel in self.niveles[1:]:
+            if max(nivel.shape[:2]) < max_lado:
+                break
+            elegido = nivel
+        return elegido
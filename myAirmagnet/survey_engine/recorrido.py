@@ -0,0 +1,94 @@
+import numpy as np
+
+from .almacen import FUSIONAR
+from .carga import _agregar_a_lote, _lote_vacio
+from .espacial import IndiceEspacial
+from .modelo import crear_medicion
+
+# Survey continuo caminando.
+# El usuario marca puntos de paso (waypoints) con un clic a medida que
+# camina, y el escáner manda escaneos de corrido con su hora. Cada escaneo se
+# ubica interpolando linealmente la posición entre los dos waypoints que lo
+# rodean en el tiempo, así que se obtienen muchos más puntos que clic por
+# clic. Los escaneos esperan hasta que haya un waypoint posterior y después se
+# vuelcan al almacén de a lotes con agregar_lote. Igual que con los clics, un
+# escaneo que cae dentro del radio de fusión de otro punto se promedia con él
+# o se descarta según la política de duplicados del almacén.
+
+
+def posiciones_en_recorrido(momentos, t_waypoints, x_waypoints, y_waypoints):
+    # (x, y) de cada momento sobre el camino; los momentos deben caer entre
+    # el primer y el último waypoint
+    return np.interp(momentos, t_waypoints, x_waypoints), np.interp(momentos, t_waypoints, y_waypoints)
+
+
+class Recorrido:
+    def __init__(self):
+        self.waypoints = []  # (momento, x_m, y_m) en orden de tiempo
+        self._escaneos = []  # (momento, redes) todavía sin ubicar
+        self.ubicados = 0
+        self.fusionados = 0
+        self.descartados = 0  # sin redes, con error, fuera del camino o duplicados
+
+    def agregar_waypoint(self, momento, x_m, y_m):
+        if self.waypoints and momento <= self.waypoints[-1][0]:
+            momento = np.nextafter(self.waypoints[-1][0], np.inf)  # np.interp pide tiempos crecientes
+        self.waypoints.append((momento, x_m, y_m))
+
+    def agregar_escaneo(self, momento, redes):
+        if not redes or any("error" in red for red in redes):
+            self.descartados += 1
+        elif not self.waypoints or momento < self.waypoints[0][0]:
+            self.descartados += 1  # antes del primer waypoint no hay camino
+        else:
+            self._escaneos.append((momento, redes))
+
+    @property
+    def pendientes(self):
+        return len(self._escaneos)
+
+    def vaciar(self, almacen, final=False):
+        # Agrega al almacén los escaneos que ya quedaron entre dos waypoints.
+        # Con final=True se descartan los posteriores al último waypoint.
+        # Devuelve (índice del primer punto nuevo, mediciones agregadas,
+        # fusiones como (punto, redes)).
+        if self.waypoints:
+            ultimo = self.waypoints[-1][0]
+            listos = [e for e in self._escaneos if e[0] <= ultimo]
+            self._escaneos = [e for e in self._escaneos if e[0] > ultimo]
+        else:
+            listos = []
+        if final:
+            self.descartados += len(self._escaneos)
+            self._escaneos = []
+        if not listos:
+            return almacen.n_puntos, [], []
+
+        t_wp, x_wp, y_wp = (np.array(columna, dtype=np.float64) for columna in zip(*self.waypoints))
+        xs, ys = posiciones_en_recorrido(np.array([e[0] for e in listos]), t_wp, x_wp, y_wp)
+
+        lote = _lote_vacio()
+        mediciones = []
+        fusiones = []
+        i0 = almacen.n_puntos
+        del_lote = IndiceEspacial(almacen.radio_fusion)  # puntos nuevos todavía fuera del almacén
+        for x_m, y_m, (_, redes) in zip(np.round(xs, 2).tolist(), np.round(ys, 2).tolist(), listos):
+            cercano = almacen.punto_cercano(x_m, y_m)
+            if cercano is None:
+                cercano = del_lote.cercano(x_m, y_m)
+            if cercano is None:
+                del_lote.agregar(i0 + len(mediciones), x_m, y_m)
+                _agregar_a_lote(lote, x_m, y_m, redes)
+                mediciones.append(crear_medicion(x_m, y_m, redes))
+            elif almacen.politica_duplicados == FUSIONAR:
+                fusiones.append((cercano, redes))
+            else:
+                self.descartados += 1
+        if mediciones:
+            almacen.agregar_lote(**lote)
+        # Después del lote: una fusión puede apuntar a un punto del mismo lote
+        for punto, redes in fusiones:
+            almacen.fusionar_medicion(punto, redes)
+        self.ubicados += len(mediciones)
+        self.fusionados += len(fusiones)
+        return i0, mediciones, fusiones
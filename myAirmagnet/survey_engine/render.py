@@ -0,0 +1,42 @@
+from functools import lru_cache
+
+import matplotlib
+import numpy as np
+
+# Render directo de grillas a RGBA con una tabla de 256 colores.
+# Para mostrar en pantalla es mucho más rápido que contourf con 100 niveles:
+# mapear cada celda es una indexación en la LUT.
+
+ALFA_HEATMAP = 150
+
+
+@lru_cache(maxsize=8)
+def construir_lut(cmap="jet", n=256):
+    lut = matplotlib.colormaps[cmap](np.linspace(0, 1, n), bytes=True)
+    lut.setflags(write=False)
+    return lut
+
+
+def colorear(z, vmin, vmax, cmap="jet", alfa=ALFA_HEATMAP, fuera_de_rango_transparente=False, out=None):
+    # z: grilla (alto, ancho); NaN queda transparente. Con
+    # fuera_de_rango_transparente los valores fuera de [vmin, vmax] tampoco se
+    # pintan, igual que contourf con niveles fijos.
+    lut = construir_lut(cmap)
+    z = np.asarray(z)
+    n = len(lut)
+    escala = (n - 1) / (vmax - vmin) if vmax != vmin else 0.0
+
+    idx = np.nan_to_num(z, nan=vmin).astype(np.float32)
+    idx -= vmin
+    idx *= escala
+    np.clip(idx, 0, n - 1, out=idx)
+
+    if out is None:
+        out = np.empty(z.shape + (4,), dtype=np.uint8)
+    np.take(lut, idx.astype(np.uint8 if n <= 256 else np.intp), axis=0, out=out)
+
+    visible = ~np.isnan(z)
+    if fuera_de_rango_transparente:
+        visible &= (z >= vmin) & (z <= vmax)
+    out[..., 3] = np.where(visible, alfa, 0)
+    return out
@@ -0,0 +1,334 @@
+import os
+import platform
+import random
+import subprocess
+import threading
+import time
+
+from .escaneo import (
+    parsear_salida, _red_error, COMANDO_NMCLI, COMANDO_NETSH, FORMATO_NMCLI, FORMATO_NETSH,
+)
+from .grabacion import GrabadorEscaneos, BackendReproduccion
+from .instrumentacion import tramo
+from .modelo import resumir_muestras
+
+# Servicio de escaneo persistente.
+# Un hilo propio vuelve a escanear cada `intervalo` segundos y guarda el
+# último resultado con su hora; un clic recibe enseguida ese escaneo si es lo
+# bastante reciente, o espera al próximo (que se adelanta) si se le pide algo
+# más fresco. Así ningún clic paga el costo de lanzar el escaneo. La frescura
+# se mide desde que el escaneo empezó: uno que ya estaba en curso al llegar el
+# pedido puede haber medido antes de que el usuario se pare en el punto.
+#
+# Los backends sólo saben escanear una vez: BackendNmcli (Linux),
+# BackendNetsh (Windows), BackendFalso, que genera redes sintéticas para
+# probar sin placa WiFi, y BackendReproduccion (en grabacion.py), que repite
+# salidas grabadas. Los backends reales pueden grabar su salida cruda con un
+# GrabadorEscaneos.
+#
+# Para promediar el ruido de la señal, muestrear() junta varios escaneos
+# nuevos seguidos (sin esperar el intervalo) y entrega sólo su resumen.
+# Para el recorrido continuo, suscribir() recibe cada escaneo con su hora
+# (también escaneando de corrido) hasta desuscribir(). Después de un escaneo
+# fallido siempre se espera antes del siguiente: un backend que falla en el
+# acto (sin placa, NetworkManager caído) escaneando de corrido sería un bucle
+# que satura la CPU y la cola de eventos de la GUI.
+
+INTERVALO_ESCANEO = 5.0  # segundos entre escaneos automáticos
+MUESTRAS_POR_PUNTO = 1
+PRESUPUESTO_MUESTREO = 15.0  # segundos como máximo para juntar las muestras
+PAUSA_TRAS_ERROR = 1.0  # segundos mínimos entre un escaneo fallido y el siguiente
+ERRORES_SEGUIDOS_MUESTREO = 3  # escaneos fallidos seguidos que cortan un muestreo
+
+REDES_FALSAS = [
+    {"SSID": "Oficina", "BSSID": "02:00:00:00:00:01", "Señal": 80, "Canal": "6"},
+    {"SSID": "Oficina", "BSSID": "02:00:00:00:00:02", "Señal": 55, "Canal": "36"},
+    {"SSID": "Invitados", "BSSID": "02:00:00:00:00:03", "Señal": 65, "Canal": "11"},
+    {"SSID": "Depósito", "BSSID": "02:00:00:00:00:04", "Señal": 35, "Canal": "1"},
+]
+
+
+class Escaneo:
+    __slots__ = ("redes", "momento", "inicio")
+
+    def __init__(self, redes, momento=None, inicio=None):
+        self.redes = redes
+        self.momento = time.monotonic() if momento is None else momento  # fin del escaneo
+        self.inicio = self.momento if inicio is None else inicio
+
+    @property
+    def edad(self):
+        return time.monotonic() - self.momento
+
+    @property
+    def fallido(self):
+        return any("error" in red for red in self.redes)
+
+    def empezo_desde(self, minimo):
+        # minimo: time.monotonic() más viejo aceptable, None acepta cualquiera
+        return minimo is None or self.inicio >= minimo
+
+    @property
+    def momento_medio(self):
+        # Mejor estimación de cuándo se midió: un escaneo real tarda segundos
+        return (self.inicio + self.momento) / 2
+
+
+class _BackendComando:
+    formato = None
+
+    def __init__(self, grabador=None):
+        self.grabador = grabador
+
+    def escanear(self):
+        with tramo("escaneo.comando"):
+            salida = self.salida()
+        if self.grabador is not None:
+            self.grabador.guardar(self.formato, salida)
+        with tramo("escaneo.parseo"):
+            return parsear_salida(self.formato, salida)
+
+
+class BackendNmcli(_BackendComando):
+    formato = FORMATO_NMCLI
+
+    # `--rescan yes` bloquea hasta que NetworkManager termina de escanear; si
+    # no hay permisos para pedir el rescan se usa lo que tenga en cache
+    def salida(self):
+        try:
+            return subprocess.check_output(COMANDO_NMCLI + ['--rescan', 'yes'], encoding='utf-8', stderr=subprocess.DEVNULL)
+        except subprocess.CalledProcessError:
+            return subprocess.check_output(COMANDO_NMCLI + ['--rescan', 'no'], encoding='utf-8')
+
+
+class BackendNetsh(_BackendComando):
+    formato = FORMATO_NETSH
+
+    # Windows escanea solo cada tanto; netsh devuelve lo último que vio
+    def salida(self):
+        return subprocess.check_output(COMANDO_NETSH, encoding='utf-8')
+
+
+class BackendNoSoportado:
+    def escanear(self):
+        return [_red_error("Sistema operativo no soportado")]
+
+
+class BackendFalso:
+    # Redes fijas con ruido en la señal; `demora` simula lo que tarda un
+    # escaneo real
+    def __init__(self, redes=None, demora=0.0, ruido=5, semilla=None):
+        self.redes = redes if redes is not None else REDES_FALSAS
+        self.demora = demora
+        self.ruido = ruido
+        self.escaneos = 0
+        self._azar = random.Random(semilla)
+
+    def escanear(self):
+        if self.demora:
+            time.sleep(self.demora)
+        self.escaneos += 1
+        return [
+            dict(red, Señal=min(max(red["Señal"] + self._azar.randint(-self.ruido, self.ruido), 0), 100))
+            for red in self.redes
+        ]
+
+
+def backend_del_sistema(sistema=None):
+    # WIFI_SURVEY_ESCANER=falso fuerza el backend sintético y con la ruta de
+    # una grabación se la reproduce; WIFI_SURVEY_GRABAR=ruta graba la salida
+    # cruda de los escaneos reales
+    elegido = os.environ.get("WIFI_SURVEY_ESCANER", "")
+    if elegido.lower() == "falso":
+        return BackendFalso(demora=1.0)
+    if elegido:
+        return BackendReproduccion(elegido, demora=1.0)
+
+    ruta_grabacion = os.environ.get("WIFI_SURVEY_GRABAR")
+    grabador = GrabadorEscaneos(ruta_grabacion) if ruta_grabacion else None
+    sistema = sistema or platform.system()
+    if sistema == "Linux":
+        return BackendNmcli(grabador)
+    if sistema == "Windows":
+        return BackendNetsh(grabador)
+    return BackendNoSoportado()
+
+
+def _llamar(callback, *args):
+    # Un callback que falla no puede tirar abajo el hilo del servicio: los
+    # pedidos siguientes quedarían sin respuesta para siempre
+    try:
+        callback(*args)
+    except Exception as e:
+        print(f"Error en un callback del servicio de escaneo: {e!r}")
+
+
+def _minimo(max_edad):
+    return None if max_edad is None else time.monotonic() - max_edad
+
+
+class _Muestreo:
+    __slots__ = ("escaneos", "cantidad", "validos", "errores_seguidos", "desde", "limite", "callback", "args")
+
+    def __init__(self, cantidad, presupuesto, callback, args):
+        self.escaneos = []
+        self.cantidad = cantidad
+        self.validos = 0
+        self.errores_seguidos = 0
+        self.desde = time.monotonic()
+        self.limite = self.desde + presupuesto if presupuesto else None
+        self.callback = callback
+        self.args = args
+
+    def agregar(self, escaneo):
+        # True cuando ya juntó las muestras, se le acabó el tiempo o el
+        # escáner falla una y otra vez (esperar el resto del presupuesto no
+        # va a dar muestras). Sólo cuentan los escaneos que empezaron
+        # después del pedido
+        if escaneo.empezo_desde(self.desde):
+            self.escaneos.append(escaneo.redes)
+            if escaneo.fallido:
+                self.errores_seguidos += 1
+            else:
+                self.validos += 1
+                self.errores_seguidos = 0
+        return (self.validos >= self.cantidad or self.errores_seguidos >= ERRORES_SEGUIDOS_MUESTREO
+                or (self.limite is not None and time.monotonic() >= self.limite))
+
+    def resumen(self):
+        if not self.escaneos:
+            return [_red_error("No terminó ningún escaneo a tiempo")]
+        return resumir_muestras(self.escaneos)
+
+
+class ServicioEscaneo:
+    def __init__(self, backend=None, intervalo=INTERVALO_ESCANEO):
+        self.backend = backend or backend_del_sistema()
+        self.intervalo = intervalo
+        self._ultimo = None
+        self._esperando = []  # (mínimo inicio aceptable, callback, args)
+        self._muestreos = []  # _Muestreo en curso
+        self._suscriptos = []  # (callback, args) que reciben todos los escaneos
+        self._lock = threading.Lock()
+        self._hay_escaneo = threading.Condition(self._lock)
+        self._despertar = threading.Event()
+        self._cerrado = threading.Event()  # corta la pausa tras un error
+        self._parar = False
+        self._hilo = threading.Thread(target=self._bucle, name="servicio-escaneo", daemon=True)
+
+    def iniciar(self):
+        if not self._hilo.is_alive():
+            self._hilo.start()
+        return self
+
+    def _bucle(self):
+        while True:
+            with self._lock:
+                if self._parar:
+                    return
+            # Se limpia antes de escanear: un pedido que llega durante el
+            # escaneo o lo aprovecha o dispara el siguiente enseguida
+            self._despertar.clear()
+            inicio = time.monotonic()
+            try:
+                redes = self.backend.escanear()
+                escaneo = Escaneo(redes, inicio=inicio)
+            except Exception as e:
+                escaneo = Escaneo([_red_error(str(e))], inicio=inicio)
+
+            with self._lock:
+                self._ultimo = escaneo
+                # Los pedidos que llegaron con el escaneo ya en curso y piden
+                # algo más nuevo que su inicio esperan al siguiente
+                atender = [e for e in self._esperando if escaneo.empezo_desde(e[0])]
+                self._esperando = [e for e in self._esperando if not escaneo.empezo_desde(e[0])]
+                terminados = [m for m in self._muestreos if m.agregar(escaneo)]
+                self._muestreos = [m for m in self._muestreos if m not in terminados]
+                suscriptos = list(self._suscriptos)
+                pendientes = bool(self._esperando or self._muestreos or self._suscriptos)
+                self._hay_escaneo.notify_all()
+            for _, callback, args in atender:
+                _llamar(callback, escaneo.redes, *args)
+            for callback, args in suscriptos:
+                _llamar(callback, escaneo.redes, escaneo.momento_medio, *args)
+            for muestreo in terminados:
+                _llamar(muestreo.callback, muestreo.resumen(), *muestreo.args)
+
+            # Mientras alguien espera o junta muestras se escanea de corrido,
+            # salvo después de un error: ahí los pedidos no acortan la pausa
+            if escaneo.fallido:
+                self._cerrado.wait(max(self.intervalo, PAUSA_TRAS_ERROR))
+            elif not pendientes:
+                self._despertar.wait(self.intervalo or None)
+
+    def ultimo(self):
+        # Último escaneo (con .redes y .edad) o None si todavía no terminó ninguno
+        with self._lock:
+            return self._ultimo
+
+    def _sirve(self, minimo):
+        return self._ultimo is not None and self._ultimo.empezo_desde(minimo)
+
+    def obtener(self, max_edad=None, timeout=None):
+        # Bloquea hasta tener un escaneo que empezó hace a lo sumo `max_edad`
+        # segundos
+        minimo = _minimo(max_edad)
+        with self._lock:
+            if not self._sirve(minimo):
+                self._despertar.set()
+                if not self._hay_escaneo.wait_for(lambda: self._sirve(minimo) or self._parar, timeout):
+                    raise TimeoutError("No llegó un escaneo a tiempo.")
+                if not self._sirve(minimo):
+                    raise RuntimeError("El servicio de escaneo está cerrado.")
+            return self._ultimo
+
+    def solicitar(self, callback, *args, max_edad=None):
+        # Sin bloquear: callback(redes, *args) se llama ya mismo si el último
+        # escaneo sirve, o desde el hilo del servicio cuando termine uno que
+        # haya empezado hace a lo sumo `max_edad` segundos
+        minimo = _minimo(max_edad)
+        with self._lock:
+            if self._sirve(minimo):
+                redes = self._ultimo.redes
+            else:
+                self._esperando.append((minimo, callback, args))
+                self._despertar.set()
+                return
+        callback(redes, *args)
+
+    def muestrear(self, callback, *args, cantidad=MUESTRAS_POR_PUNTO, presupuesto=PRESUPUESTO_MUESTREO):
+        # Sin bloquear: junta `cantidad` escaneos que empiecen después del pedido (o los
+        # que alcancen en `presupuesto` segundos) y llama callback(resumen,
+        # *args) desde el hilo del servicio, con las redes de resumir_muestras
+        with self._lock:
+            self._muestreos.append(_Muestreo(max(int(cantidad), 1), presupuesto, callback, args))
+        self._despertar.set()
+
+    def suscribir(self, callback, *args):
+        # callback(redes, momento, *args) con cada escaneo que termine, desde
+        # el hilo del servicio; `momento` es time.monotonic() a mitad del
+        # escaneo. Devuelve la suscripción para desuscribir()
+        suscripcion = (callback, args)
+        with self._lock:
+            self._suscriptos.append(suscripcion)
+        self._despertar.set()
+        return suscripcion
+
+    def desuscribir(self, suscripcion):
+        with self._lock:
+            if suscripcion in self._suscriptos:
+                self._suscriptos.remove(suscripcion)
+
+    def en_cola(self):
+        with self._lock:
+            return len(self._esperando) + len(self._muestreos)
+
+    def cerrar(self):
+        with self._lock:
+            self._parar = True
+            self._esperando = []
+            self._muestreos = []
+            self._suscriptos = []
+            self._hay_escaneo.notify_all()
+        self._cerrado.set()
+        self._despertar.set()
@@ -0,0 +1,83 @@
+import numpy as np
+
+from .almacen import AlmacenMediciones
+
+# Surveys sintéticos reproducibles para benchmarks y pruebas.
+# Con la misma semilla y los mismos parámetros se obtiene exactamente el mismo
+# survey. Los APs se reparten al azar en el piso y la señal de cada punto
+# sigue un modelo log-distancia con ruido gaussiano; cada punto sólo ve los
+# BSSIDs que llegan por encima del umbral de visibilidad.
+
+CANALES_SINTETICOS = ["1", "6", "11", "36", "40", "44", "48", "149", "153", "157", "161"]
+DBM_A_1M = -35.0  # señal a un metro del AP
+EXPONENTE_PERDIDA = 3.0  # interiores con paredes
+DBM_VISIBLE = -90.0
+
+
+def aps_sinteticos(bssids=30, ancho_m=50.0, alto_m=30.0, semilla=0):
+    # Un dict por BSSID con SSID, canal y posición en metros. Tres BSSIDs por
+    # SSID, como una red con varios APs
+    azar = np.random.default_rng(semilla)
+    x = azar.uniform(0, ancho_m, bssids)
+    y = azar.uniform(0, alto_m, bssids)
+    canales = azar.choice(CANALES_SINTETICOS, bssids)
+    return [
+        {
+            "SSID": f"Red-{k // 3:03d}",
+            "BSSID": "02:%02x:%02x:%02x:%02x:%02x" % tuple((k >> s) & 0xFF for s in (32, 24, 16, 8, 0)),
+            "Canal": str(canales[k]),
+            "x_m": float(x[k]),
+            "y_m": float(y[k]),
+        }
+        for k in range(bssids)
+    ]
+
+
+def lote_sintetico(puntos=1000, bssids=30, ancho_m=50.0, alto_m=30.0, semilla=0, ruido_db=4.0):
+    # Columnas listas para AlmacenMediciones.agregar_lote, más los APs usados
+    aps = aps_sinteticos(bssids, ancho_m, alto_m, semilla)
+    azar = np.random.default_rng(semilla + 1)
+    x = np.round(azar.uniform(0, ancho_m, puntos), 2)
+    y = np.round(azar.uniform(0, alto_m, puntos), 2)
+
+    ap_x = np.array([ap["x_m"] for ap in aps])
+    ap_y = np.array([ap["y_m"] for ap in aps])
+    distancia = np.maximum(np.hypot(x[:, None] - ap_x, y[:, None] - ap_y), 1.0)
+    dbm = DBM_A_1M - 10 * EXPONENTE_PERDIDA * np.log10(distancia) + azar.normal(0, ruido_db, distancia.shape)
+    visible = dbm > DBM_VISIBLE
+    señal = np.clip(np.rint(2 * (dbm + 100)), 0, 100).astype(np.int64)
+
+    # Las lecturas se recorren punto por punto, como en un survey real
+    punto, ap = np.nonzero(visible)
+    ssids = [aps[k]["SSID"] for k in range(bssids)]
+    bssid_nombres = [aps[k]["BSSID"] for k in range(bssids)]
+    canales = [aps[k]["Canal"] for k in range(bssids)]
+    ap = ap.tolist()
+    lote = {
+        "x_m": x,
+        "y_m": y,
+        "conteos": visible.sum(axis=1),
+        "ssids": [ssids[k] for k in ap],
+        "bssids": [bssid_nombres[k] for k in ap],
+        "señales": señal[punto, ap],
+        "canales": [canales[k] for k in ap],
+    }
+    return lote, aps
+
+
+def generar_survey(puntos=1000, bssids=30, ancho_m=50.0, alto_m=30.0, semilla=0, ruido_db=4.0):
+    # Devuelve (almacén, aps)
+    lote, aps = lote_sintetico(puntos, bssids, ancho_m, alto_m, semilla, ruido_db)
+    almacen = AlmacenMediciones(capacidad=max(puntos, 16))
+    almacen.agregar_lote(**lote)
+    return almacen, aps
+
+
+def plano_sintetico(ancho_px, alto_px, separacion_px=200, grosor_px=4):
+    # Plano RGBA blanco con una grilla de paredes grises
+    rgba = np.full((alto_px, ancho_px, 4), 255, dtype=np.uint8)
+    for inicio in range(0, alto_px, separacion_px):
+        rgba[inicio:inicio + grosor_px, :, :3] = 90
+    for inicio in range(0, ancho_px, separacion_px):
+        rgba[:, inicio:inicio + grosor_px, :3] = 90
+    return rgba
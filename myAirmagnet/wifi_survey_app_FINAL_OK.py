@@ -1,21 +1,44 @@
+import os
 import sys
 import math
-import json
-import os
-import platform
-import tempfile
-import subprocess
-import io
-from fpdf import FPDF
+import time
 from PyQt5 import QtWidgets, QtGui, QtCore
 import matplotlib
 matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import numpy as np
-from scipy.interpolate import griddata
+
+import survey_engine as motor
+
+# Lado mayor (en píxeles) del fondo que se dibuja en los gráficos
+RESOLUCION_FONDO = 1600
+
+# A partir de esta cantidad de lecturas se sugiere el informe resumido
+LECTURAS_INFORME_DETALLADO = 2000
+
+# Un clic usa el último escaneo del servicio si no tiene más de estos segundos
+MAX_EDAD_ESCANEO = 5.0
+# En el recorrido continuo los escaneos ubicados se vuelcan cada tanto y de a
+# lotes, no uno por uno
+INTERVALO_VOLCADO_RECORRIDO_MS = 1000
+
+# Un clic a menos de estos píxeles de un AP en modo AP lo elige para moverlo
+RADIO_SELECCION_AP = 12
+
+# WIFI_SURVEY_PERFIL=ruta perfila toda la sesión y vuelca a ruta.prof y
+# ruta_tramos.json al cerrar (también se puede activar desde el menú)
+PERFIL_SESION = os.environ.get("WIFI_SURVEY_PERFIL")
+
+# Journal de la sesión en curso, para recuperarla si la aplicación se cierra mal
+JOURNAL_SESION = os.path.join(os.path.expanduser("~"), ".wifi_survey", "sesion.jsonl")
 
 class WifiSurveyApp(QtWidgets.QMainWindow):
-    def __init__(self):
+    # Los resultados del escáner llegan desde otro hilo; la señal los pasa
+    # al hilo de la GUI (conexión encolada).
+    escaneo_terminado = QtCore.pyqtSignal(list, int)
+    escaneo_recorrido = QtCore.pyqtSignal(list, float)
+
+    def __init__(self, ruta_journal=JOURNAL_SESION):
         super().__init__()
         self.setWindowTitle("WiFi Survey - Con ubicación de AP")
         self.setGeometry(100, 100, 1000, 700)
@@ -31,13 +54,24 @@ class WifiSurveyApp(QtWidgets.QMainWindow):
         plan_menu.addAction("📐 Calibrar escala", self.recalibrar_escala)
         plan_menu.addAction("📡 Ubicar Access Point", self.activar_modo_ap)
         plan_menu.addAction("📡 Ver cobertura estimada desde APs", self.ver_cobertura_estimada)
+        plan_menu.addAction("🤖 Ubicar APs automáticamente", self.optimizar_ubicacion_aps)
+        plan_menu.addAction("🧱 Atenuación por paredes", self.configurar_paredes)
 
         # Menú de site survey
         survey_menu = self.menuBar().addMenu("🔶 Site Survey")
         survey_menu.addAction("📍 Tomar mediciones (clic en plano)", self.activar_modo_medicion)
+        survey_menu.addAction("🚶 Recorrido continuo (iniciar/terminar)", self.alternar_recorrido)
+        survey_menu.addAction("📂 Cargar survey (mediciones.json)", self.cargar_survey)
+        survey_menu.addAction("📏 Radio de fusión de puntos", self.configurar_radio_fusion)
+        survey_menu.addAction("⏱️ Antigüedad máxima del escaneo", self.configurar_edad_escaneo)
+        survey_menu.addAction("🎯 Muestras por punto", self.configurar_muestreo)
+        survey_menu.addAction("📈 Estadístico de señal", self.configurar_estadistico)
         survey_menu.addAction("📊 Ver Heatmap por SSID", self.ver_heatmap_por_ssid)
+        survey_menu.addAction("🟢 Heatmap en vivo sobre el plano", self.activar_overlay)
+        survey_menu.addAction("🧽 Quitar heatmap del plano", self.quitar_capa)
         survey_menu.addAction("💾 Exportar informe", self.exportar_informe)
         survey_menu.addAction("🖨️ Exportar informe PDF", self.exportar_informe_pdf)
+        survey_menu.addAction("🔬 Perfilado de rendimiento (activar/exportar)", self.alternar_perfilado)
 
         # Acción global de limpieza
         clear_action = QtWidgets.QAction("🧹 Clear", self)
@@ -49,45 +83,180 @@ class WifiSurveyApp(QtWidgets.QMainWindow):
 
         self.image = None
         self.original_image = None
+        self.ruta_plano = None
+        self.plano = None  # PlanoRaster del plano original, para los gráficos
+        self.mapa_paredes = None  # paredes detectadas en el plano, para la cobertura
+        self.usar_paredes = False
+        self.db_por_pared = motor.DB_POR_PARED
+        self.calibracion = None  # (puntos, metros) de la última calibración
         self.clicks = []
         self.escala_pts = []
         self.escala = None
-        self.mediciones = []
+        self.mediciones = motor.AlmacenMediciones()
+        self.cache_heatmaps = motor.CacheInterpolacion()
+        self.overlay = None  # heatmap en vivo del SSID elegido
+        self.capa_heatmap = None  # último heatmap/cobertura dibujado sobre el plano
+        self.capa_cobertura = False  # la capa es la cobertura: se rehace al mover APs
+        self.overlay_ssid = None
         self.modo_ap = False
         self.modo_medicion = False  # Inicializado correctamente
         self.aps_manual = []  # Lista de APs manuales con nombre y posición
-        self.temp_files = []  # Lista para rastrear archivos temporales
+        self.ap_a_mover = None  # índice del AP elegido para mover en modo AP
+        self.pendientes = {}  # Puntos clickeados esperando el resultado del escaneo
+        self.indice_pendientes = motor.IndiceEspacial()
+        self.proximo_id_punto = 0
+
+        # El servicio escanea solo cada tanto; un clic toma el último escaneo
+        # si es reciente o espera el próximo. La conexión encolada hace que el
+        # resultado se procese siempre después del clic, aunque llegue al instante.
+        self.max_edad_escaneo = MAX_EDAD_ESCANEO
+        self.escaner = motor.ServicioEscaneo().iniciar()
+        self.escaneo_terminado.connect(self.registrar_escaneo, QtCore.Qt.QueuedConnection)
+        # Con más de una muestra cada clic junta varios escaneos seguidos y
+        # guarda sólo su resumen (media, mediana, mín, máx, desvío)
+        self.muestras_por_punto = motor.MUESTRAS_POR_PUNTO
+        self.presupuesto_muestreo = motor.PRESUPUESTO_MUESTREO
+        self.estadistico = motor.MEDIA  # qué resumen usan heatmaps e informes
+
+        # Recorrido continuo: clics como puntos de paso y escaneos de corrido
+        self.recorrido = None
+        self.suscripcion_recorrido = None
+        self.escaneo_recorrido.connect(self.recibir_escaneo_recorrido, QtCore.Qt.QueuedConnection)
+        self.timer_recorrido = QtCore.QTimer(self)
+        self.timer_recorrido.setInterval(INTERVALO_VOLCADO_RECORRIDO_MS)
+        self.timer_recorrido.timeout.connect(self.volcar_recorrido)
+
+        if PERFIL_SESION:
+            motor.activar_perfilado()
+
+        self.iniciar_journal(ruta_journal)
+
+    def iniciar_journal(self, ruta):
+        aviso = ""
+        try:
+            estado = motor.reproducir_journal(ruta)
+        except motor.JournalInconsistente as e:
+            # Lo que sigue al evento roto depende de él: se ofrece lo anterior
+            estado = e.estado
+            aviso = f"{e}\nSólo se puede recuperar lo registrado antes de esa carga.\n\n"
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            QtWidgets.QMessageBox.warning(
+                self, "Recuperar sesión",
+                f"No se pudo leer la sesión anterior ({e}).\nSe guarda como {os.path.basename(ruta)}.anterior y se empieza de cero."
+            )
+            os.replace(ruta, ruta + ".anterior")
+            self.journal = motor.JournalSesion(ruta)
+            return
+        if estado["mediciones"] or estado["aps"] or aviso:
+            respuesta = QtWidgets.QMessageBox.question(
+                self, "Recuperar sesión",
+                f"{aviso}Se encontró una sesión anterior con {len(estado['mediciones'])} mediciones y "
+                f"{len(estado['aps'])} APs.\n¿Recuperarla?"
+            )
+            if respuesta == QtWidgets.QMessageBox.Yes:
+                if aviso:
+                    # El journal se reescribe con lo recuperado; el original
+                    # queda como .anterior
+                    os.replace(ruta, ruta + ".anterior")
+                    self.journal = motor.JournalSesion(ruta)
+                    self.recuperar_sesion(estado)
+                    self.volcar_sesion()
+                    return
+                self.journal = motor.JournalSesion(ruta)
+                self.recuperar_sesion(estado)
+                return
+            # Se guarda una copia por si se descartó sin querer
+            os.replace(ruta, ruta + ".anterior")
+        self.journal = motor.JournalSesion(ruta)
+
+    def recuperar_sesion(self, estado):
+        if estado["plano"] and os.path.exists(estado["plano"]):
+            self.abrir_plano(estado["plano"])
+        self.escala = estado["escala"]
+        self.calibracion = estado["calibracion"]
+        self.aps_manual = estado["aps"]
+        self.mediciones = estado["mediciones"]
+        self.indice_pendientes = motor.IndiceEspacial(self.mediciones.radio_fusion)
+        if not self.image:
+            self.statusBar().showMessage(f"Sesión recuperada ({len(self.mediciones)} mediciones), pero no se encontró el plano.")
+            return
+
+        self.redibujar_plano()
+        self.modo_medicion = self.escala is not None
+        self.statusBar().showMessage(f"Sesión recuperada: {len(self.mediciones)} mediciones, {len(self.aps_manual)} APs.")
 
     def load_image(self):
         file_name, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Abrir imagen", "", "Imágenes (*.png *.jpg *.bmp)")
         if file_name:
+            self.abrir_plano(file_name)
+            self.reset_clicks()
+
+    def abrir_plano(self, file_name):
+        if file_name:
+            self.ruta_plano = os.path.abspath(file_name)
             self.image = QtGui.QPixmap(file_name)
             self.original_image = QtGui.QPixmap(file_name)
+            self.plano = self.crear_raster_plano(self.original_image)
+            # Las paredes se detectan una sola vez, sobre el plano sin marcas
+            self.mapa_paredes = motor.MapaParedes(self.plano.rgba)
 
             # Crear una copia del plano con elementos agregados
             painter = QtGui.QPainter(self.image)
             painter.setRenderHint(QtGui.QPainter.Antialiasing)
-
-            # Agregar escala visual (10 metros)
-            if self.escala:
-                escala_metros = 10
-                largo_px = int(self.escala * escala_metros)
-                painter.setPen(QtGui.QPen(QtGui.QColor("black"), 3))
-                painter.drawLine(30, self.image.height() - 40, 30 + largo_px, self.image.height() - 40)
-                painter.drawText(30 + largo_px + 10, self.image.height() - 35, f"{escala_metros} m")
-
-            # Agregar flecha norte
-            painter.setPen(QtGui.QPen(QtGui.QColor("black"), 2))
-            painter.drawLine(60, 60, 60, 20)
-            painter.drawLine(60, 20, 55, 30)
-            painter.drawLine(60, 20, 65, 30)
-            painter.drawText(50, 15, "N")
-
+            self.dibujar_referencias(painter)
             painter.end()
             self.image_label.setPixmap(self.image)
             self.resize(self.image.width(), self.image.height() + 30)
-            self.reset_clicks()
 
+    def dibujar_referencias(self, painter):
+        # Agregar escala visual (10 metros)
+        if self.escala:
+            escala_metros = 10
+            largo_px = int(self.escala * escala_metros)
+            painter.setPen(QtGui.QPen(QtGui.QColor("black"), 3))
+            painter.drawLine(30, self.image.height() - 40, 30 + largo_px, self.image.height() - 40)
+            painter.drawText(30 + largo_px + 10, self.image.height() - 35, f"{escala_metros} m")
+
+        # Agregar flecha norte
+        painter.setPen(QtGui.QPen(QtGui.QColor("black"), 2))
+        painter.drawLine(60, 60, 60, 20)
+        painter.drawLine(60, 20, 55, 30)
+        painter.drawLine(60, 20, 65, 30)
+        painter.drawText(50, 15, "N")
+
+    def redibujar_plano(self):
+        # Rearma el plano con la calibración, los APs y las mediciones (por
+        # ejemplo después de mover un AP, que está dibujado sobre la imagen)
+        self.image = QtGui.QPixmap(self.original_image)
+        painter = QtGui.QPainter(self.image)
+        painter.setRenderHint(QtGui.QPainter.Antialiasing)
+        self.dibujar_referencias(painter)
+        puntos, metros = self.calibracion or (None, None)
+        if puntos:
+            self.dibujar_calibracion(painter, puntos[0], puntos[1], metros)
+        for ap in self.aps_manual:
+            self.dibujar_ap(painter, ap)
+        if self.escala:
+            self.dibujar_mediciones(painter)
+        painter.end()
+        self.refrescar_vista()
+
+
+    def crear_raster_plano(self, pixmap):
+        # Se convierte a RGBA una sola vez; el array es una vista sobre el
+        # buffer del QImage, que se guarda junto con el raster para que viva
+        qimage = pixmap.toImage().convertToFormat(QtGui.QImage.Format_RGBA8888)
+        ptr = qimage.constBits()
+        ptr.setsize(qimage.byteCount())
+        filas = np.frombuffer(ptr, dtype=np.uint8).reshape((qimage.height(), qimage.bytesPerLine()))
+        rgba = filas[:, :qimage.width() * 4].reshape((qimage.height(), qimage.width(), 4))
+        plano = motor.PlanoRaster(rgba)
+        plano.qimage = qimage
+        return plano
+
+    def fondo_para_grafico(self):
+        # Vista uint8 invertida en Y (sin copias ni conversión a float)
+        return np.flipud(self.plano.para_resolucion(RESOLUCION_FONDO))
 
     def recalibrar_escala(self):
         self.escala = None
@@ -95,28 +264,133 @@ class WifiSurveyApp(QtWidgets.QMainWindow):
         self.statusBar().showMessage("Hacé dos clics sobre una distancia conocida para calibrar.")
 
     def activar_modo_ap(self):
+        self.terminar_recorrido()
         self.modo_ap = True
+        self.ap_a_mover = None
         self.modo_medicion = False  # Desactivar otros modos
-        self.statusBar().showMessage("Modo AP activado: hacé clic en el plano para ubicar el Access Point.")
+        self.statusBar().showMessage("Modo AP activado: hacé clic en el plano para ubicar el Access Point "
+                                     "(o sobre uno ya ubicado para moverlo).")
         
     def activar_modo_medicion(self):
+        self.terminar_recorrido()
         self.modo_medicion = True
         self.modo_ap = False  # Desactivar otros modos
         self.statusBar().showMessage("Modo medición activado: hacé clic en el plano para registrar puntos.")
 
 
+    def configurar_radio_fusion(self):
+        radio, ok = QtWidgets.QInputDialog.getDouble(
+            self, "Radio de fusión",
+            "Clics a menos de esta distancia (m) de un punto existente se consideran el mismo punto.\n"
+            "0 = sólo coordenadas idénticas.",
+            self.mediciones.radio_fusion, 0.0, 50.0, 2
+        )
+        if not ok:
+            return
+        politica, ok = QtWidgets.QInputDialog.getItem(
+            self, "Puntos cercanos",
+            "¿Qué hacer con un clic cerca de un punto ya medido?",
+            ["Fusionar (promediar muestras)", "Rechazar"],
+            0 if self.mediciones.politica_duplicados == motor.FUSIONAR else 1, False
+        )
+        if not ok:
+            return
+        self.mediciones.configurar_fusion(radio, motor.FUSIONAR if politica.startswith("Fusionar") else motor.RECHAZAR)
+        self.journal.registrar(motor.EVENTO_CONFIG_FUSION, radio=radio, politica=self.mediciones.politica_duplicados)
+        self.indice_pendientes = motor.IndiceEspacial(radio)
+        for id_punto, punto in self.pendientes.items():
+            self.indice_pendientes.agregar(id_punto, punto["x_m"], punto["y_m"])
+        self.statusBar().showMessage(f"Radio de fusión: {radio:.2f} m ({politica.lower()}).")
+
+    def configurar_edad_escaneo(self):
+        edad, ok = QtWidgets.QInputDialog.getDouble(
+            self, "Antigüedad del escaneo",
+            "Segundos que puede tener el último escaneo para usarlo en un clic.\n"
+            "0 = esperar siempre un escaneo nuevo.",
+            self.max_edad_escaneo, 0.0, 120.0, 1
+        )
+        if ok:
+            self.max_edad_escaneo = edad
+            self.statusBar().showMessage(f"Antigüedad máxima del escaneo: {edad:.1f} s.")
+
+    def configurar_muestreo(self):
+        cantidad, ok = QtWidgets.QInputDialog.getInt(
+            self, "Muestras por punto",
+            "Escaneos a promediar en cada punto (la señal varía varios dB entre escaneos).\n"
+            "1 = un solo escaneo, como siempre.",
+            self.muestras_por_punto, 1, 50
+        )
+        if not ok:
+            return
+        if cantidad > 1:
+            presupuesto, ok = QtWidgets.QInputDialog.getDouble(
+                self, "Tiempo máximo por punto",
+                "Segundos como máximo para juntar las muestras; al vencer se guarda lo que haya.",
+                self.presupuesto_muestreo, 1.0, 600.0, 1
+            )
+            if not ok:
+                return
+            self.presupuesto_muestreo = presupuesto
+        self.muestras_por_punto = cantidad
+        self.statusBar().showMessage(
+            f"Muestras por punto: {cantidad}" + (f" (máximo {self.presupuesto_muestreo:.0f} s)." if cantidad > 1 else ".")
+        )
+
+    def configurar_estadistico(self):
+        estadistico, ok = QtWidgets.QInputDialog.getItem(
+            self, "Estadístico de señal",
+            "Resumen de las muestras de cada punto que usan los heatmaps y el informe:",
+            motor.ESTADISTICOS, motor.ESTADISTICOS.index(self.estadistico), False
+        )
+        if not ok:
+            return
+        self.estadistico = estadistico
+        if self.overlay is not None:
+            self.reconstruir_overlay()
+            self.refrescar_vista()
+        self.statusBar().showMessage(f"Estadístico de señal: {estadistico}.")
+
     def reset_clicks(self):
+        self.terminar_recorrido(descartar=True)
         if self.original_image:
             self.image = QtGui.QPixmap(self.original_image)
-            self.image_label.setPixmap(self.image)
         self.clicks.clear()
         self.escala_pts.clear()
         self.escala = None
+        self.calibracion = None
+        self.ap_a_mover = None
         self.mediciones.clear()
+        self.pendientes.clear()  # los escaneos en curso se descartan al llegar
+        self.overlay = None
+        self.overlay_ssid = None
+        self.capa_heatmap = None
+        self.capa_cobertura = False
+        self.indice_pendientes = motor.IndiceEspacial(self.mediciones.radio_fusion)
+        self.refrescar_vista()
         self.modo_medicion = False
         self.modo_ap = False
+
+        # El journal arranca de cero con lo que sobrevive al Clear
+        self.volcar_sesion()
         self.statusBar().showMessage("Todo reseteado. Cargá plano y calibrá escala.")
 
+    def volcar_sesion(self):
+        # Reescribe el journal con el estado actual completo
+        self.journal.reiniciar()
+        if self.ruta_plano:
+            self.journal.registrar(motor.EVENTO_PLANO, ruta=self.ruta_plano)
+        if self.escala:
+            puntos, metros = self.calibracion or (None, None)
+            self.journal.registrar(motor.EVENTO_ESCALA, px_m=self.escala, puntos=puntos, metros=metros)
+        for ap in self.aps_manual:
+            self.journal.registrar(motor.EVENTO_AP, **ap)
+        if self.mediciones.radio_fusion or self.mediciones.politica_duplicados != motor.RECHAZAR:
+            self.journal.registrar(motor.EVENTO_CONFIG_FUSION, radio=self.mediciones.radio_fusion,
+                                   politica=self.mediciones.politica_duplicados)
+        for medicion in self.mediciones:
+            self.journal.registrar(motor.EVENTO_MEDICION, **medicion)
+        self.journal.sincronizar()
+
     def get_click_position(self, event):
         if not self.image:
             return
@@ -124,22 +398,34 @@ class WifiSurveyApp(QtWidgets.QMainWindow):
         x, y = event.pos().x(), event.pos().y()
         painter = QtGui.QPainter(self.image)
 
-        # Modo ubicación de AP (soporte múltiple)
+        # Modo ubicación de AP (soporte múltiple). Un clic sobre un AP ya
+        # ubicado lo elige y el siguiente clic lo mueve
         if self.modo_ap:
+            painter.end()
+            if self.ap_a_mover is not None:
+                self.mover_ap(self.ap_a_mover, x, y)
+                return
+            cercano = self.ap_cercano(x, y)
+            if cercano is not None:
+                self.ap_a_mover = cercano
+                self.statusBar().showMessage(f"AP '{self.aps_manual[cercano]['nombre']}' elegido: hacé clic en su nueva posición.")
+                return
             nombre_ap, ok = QtWidgets.QInputDialog.getText(self, "Nombre del AP", "Identificador del AP:")
             if not ok or not nombre_ap.strip():
                 self.statusBar().showMessage("Ubicación de AP cancelada.")
                 self.modo_ap = False
                 return
-            self.aps_manual.append({"nombre": nombre_ap.strip(), "x_px": x, "y_px": y})
-            painter.setBrush(QtGui.QBrush(QtGui.QColor("blue")))
-            painter.setPen(QtGui.QPen(QtGui.QColor("black")))
-            painter.drawEllipse(QtCore.QPoint(x, y), 8, 8)
-            painter.drawText(x + 10, y, nombre_ap.strip())
+            ap = {"nombre": nombre_ap.strip(), "x_px": x, "y_px": y}
+            self.aps_manual.append(ap)
+            self.journal.registrar(motor.EVENTO_AP, **ap)
+            painter = QtGui.QPainter(self.image)
+            self.dibujar_ap(painter, ap)
+            painter.end()
             self.statusBar().showMessage(f"AP '{nombre_ap}' ubicado en ({x}, {y})")
             self.modo_ap = False
-            painter.end()
-            self.image_label.setPixmap(self.image)
+            if self.capa_cobertura:
+                self.mostrar_cobertura()
+            self.refrescar_vista()
             return
 
 
@@ -153,99 +439,354 @@ class WifiSurveyApp(QtWidgets.QMainWindow):
                 metros, ok = QtWidgets.QInputDialog.getDouble(self, "Distancia real", "¿Cuántos metros hay entre los puntos?", min=0.1)
                 if ok and metros > 0:
                     self.escala = d_pixels / metros
-                    pen_escala = QtGui.QPen(QtGui.QColor("green"))
-                    pen_escala.setWidth(2)
-                    painter.setPen(pen_escala)
-                    painter.drawLine(x1, y1, x2, y2)
-                    painter.drawText(int((x1 + x2) / 2), int((y1 + y2) / 2), f"{metros:.1f} m")
+                    self.calibracion = (list(self.escala_pts), metros)
+                    self.journal.registrar(motor.EVENTO_ESCALA, px_m=self.escala, puntos=self.escala_pts, metros=metros)
+                    self.dibujar_calibracion(painter, self.escala_pts[0], self.escala_pts[1], metros)
                     self.statusBar().showMessage(f"Escala definida: {self.escala:.2f} px/m")
                     self.escala_pts.clear()
+        elif self.recorrido is not None:
+            self.agregar_waypoint(painter, x, y)
         elif self.modo_medicion:   
-            painter.setPen(QtGui.QPen(QtGui.QColor("red"), 5))
-            painter.drawPoint(x, y)
-            painter.drawText(x + 5, y - 5, str(len(self.mediciones)))
-
             x_real = x / self.escala
             y_real = y / self.escala
-            redes = self.escanear_wifi()
-            if redes:
-                coords = (round(x_real, 2), round(y_real, 2))
-                if not any(m["x_m"] == coords[0] and m["y_m"] == coords[1] for m in self.mediciones):
-                    self.mediciones.append({
-                        "x_m": coords[0],
-                        "y_m": coords[1],
-                        "redes": redes
-                    })
-                    self.statusBar().showMessage(f"Medición registrada en ({coords[0]:.2f} m, {coords[1]:.2f} m) con {len(redes)} redes.")
-                else:
-                    self.statusBar().showMessage("Punto duplicado, ignorado.")
+            coords = (round(x_real, 2), round(y_real, 2))
+            # Búsqueda por grilla hash: no depende de la cantidad de puntos
+            cercano = self.mediciones.punto_cercano(*coords)
+            if self.indice_pendientes.cercano(*coords) is not None:
+                self.statusBar().showMessage("Ya hay un escaneo en curso en ese punto, ignorado.")
+            elif cercano is not None and self.mediciones.politica_duplicados == motor.RECHAZAR:
+                self.statusBar().showMessage("Punto duplicado, ignorado.")
             else:
-                self.statusBar().showMessage("No se detectaron redes en este punto.")
+                # Se registra la posición ya y el escaneo corre en segundo plano
+                id_punto = self.proximo_id_punto
+                self.proximo_id_punto += 1
+                self.pendientes[id_punto] = {
+                    "x_m": coords[0],
+                    "y_m": coords[1],
+                    "x_px": x,
+                    "y_px": y,
+                    "numero": cercano if cercano is not None else len(self.mediciones) + self._pendientes_nuevos(),
+                    "fusionar_en": cercano
+                }
+                self.indice_pendientes.agregar(id_punto, *coords)
+                if self.muestras_por_punto > 1:
+                    self.escaner.muestrear(self.escaneo_terminado.emit, id_punto,
+                                           cantidad=self.muestras_por_punto, presupuesto=self.presupuesto_muestreo)
+                    accion = f"Juntando {self.muestras_por_punto} escaneos"
+                else:
+                    self.escaner.solicitar(self.escaneo_terminado.emit, id_punto, max_edad=self.max_edad_escaneo)
+                    accion = "Escaneando"
+                self.statusBar().showMessage(f"{accion} en ({coords[0]:.2f} m, {coords[1]:.2f} m)... {self.escaner.en_cola()} en cola.")
         painter.end()
-        self.image_label.setPixmap(self.image)
+        self.refrescar_vista()
+
+    def registrar_escaneo(self, redes, id_punto):
+        punto = self.pendientes.pop(id_punto, None)
+        if punto is None or not self.image:
+            return  # el punto se descartó (Clear o plano nuevo) mientras se escaneaba
+        self.indice_pendientes.quitar(id_punto)
+
+        if redes and punto["fusionar_en"] is not None:
+            self.mediciones.fusionar_medicion(punto["fusionar_en"], redes)
+            self.journal.registrar(motor.EVENTO_FUSION, punto=punto["fusionar_en"], redes=redes)
+            self.actualizar_overlay(punto["fusionar_en"])
+            self.statusBar().showMessage(f"Escaneo promediado con el punto #{punto['fusionar_en']} ({len(redes)} redes).")
+            self.refrescar_vista()
+            return
 
-    def escanear_wifi(self):
-        try:
-            sistema = platform.system()
-            redes = []
+        x, y = punto["x_px"], punto["y_px"]
+        painter = QtGui.QPainter(self.image)
+        if redes:
+            self.dibujar_punto(painter, x, y, punto["numero"])
+            medicion = motor.crear_medicion(punto["x_m"], punto["y_m"], redes)
+            indice = self.mediciones.append(medicion)
+            self.journal.registrar(motor.EVENTO_MEDICION, **medicion)
+            self.actualizar_overlay(indice)
+            tiempos = motor.resumen_tramos("escaneo")
+            self.statusBar().showMessage(
+                f"Medición registrada en ({punto['x_m']:.2f} m, {punto['y_m']:.2f} m) con {len(redes)} redes."
+                + (f" Escaneo: {tiempos}" if tiempos else "")
+            )
+        else:
+            self.statusBar().showMessage("No se detectaron redes en este punto.")
+        painter.end()
+        self.refrescar_vista()
 
-            if sistema == "Linux":
-                resultado = subprocess.check_output(
-                    ['nmcli', '-f', 'SSID,SIGNAL,BSSID', 'device', 'wifi', 'list'],
-                    encoding='utf-8'
-                )
-                lineas = resultado.strip().split('\n')[1:]
-                for linea in lineas:
-                    partes = [x.strip() for x in linea.split() if x.strip()]
-                    if len(partes) >= 3:
-                        ssid = ' '.join(partes[:-2])
-                        signal = partes[-2]
-                        bssid = partes[-1]
-                        redes.append({'SSID': ssid, 'BSSID': bssid, 'Señal': int(signal), 'Canal': 'N/A'})
-
-            elif sistema == "Windows":
-                resultado = subprocess.check_output(
-                    ['netsh', 'wlan', 'show', 'networks', 'mode=bssid'],
-                    encoding='utf-8',
-                )
-                lineas = resultado.splitlines()
-                ssid = None
-                for i, linea in enumerate(lineas):
-                    linea = linea.strip()
-                    if linea.startswith("SSID") and " : " in linea:
-                        nueva_ssid = linea.split(":", 1)[1].strip()
-                        if nueva_ssid:
-                            ssid = nueva_ssid
-                    elif linea.startswith("BSSID"):
-                        bssid = linea.split(":", 1)[1].strip()
-                        canal = "N/A"
-                        signal = None
-                        for offset in range(1, 10):
-                            if i + offset < len(lineas):
-                                l = lineas[i + offset].strip()
-                                if l.startswith("Canal"):
-                                    canal = l.split(":", 1)[1].strip()
-                                if l.startswith("Señal"):
-                                    try:
-                                        signal = int(l.split(":", 1)[1].strip().replace("%", ""))
-                                    except:
-                                        signal = None
-                                    break
-                        if signal is not None:
-                            redes.append({
-                                'SSID': ssid or "Desconocido",
-                                'BSSID': bssid,
-                                'Señal': signal,
-                                'Canal': canal
-                            })
-            else:
-                redes.append({"error": "Sistema operativo no soportado", "SSID": "Error", "BSSID": "N/A", "Señal": 0, "Canal": "N/A"})
+    def alternar_recorrido(self):
+        if self.recorrido is not None:
+            self.terminar_recorrido()
+            return
+        if not self.image or not self.escala:
+            QtWidgets.QMessageBox.warning(self, "Sin escala", "Cargá un plano y calibrá la escala antes del recorrido.")
+            return
+        self.modo_medicion = False
+        self.modo_ap = False
+        self.recorrido = motor.Recorrido()
+        self.suscripcion_recorrido = self.escaner.suscribir(self.escaneo_recorrido.emit)
+        self.timer_recorrido.start()
+        self.statusBar().showMessage(
+            "Recorrido continuo: hacé clic en cada punto de paso al pasar por él. "
+            "Volvé a elegir la opción del menú para terminar."
+        )
+
+    def agregar_waypoint(self, painter, x, y):
+        # Se marca el momento del clic; los escaneos entre dos clics se
+        # reparten sobre el segmento que los une
+        x_m, y_m = round(x / self.escala, 2), round(y / self.escala, 2)
+        if self.recorrido.waypoints:
+            _, x0, y0 = self.recorrido.waypoints[-1]
+            painter.setPen(QtGui.QPen(QtGui.QColor("blue"), 1, QtCore.Qt.DashLine))
+            painter.drawLine(int(round(x0 * self.escala)), int(round(y0 * self.escala)), x, y)
+        painter.setPen(QtGui.QPen(QtGui.QColor("blue"), 2))
+        painter.drawRect(x - 4, y - 4, 8, 8)
+        self.recorrido.agregar_waypoint(time.monotonic(), x_m, y_m)
+        self.mostrar_estado_recorrido()
+
+    def recibir_escaneo_recorrido(self, redes, momento):
+        if self.recorrido is not None:
+            self.recorrido.agregar_escaneo(momento, redes)
+
+    def volcar_recorrido(self, final=False):
+        # Los escaneos que ya tienen posición entran al almacén en un solo
+        # lote; el dibujo y el heatmap en vivo se actualizan una vez por lote
+        if self.recorrido is None:
+            return
+        i0, nuevas, fusiones = self.recorrido.vaciar(self.mediciones, final)
+        if nuevas or fusiones:
+            # Las fusiones van después: pueden apuntar a puntos de este lote
+            for medicion in nuevas:
+                self.journal.registrar(motor.EVENTO_MEDICION, **medicion)
+            for punto, redes in fusiones:
+                self.journal.registrar(motor.EVENTO_FUSION, punto=punto, redes=redes)
+            painter = QtGui.QPainter(self.image)
+            self.dibujar_mediciones(painter, i0, etiquetas=False)
+            painter.end()
+            if self.overlay is not None:
+                puntos, valores = motor.valores_por_punto(self.mediciones, self.overlay_ssid, estadistico=self.estadistico)
+                nuevos = (puntos >= i0) | np.isin(puntos, [punto for punto, _ in fusiones])
+                puntos = puntos[nuevos]
+                self.overlay.actualizar_puntos(puntos.tolist(), self.mediciones.x_m[puntos].tolist(),
+                                               self.mediciones.y_m[puntos].tolist(), valores[nuevos].tolist())
+            self.refrescar_vista()
+        self.mostrar_estado_recorrido()
+
+    def mostrar_estado_recorrido(self):
+        self.statusBar().showMessage(
+            f"Recorrido: {len(self.recorrido.waypoints)} puntos de paso, {self.recorrido.ubicados} mediciones, "
+            f"{self.recorrido.fusionados} promediadas con puntos cercanos, "
+            f"{self.recorrido.pendientes} escaneos esperando el próximo punto de paso."
+        )
 
-            return redes
+    def terminar_recorrido(self, descartar=False):
+        if self.recorrido is None:
+            return
+        self.escaner.desuscribir(self.suscripcion_recorrido)
+        self.timer_recorrido.stop()
+        if not descartar:
+            self.volcar_recorrido(final=True)
+        recorrido, self.recorrido = self.recorrido, None
+        self.suscripcion_recorrido = None
+        self.statusBar().showMessage(
+            f"Recorrido terminado: {recorrido.ubicados} mediciones en {len(recorrido.waypoints)} puntos de paso, "
+            f"{recorrido.fusionados} promediadas con puntos cercanos "
+            f"({recorrido.descartados} escaneos descartados fuera del camino, con error o duplicados)."
+        )
 
-        except Exception as e:
-            return [{"error": str(e), "SSID": "Error", "BSSID": "N/A", "Señal": 0, "Canal": "N/A"}]
+    def dibujar_punto(self, painter, x, y, numero):
+        painter.setPen(QtGui.QPen(QtGui.QColor("red"), 5))
+        painter.drawPoint(x, y)
+        painter.drawText(x + 5, y - 5, str(numero))
+
+    def dibujar_mediciones(self, painter, desde=0, etiquetas=True):
+        x_px = np.rint(self.mediciones.x_m[desde:] * self.escala).astype(int).tolist()
+        y_px = np.rint(self.mediciones.y_m[desde:] * self.escala).astype(int).tolist()
+        if not etiquetas:
+            # Puntos del recorrido continuo: son demasiados para numerarlos
+            painter.setPen(QtGui.QPen(QtGui.QColor("red"), 3))
+            painter.drawPoints(QtGui.QPolygon([QtCore.QPoint(x, y) for x, y in zip(x_px, y_px)]))
+            return
+        for i, (x, y) in enumerate(zip(x_px, y_px), desde):
+            self.dibujar_punto(painter, x, y, i)
+
+    def ap_cercano(self, x, y):
+        # Índice del AP a menos de RADIO_SELECCION_AP píxeles del clic, o None
+        distancias = [math.hypot(ap["x_px"] - x, ap["y_px"] - y) for ap in self.aps_manual]
+        if distancias and min(distancias) <= RADIO_SELECCION_AP:
+            return distancias.index(min(distancias))
+        return None
+
+    def mover_ap(self, indice, x, y):
+        ap = self.aps_manual[indice]
+        ap["x_px"], ap["y_px"] = x, y
+        self.journal.registrar(motor.EVENTO_MOVER_AP, indice=indice, x_px=x, y_px=y)
+        self.ap_a_mover = None
+        self.modo_ap = False
+        self.redibujar_plano()
+        mensaje = f"AP '{ap['nombre']}' movido a ({x}, {y})"
+        if self.capa_cobertura:
+            # Sólo se recalculan los rayos del AP movido, el resto está en caché
+            self.mostrar_cobertura()
+            mensaje += f". {motor.resumen_tramos('cobertura')}"
+        self.statusBar().showMessage(mensaje)
+
+    def dibujar_ap(self, painter, ap):
+        painter.setBrush(QtGui.QBrush(QtGui.QColor("blue")))
+        painter.setPen(QtGui.QPen(QtGui.QColor("black")))
+        painter.drawEllipse(QtCore.QPoint(ap["x_px"], ap["y_px"]), 8, 8)
+        painter.drawText(ap["x_px"] + 10, ap["y_px"], ap["nombre"])
+
+    def dibujar_calibracion(self, painter, p1, p2, metros):
+        (x1, y1), (x2, y2) = p1, p2
+        pen_escala = QtGui.QPen(QtGui.QColor("green"))
+        pen_escala.setWidth(2)
+        painter.setPen(pen_escala)
+        painter.drawLine(x1, y1, x2, y2)
+        painter.drawText(int((x1 + x2) / 2), int((y1 + y2) / 2), f"{metros:.1f} m")
+
+    def _pendientes_nuevos(self):
+        return sum(1 for p in self.pendientes.values() if p["fusionar_en"] is None)
+
+    def activar_overlay(self):
+        if not self.image or not self.escala:
+            QtWidgets.QMessageBox.warning(self, "Sin escala", "Cargá un plano y calibrá la escala antes de activar el heatmap en vivo.")
+            return
+        opciones = ["Desactivar"] + motor.listar_ssids(self.mediciones)
+        ssid, ok = QtWidgets.QInputDialog.getItem(
+            self, "Heatmap en vivo",
+            "SSID a seguir mientras medís (podés escribir uno que todavía no apareció):",
+            opciones, 1 if len(opciones) > 1 else 0, True
+        )
+        if not ok or not ssid.strip():
+            return
+        if ssid == "Desactivar":
+            self.overlay = None
+            self.overlay_ssid = None
+            self.statusBar().showMessage("Heatmap en vivo desactivado.")
+            self.refrescar_vista()
+            return
+
+        self.overlay_ssid = ssid
+        self.reconstruir_overlay()
+        self.statusBar().showMessage(f"Heatmap en vivo de '{ssid}' con {len(self.overlay)} puntos.")
+        self.refrescar_vista()
+
+    def reconstruir_overlay(self):
+        self.overlay = motor.HeatmapIncremental(self.image.width(), self.image.height(), self.escala)
+        puntos, valores = motor.valores_por_punto(self.mediciones, self.overlay_ssid, estadistico=self.estadistico)
+        for i, valor in zip(puntos, valores):
+            self.overlay.actualizar_punto(int(i), self.mediciones.x_m[i], self.mediciones.y_m[i], valor)
+
+    def actualizar_overlay(self, indice):
+        # Sólo se reinterpolan las celdas alrededor del punto nuevo
+        if self.overlay is None:
+            return
+        valor = motor.valor_en_punto(self.mediciones, indice, self.overlay_ssid, estadistico=self.estadistico)
+        if valor is not None:
+            self.overlay.actualizar_punto(indice, self.mediciones.x_m[indice], self.mediciones.y_m[indice], valor)
+
+    def refrescar_vista(self):
+        if not self.image:
+            return
+        if not self.pendientes and self.overlay is None and self.capa_heatmap is None:
+            self.image_label.setPixmap(self.image)
+            return
+
+        # El overlay y los puntos pendientes se dibujan sobre una copia para
+        # no ensuciar el plano con marcas que después cambian
+        vista = QtGui.QPixmap(self.image)
+        painter = QtGui.QPainter(vista)
+        painter.setRenderHint(QtGui.QPainter.Antialiasing)
+        if self.capa_heatmap is not None:
+            imagen, destino, _ = self.capa_heatmap
+            painter.setRenderHint(QtGui.QPainter.SmoothPixmapTransform)
+            painter.drawImage(destino, imagen)
+        if self.overlay is not None:
+            rgba = self.overlay.rgba
+            overlay_img = QtGui.QImage(rgba.data, rgba.shape[1], rgba.shape[0], rgba.strides[0], QtGui.QImage.Format_RGBA8888)
+            painter.setRenderHint(QtGui.QPainter.SmoothPixmapTransform)
+            destino = QtCore.QRect(0, 0, rgba.shape[1] * self.overlay.celda_px, rgba.shape[0] * self.overlay.celda_px)
+            painter.drawImage(destino, overlay_img)
+        painter.setPen(QtGui.QPen(QtGui.QColor("orange"), 2))
+        for punto in self.pendientes.values():
+            painter.drawEllipse(QtCore.QPoint(punto["x_px"], punto["y_px"]), 5, 5)
+            painter.drawText(punto["x_px"] + 7, punto["y_px"] - 5, f"{punto['numero']} …")
+        painter.end()
+        self.image_label.setPixmap(vista)
+
+    def alternar_perfilado(self):
+        if not motor.perfilado_activo():
+            motor.activar_perfilado()
+            self.statusBar().showMessage(
+                "Perfilado activado: usá la aplicación normalmente y volvé a elegir la opción para exportarlo."
+            )
+            return
+        ruta, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self, "Exportar perfilado", "perfil_wifi_survey.prof", "Perfil de cProfile (*.prof)"
+        )
+        if not ruta:
+            return  # sigue perfilando
+        rutas = motor.volcar_perfil(ruta[:-len(".prof")] if ruta.endswith(".prof") else ruta)
+        self.statusBar().showMessage(f"Perfilado exportado: {rutas[0]} y {rutas[1]}")
+
+    def closeEvent(self, event):
+        if PERFIL_SESION and motor.perfilado_activo():
+            motor.volcar_perfil(PERFIL_SESION)
+        self.terminar_recorrido()
+        self.escaner.cerrar()
+        self.journal.cerrar()
+        super().closeEvent(event)
+
+    def cargar_survey(self):
+        # Retoma un survey exportado sobre el plano actual: los puntos se
+        # ubican con la escala calibrada ahora
+        if not self.image or not self.escala:
+            QtWidgets.QMessageBox.warning(self, "Sin escala", "Cargá el plano y calibrá la escala antes de cargar un survey.")
+            return
+        file_name, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Cargar survey", "", "JSON (*.json)")
+        if not file_name:
+            return
 
+        reemplazar = False
+        if self.mediciones:
+            opciones = ["Agregar a las mediciones actuales", "Reemplazar las mediciones actuales"]
+            accion, ok = QtWidgets.QInputDialog.getItem(
+                self, "Cargar survey", f"Ya hay {len(self.mediciones)} mediciones:", opciones, 0, False
+            )
+            if not ok:
+                return
+            reemplazar = accion == opciones[1]
+
+        # Se carga la copia archivada junto al journal (lo que se recupera
+        # es exactamente esto) en un almacén aparte; las mediciones actuales
+        # se tocan sólo si el archivo se leyó entero
+        try:
+            copia, huella = self.journal.archivar_survey(file_name)
+            nuevo = motor.leer_survey(copia)
+        except (OSError, ValueError) as e:
+            QtWidgets.QMessageBox.critical(self, "Error al cargar survey", str(e))
+            return
+
+        previas = len(self.mediciones)
+        if reemplazar:
+            self.mediciones.clear()
+            self.pendientes.clear()
+            self.indice_pendientes = motor.IndiceEspacial(self.mediciones.radio_fusion)
+            previas = 0
+        self.mediciones.agregar_almacen(nuevo)
+        self.journal.registrar(motor.EVENTO_SURVEY, origen=os.path.abspath(file_name), copia=copia, huella=huella,
+                               reemplazar=reemplazar)
+
+        if reemplazar:
+            self.redibujar_plano()
+        else:
+            painter = QtGui.QPainter(self.image)
+            self.dibujar_mediciones(painter, previas)
+            painter.end()
+        if self.overlay is not None:
+            self.reconstruir_overlay()
+        self.capa_heatmap = None
+        self.refrescar_vista()
+        self.statusBar().showMessage(f"Survey cargado: {len(self.mediciones) - previas} mediciones de {file_name}")
 
     def exportar_informe(self):
         if not self.mediciones:
@@ -253,8 +794,7 @@ class WifiSurveyApp(QtWidgets.QMainWindow):
             return
         file_name, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Guardar informe", "mediciones.json", "JSON (*.json)")
         if file_name:
-            with open(file_name, 'w') as f:
-                json.dump(self.mediciones, f, indent=2)
+            motor.guardar_mediciones(self.mediciones, file_name)
             self.statusBar().showMessage(f"Informe exportado: {file_name}")
 
     def ver_heatmap_por_ssid(self):
@@ -262,12 +802,7 @@ class WifiSurveyApp(QtWidgets.QMainWindow):
             QtWidgets.QMessageBox.warning(self, "Sin datos", "No hay mediciones para graficar.")
             return
 
-        ssids = set()
-        for punto in self.mediciones:
-            for r in punto["redes"]:
-                if "SSID" in r and r["SSID"].strip():
-                    ssids.add(r["SSID"])
-        ssids = sorted(ssids)
+        ssids = motor.listar_ssids(self.mediciones)
 
         if not ssids:
             QtWidgets.QMessageBox.warning(self, "Sin SSIDs", "No se encontraron SSIDs.")
@@ -288,19 +823,14 @@ class WifiSurveyApp(QtWidgets.QMainWindow):
         modo, ok = QtWidgets.QInputDialog.getItem(
             self, "Modo de análisis",
             "¿Qué querés visualizar?",
-            ["Señal (dBm)", "Señal/Ruido (SNR)", "Interferencia estimada"],
+            motor.MODOS_ANALISIS,
             0, False
         )
         if not ok:
             return
 
         # Recolectar BSSIDs asociados a ese SSID
-        bssids = set()
-        for punto in self.mediciones:
-            for r in punto["redes"]:
-                if r.get("SSID") == ssid and r.get("BSSID"):
-                    bssids.add(r["BSSID"])
-        bssids = sorted(bssids)
+        bssids = motor.listar_bssids(self.mediciones, ssid)
 
         # Preguntar si se quiere analizar todos o uno solo
         todos_o_uno, ok = QtWidgets.QInputDialog.getItem(
@@ -320,185 +850,221 @@ class WifiSurveyApp(QtWidgets.QMainWindow):
             if not ok or not bssid_seleccionado:
                 return
 
-        x, y, señal = [], [], []
-        for punto in self.mediciones:
-            señales = []
-            if modo == "Interferencia estimada":
-                # Contar redes distintas al SSID seleccionado
-                valor = len([r for r in punto["redes"] if r.get("SSID") != ssid])
-                señales = [valor]
-            else:
-                for r in punto["redes"]:
-                    if r.get("SSID") == ssid and (
-                        not bssid_seleccionado or r.get("BSSID") == bssid_seleccionado
-                    ):
-
-                        valor = (r["Señal"] / 2) - 100  # dBm
-                        if modo == "Señal/Ruido (SNR)":
-                            ruido_estimado = -95
-                            valor = valor - ruido_estimado
-                        señales.append(valor)
-
-            if señales:
-                x.append(punto["x_m"])
-                y.append(punto["y_m"])
-                señal.append(sum(señales) / len(señales))
-
-
-        if len(x) < 3:
-            QtWidgets.QMessageBox.warning(self, "Datos insuficientes", f"No hay suficientes puntos para {ssid}.")
+        # La interpolación se reutiliza mientras no cambien las mediciones del SSID
+        interpolado = tipo_mapa == "Interpolado (suavizado)"
+        motor.limpiar_tramos("heatmap")
+        try:
+            grid_x, grid_y, grid_z = motor.heatmap_ssid(
+                self.mediciones, ssid, modo, bssid_seleccionado,
+                motor.TIPO_INTERPOLADO if interpolado else motor.TIPO_CELDAS,
+                self.image.width() / self.escala, self.image.height() / self.escala,
+                cache=self.cache_heatmaps, estadistico=self.estadistico
+            )
+        except motor.DatosInsuficientes as e:
+            QtWidgets.QMessageBox.warning(self, "Datos insuficientes", str(e))
+            return
+        except Exception as e:
+            tipo_texto = "interpolado" if interpolado else "por celdas"
+            QtWidgets.QMessageBox.warning(self, "Error", f"No se pudo crear el mapa {tipo_texto}: {str(e)}")
             return
 
-        xi = np.linspace(0, self.image.width() / self.escala, 200)
-        yi = np.linspace(0, self.image.height() / self.escala, 200)
-        xi, yi = np.meshgrid(xi, yi)
-        
-        # Convertir QPixmap a QImage y luego a array numpy
-        qimage = self.original_image.toImage().convertToFormat(QtGui.QImage.Format_RGBA8888)
-        width = qimage.width()
-        height = qimage.height()
-        ptr = qimage.bits()
-        ptr.setsize(qimage.byteCount())
-        arr = np.array(ptr).reshape((height, width, 4))
-        arr = np.flipud(arr)  # Invertir eje Y
-        img = arr / 255.0  # Normalizar a [0, 1]
-
-        plt.figure(figsize=(8, 6))
-
-        # Mostrar cobertura según tipo seleccionado
-        if tipo_mapa == "Interpolado (suavizado)":
-            try:
-                # Interpolación primero
-                zi = griddata((x, y), señal, (xi, yi), method='cubic')
-                # Verificar si la interpolación funcionó correctamente
-                if zi is None or np.all(np.isnan(zi)):
-                    raise ValueError("No se pudo interpolar correctamente.")
-                
-                zi = np.nan_to_num(zi, nan=-100)
-
-                # Mostrar fondo del plano
-                plt.imshow(
-                    img[:, :, :3],
-                    extent=[0, self.image.width() / self.escala, 0, self.image.height() / self.escala],
-                    interpolation='bilinear',
-                    origin='lower',
-                    zorder=0,
-                    alpha=0.5
-                )
+        # Se pinta directo sobre el plano con la LUT de colores
+        vmin, vmax = motor.rango_modo(modo, grid_z)
+        with motor.tramo("heatmap.colorear"):
+            rgba = motor.colorear(grid_z, vmin, vmax, fuera_de_rango_transparente=True)
+        with motor.tramo("heatmap.vista"):
+            self.mostrar_capa(rgba, QtCore.QRectF(
+                grid_x[0, 0] * self.escala, grid_y[0, 0] * self.escala,
+                (grid_x[0, -1] - grid_x[0, 0]) * self.escala, (grid_y[-1, 0] - grid_y[0, 0]) * self.escala
+            ))
+        self.statusBar().showMessage(f"Heatmap de '{ssid}' ({modo}) sobre el plano. {motor.resumen_tramos('heatmap')}")
+
+        if not interpolado:
+            return
 
-                # Mostrar interpolación sobre fondo
-                plt.contourf(xi, yi, zi, levels=np.linspace(-90, -30, 100), cmap="jet", alpha=0.6)
+        # Guardado opcional como figura con ejes y barra de colores
+        nombre_archivo = f"heatmap_{ssid.replace(' ', '_')}_interpolado.png"
+        ruta_guardado = QtWidgets.QFileDialog.getSaveFileName(self, "Guardar heatmap interpolado", nombre_archivo, "Imágenes (*.png)")[0]
+        if not ruta_guardado:
+            return
+        try:
+            with motor.tramo("heatmap.figura"):
+                fig = plt.figure(figsize=(8, 6))
+                self.dibujar_fondo_figura(quitar_alfa=True)
+                plt.contourf(grid_x, grid_y, grid_z, levels=np.linspace(vmin, vmax, 100), cmap="jet", alpha=0.6)
 
                 # Barra de colores
-                sm = plt.cm.ScalarMappable(cmap="jet", norm=plt.Normalize(vmin=-90, vmax=-30))
+                sm = plt.cm.ScalarMappable(cmap="jet", norm=plt.Normalize(vmin=vmin, vmax=vmax))
                 sm.set_array([])
                 cbar = plt.colorbar(sm, ax=plt.gca())
-                cbar.set_label("Señal estimada (dBm)")
-
-                # Guardado automático
-                nombre_archivo = f"heatmap_{ssid.replace(' ', '_')}_interpolado.png"
-                ruta_guardado = QtWidgets.QFileDialog.getSaveFileName(self, "Guardar heatmap interpolado", nombre_archivo, "Imágenes (*.png)")[0]
-                if ruta_guardado:
-                    plt.savefig(ruta_guardado)
-                    self.statusBar().showMessage(f"Imagen guardada: {ruta_guardado}")
-
-            except Exception as e:
-                QtWidgets.QMessageBox.warning(self, "Error", f"No se pudo crear el mapa interpolado: {str(e)}")
-                return
+                cbar.set_label("Señal estimada (dBm)" if modo == motor.MODO_SEÑAL else modo)
+
+                self.dibujar_aps_figura()
+                plt.tight_layout()
+            with motor.tramo("heatmap.savefig"):
+                fig.savefig(ruta_guardado)
+            plt.close(fig)
+            self.statusBar().showMessage(f"Imagen guardada: {ruta_guardado}. {motor.resumen_tramos('heatmap')}")
+        except Exception as e:
+            QtWidgets.QMessageBox.warning(self, "Error", f"No se pudo guardar el mapa interpolado: {str(e)}")
 
-        else:
-            # Visualización por celdas reales estilo FSPL con fondo
-            plt.imshow(
-                img,
-                extent=[0, self.image.width() / self.escala, 0, self.image.height() / self.escala],
-                interpolation='bilinear',
-                origin='lower',
-                alpha=0.5,
-                zorder=0
-            )
+    def ver_cobertura_estimada(self):
+        if not self.aps_manual:
+            QtWidgets.QMessageBox.warning(self, "Sin APs", "No hay APs definidos para proyectar cobertura.")
+            return
+        if not self.escala:
+            QtWidgets.QMessageBox.warning(self, "Sin escala", "Primero calibrá la escala para poder calcular distancias.")
+            return
 
-            # Generar grilla
-            grid_x = np.linspace(min(x), max(x), 100)
-            grid_y = np.linspace(min(y), max(y), 100)
-            grid_x, grid_y = np.meshgrid(grid_x, grid_y)
+        x_px, y_px, paso, RSSI = self.mostrar_cobertura()
+        vmin, vmax = motor.RSSI_PISO, motor.TX_POWER
+        self.statusBar().showMessage(
+            f"Cobertura estimada desde los APs ({self.nombre_modelo_cobertura()}) sobre el plano. "
+            f"{motor.resumen_tramos('cobertura')}"
+        )
 
-            try:
-                # Interpolación estilo "nearest" para mapa tipo celdas
-                grid_z = griddata((x, y), señal, (grid_x, grid_y), method='linear')
-                if grid_z is None or np.all(np.isnan(grid_z)):
-                    raise ValueError("No se pudo interpolar correctamente.")
-                
-                grid_z = np.nan_to_num(grid_z, nan=-100)
+        guardar, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Guardar cobertura estimada", "cobertura_estimada.png", "Imágenes (*.png)")
+        if not guardar:
+            return
 
-                # Mostrar mapa
-                plt.contourf(grid_x, grid_y, grid_z, levels=np.linspace(-90, -30, 100), cmap="jet", alpha=0.6, zorder=1)
+        with motor.tramo("cobertura.figura"):
+            fig = plt.figure(figsize=(8, 6))
+            self.dibujar_fondo_figura()
 
-                sm = plt.cm.ScalarMappable(cmap="jet", norm=plt.Normalize(vmin=-90, vmax=-30))
-                sm.set_array([])
-                cbar = plt.colorbar(sm, ax=plt.gca())
-                cbar.set_label("Señal estimada por punto (dBm)")
-            except Exception as e:
-                QtWidgets.QMessageBox.warning(self, "Error", f"No se pudo crear el mapa por celdas: {str(e)}")
+            # Superponer el heatmap (imshow: contourf a resolución completa es lento)
+            plt.imshow(
+                RSSI,
+                extent=[0, len(x_px) * paso / self.escala, 0, len(y_px) * paso / self.escala],
+                origin='lower', cmap="jet", vmin=vmin, vmax=vmax, alpha=0.6, interpolation='bilinear'
+            )
+            plt.colorbar(label="Señal estimada (dBm)")
+
+            self.dibujar_aps_figura()
+            plt.title(f"Cobertura estimada desde los APs ({self.nombre_modelo_cobertura()})")
+            plt.xlabel("X (m)")
+            plt.ylabel("Y (m)")
+            plt.tight_layout()
+        with motor.tramo("cobertura.savefig"):
+            fig.savefig(guardar)
+        plt.close(fig)
+        self.statusBar().showMessage(f"Imagen guardada: {guardar}. {motor.resumen_tramos('cobertura')}")
+
+    def mostrar_cobertura(self):
+        # Cálculo por tiles con buffers float32 reutilizados, a resolución
+        # de pantalla (píxel completo salvo en planos muy grandes)
+        paso = max(1, max(self.image.width(), self.image.height()) // RESOLUCION_FONDO)
+        motor.limpiar_tramos("cobertura")
+        x_px, y_px, RSSI = motor.cobertura_fspl(
+            self.aps_manual, self.image.width(), self.image.height(), self.escala, paso=paso,
+            paredes=self.mapa_paredes if self.usar_paredes else None, db_por_pared=self.db_por_pared
+        )
+        with motor.tramo("cobertura.colorear"):
+            rgba = motor.colorear(RSSI, motor.RSSI_PISO, motor.TX_POWER)
+        with motor.tramo("cobertura.vista"):
+            self.mostrar_capa(rgba, QtCore.QRectF(0, 0, len(x_px) * paso, len(y_px) * paso))
+        self.capa_cobertura = True
+        return x_px, y_px, paso, RSSI
+
+    def nombre_modelo_cobertura(self):
+        if self.usar_paredes and self.mapa_paredes is not None:
+            return f"modelo FSPL + {self.db_por_pared:g} dB por pared"
+        return "modelo FSPL"
+
+    def configurar_paredes(self):
+        if self.mapa_paredes is None:
+            QtWidgets.QMessageBox.warning(self, "Sin plano", "Primero cargá un plano.")
+            return
+        opciones = ["Sin paredes (sólo distancia)", "Con paredes detectadas en el plano"]
+        elegido, ok = QtWidgets.QInputDialog.getItem(
+            self, "Atenuación por paredes",
+            f"Paredes detectadas en el {self.mapa_paredes.fraccion_paredes:.0%} del plano.\n"
+            "Elegí el modelo de la cobertura estimada:",
+            opciones, 1 if self.usar_paredes else 0, False
+        )
+        if not ok:
+            return
+        usar = elegido == opciones[1]
+        if usar:
+            db, ok = QtWidgets.QInputDialog.getDouble(
+                self, "Atenuación por paredes",
+                "Pérdida por pared (dB):\n(yeso ~3-5, ladrillo ~8-12, concreto ~15 o más)",
+                self.db_por_pared, 0.0, 60.0, 1
+            )
+            if not ok:
                 return
+            self.db_por_pared = db
+        self.usar_paredes = usar
+        if self.capa_cobertura and self.aps_manual and self.escala:
+            self.mostrar_cobertura()
+        self.statusBar().showMessage(f"Cobertura estimada: {self.nombre_modelo_cobertura()}.")
 
-        # Dibujar APs si los hay
-        if self.aps_manual and self.escala:
-            for ap in self.aps_manual:
-                ap_x = ap["x_px"] / self.escala
-                ap_y = ap["y_px"] / self.escala
-                plt.plot(ap_x, ap_y, marker='o', color='blue', markersize=10)
-                plt.text(ap_x + 0.2, ap_y, ap["nombre"], color='blue', fontsize=9)
-
-        plt.tight_layout()
-        plt.show()
-
-
-    def ver_cobertura_estimada(self):
-        if not self.aps_manual:
-            QtWidgets.QMessageBox.warning(self, "Sin APs", "No hay APs definidos para proyectar cobertura.")
+    def optimizar_ubicacion_aps(self):
+        if not self.image:
+            QtWidgets.QMessageBox.warning(self, "Sin plano", "Primero cargá un plano.")
             return
         if not self.escala:
             QtWidgets.QMessageBox.warning(self, "Sin escala", "Primero calibrá la escala para poder calcular distancias.")
             return
+        objetivo, ok = QtWidgets.QInputDialog.getDouble(
+            self, "Ubicar APs automáticamente", "RSSI objetivo en todo el plano (dBm):",
+            motor.RSSI_OBJETIVO, -95.0, -30.0, 0
+        )
+        if not ok:
+            return
+        max_aps, ok = QtWidgets.QInputDialog.getInt(
+            self, "Ubicar APs automáticamente", "Cantidad máxima de APs nuevos:", 10, 1, 200
+        )
+        if not ok:
+            return
 
-        ancho_px = self.image.width()
-        alto_px = self.image.height()
-
-        # Generar grilla en píxeles
-        paso = 10  # resolución del mapa
-        x_px = np.arange(0, ancho_px, paso)
-        y_px = np.arange(0, alto_px, paso)
-        x_px_grid, y_px_grid = np.meshgrid(x_px, y_px)
+        # Los APs ya ubicados se respetan y cuentan para la cobertura
+        fijos = [(ap["x_px"] / self.escala, ap["y_px"] / self.escala) for ap in self.aps_manual]
+        motor.limpiar_tramos("optimizacion")
+        QtWidgets.QApplication.setOverrideCursor(QtCore.Qt.WaitCursor)
+        try:
+            # El mismo modelo que la cobertura estimada que se muestra después
+            if self.usar_paredes and self.mapa_paredes is not None:
+                modelo = motor.ModeloConParedes(self.mapa_paredes, self.escala, self.db_por_pared)
+            else:
+                modelo = motor.rssi_fspl
+            resultado = motor.optimizar_aps(
+                self.image.width(), self.image.height(), self.escala, max_aps,
+                rssi_objetivo=objetivo, fijos=fijos, modelo=modelo
+            )
+        except Exception as e:
+            QtWidgets.QMessageBox.warning(self, "Error", f"No se pudo optimizar la ubicación: {str(e)}")
+            return
+        finally:
+            QtWidgets.QApplication.restoreOverrideCursor()
 
-        # Calcular RSSI estimado por celda (en base a distancia a AP más cercano)
-        RSSI = np.full_like(x_px_grid, -100.0, dtype=float)
-        TX_POWER = -30  # dBm asumido cerca del AP
+        nombres = {ap["nombre"] for ap in self.aps_manual}
+        numero = 1
+        painter = QtGui.QPainter(self.image)
+        for x_m, y_m in resultado["aps"]:
+            while f"AUTO-{numero}" in nombres:
+                numero += 1
+            ap = {"nombre": f"AUTO-{numero}", "x_px": int(round(x_m * self.escala)), "y_px": int(round(y_m * self.escala))}
+            nombres.add(ap["nombre"])
+            self.aps_manual.append(ap)
+            self.journal.registrar(motor.EVENTO_AP, **ap)
+            self.dibujar_ap(painter, ap)
+        painter.end()
+        self.refrescar_vista()
+
+        QtWidgets.QMessageBox.information(
+            self, "Ubicación de APs",
+            f"Se agregaron {len(resultado['aps'])} APs. Cobertura a {resultado['rssi_objetivo']} dBm o más: "
+            f"{resultado['cobertura']:.1%} del plano (grilla de {resultado['celda_m']:.1f} m, "
+            f"{self.nombre_modelo_cobertura()}).\n\n"
+            f"{motor.resumen_tramos('optimizacion')}"
+        )
+        self.ver_cobertura_estimada()
 
-        for ap in self.aps_manual:
-            ap_x = ap["x_px"]
-            ap_y = ap["y_px"]
-            dx = (x_px_grid - ap_x) / self.escala  # en metros
-            dy = (y_px_grid - ap_y) / self.escala  # en metros
-            dist = np.sqrt(dx**2 + dy**2)
-            dist[dist < 1] = 1  # evitar log(0)
-
-            rssi_ap = TX_POWER - 20 * np.log10(dist)
-            RSSI = np.maximum(RSSI, rssi_ap)  # tomamos el mejor (mayor dBm)
-
-        # Graficar
-        plt.figure(figsize=(8, 6))
-        
-        # Mostrar plano de fondo
-        qimage = self.original_image.toImage().convertToFormat(QtGui.QImage.Format_RGBA8888)
-        width = qimage.width()
-        height = qimage.height()
-        ptr = qimage.bits()
-        ptr.setsize(qimage.byteCount())
-        arr = np.array(ptr).reshape((height, width, 4))
-        arr = np.flipud(arr)  # Invertir eje Y
-        img = arr / 255.0
+    def dibujar_fondo_figura(self, quitar_alfa=False):
+        # Fondo desde el raster cacheado del plano
+        img = self.fondo_para_grafico()
         plt.imshow(
-            img,
+            img[:, :, :3] if quitar_alfa else img,
             extent=[0, self.image.width() / self.escala, 0, self.image.height() / self.escala],
             interpolation='bilinear',
             origin='lower',
@@ -506,107 +1072,27 @@ class WifiSurveyApp(QtWidgets.QMainWindow):
             alpha=0.5
         )
 
-        # Superponer el heatmap
-        plt.contourf(x_px_grid / self.escala, y_px_grid / self.escala, RSSI, levels=100, cmap="jet", alpha=0.6)
-
-        plt.colorbar(label="Señal estimada (dBm)")
-
-        # Marcar APs
+    def dibujar_aps_figura(self):
+        # Dibujar APs si los hay
         for ap in self.aps_manual:
-            ap_x_m = ap["x_px"] / self.escala
-            ap_y_m = ap["y_px"] / self.escala
-            plt.plot(ap_x_m, ap_y_m, marker='o', color='blue', markersize=10)
-            plt.text(ap_x_m + 0.2, ap_y_m, ap["nombre"], color='blue', fontsize=9)
-
-        plt.title("Cobertura estimada desde los APs (modelo FSPL)")
-        plt.xlabel("X (m)")
-        plt.ylabel("Y (m)")
-        plt.tight_layout()
-        guardar, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Guardar cobertura estimada", "cobertura_estimada.png", "Imágenes (*.png)")
-
-        if guardar:
-            plt.savefig(guardar)
-            self.statusBar().showMessage(f"Imagen guardada: {guardar}")
-
-        plt.show()
-
-    def estimar_velocidad_dbm(self, señal):
-        if señal >= -50:
-            return 400, "Excelente", "802.11ac/n 5GHz"
-        elif señal >= -65:
-            return 100, "Buena", "802.11n/g"
-        elif señal >= -75:
-            return 35, "Regular", "802.11g/b"
-        elif señal >= -85:
-            return 8, "Mala", "802.11b"
-        else:
-            return 0.5, "Crítica", "Sin conexión"
-
-    
-    def generar_graficos_analisis(self):
-        if not self.mediciones:
-            return {}
-
-        # Limpiar archivos temporales anteriores
-        for temp_file in self.temp_files:
-            try:
-                if os.path.exists(temp_file):
-                    os.unlink(temp_file)
-            except:
-                pass
-        self.temp_files = []
-
-        datos_por_ssid = {}
-        for punto in self.mediciones:
-            for red in punto['redes']:
-                ssid = red.get("SSID", "Desconocido")
-                señal = red.get("Señal", 0)
-                señal_dbm = (señal / 2) - 100
-                velocidad, _, _ = self.estimar_velocidad_dbm(señal_dbm)
-
-                if ssid not in datos_por_ssid:
-                    datos_por_ssid[ssid] = {"dbm": [], "vel": []}
-
-                datos_por_ssid[ssid]["dbm"].append(señal_dbm)
-                datos_por_ssid[ssid]["vel"].append(velocidad)
-
-        imagenes = {}
-        for ssid, datos in datos_por_ssid.items():
-            try:
-                fig, ax = plt.subplots(figsize=(6, 4))
-                ax.plot(datos['dbm'], label="Señal (dBm)", marker='o')
-                ax.plot(datos['vel'], label="Velocidad (Mbps)", marker='x')
-                ax.set_title(f"Análisis por SSID: {ssid}")
-                ax.set_xlabel("Punto de Medición")
-                ax.set_ylabel("Valor")
-                ax.legend()
-                ax.grid(True)
-                fig.tight_layout()
-
-                # Crear archivo temporal y recordarlo para eliminar después
-                temp_path = tempfile.NamedTemporaryFile(delete=False, suffix='.png').name
-                self.temp_files.append(temp_path)
-                
-                fig.savefig(temp_path)
-                plt.close(fig)
-
-                imagenes[ssid] = temp_path
-            except Exception as e:
-                print(f"Error al generar gráfico para {ssid}: {str(e)}")
-
-        return imagenes
-
-
-    def clasificar_banda(self, canal):
-        try:
-            canal = int(canal)
-            if 1 <= canal <= 14:
-                return "2.4 GHz"
-            elif 36 <= canal <= 165:
-                return "5 GHz"
-        except:
-            pass
-        return "Desconocido"
+            ap_x = ap["x_px"] / self.escala
+            ap_y = ap["y_px"] / self.escala
+            plt.plot(ap_x, ap_y, marker='o', color='blue', markersize=10)
+            plt.text(ap_x + 0.2, ap_y, ap["nombre"], color='blue', fontsize=9)
+
+    def mostrar_capa(self, rgba, destino):
+        # Capa RGBA (uint8) que se compone sobre el plano en la ventana; el
+        # QImage apunta al array sin copiarlo, así que se guardan ambos
+        rgba = np.ascontiguousarray(rgba)
+        self.capa_cobertura = False
+        imagen = QtGui.QImage(rgba.data, rgba.shape[1], rgba.shape[0], rgba.strides[0], QtGui.QImage.Format_RGBA8888)
+        self.capa_heatmap = (imagen, destino, rgba)
+        self.refrescar_vista()
+
+    def quitar_capa(self):
+        self.capa_heatmap = None
+        self.capa_cobertura = False
+        self.refrescar_vista()
 
     # Método de exportación PDF con imagen y tabla
     def exportar_informe_pdf(self):
@@ -614,152 +1100,43 @@ class WifiSurveyApp(QtWidgets.QMainWindow):
             QtWidgets.QMessageBox.warning(self, "Sin datos", "No hay mediciones para exportar.")
             return
 
+        # Con muchas lecturas el listado red por red se vuelve enorme: se
+        # sugiere el informe resumido
+        opciones = ["Resumido (tablas por SSID y por punto)", "Detallado (todas las redes de cada punto)"]
+        tipo, ok = QtWidgets.QInputDialog.getItem(
+            self, "Tipo de informe", "Elegí el tipo de informe:", opciones,
+            0 if self.mediciones.n_lecturas > LECTURAS_INFORME_DETALLADO else 1, False
+        )
+        if not ok:
+            return
+
         file_name, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Guardar informe PDF", "informe_wifi.pdf", "PDF (*.pdf)")
         if not file_name:
             return
 
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_font("Arial", 'B', 16)
-        pdf.cell(0, 10, "Informe de Site Survey WiFi", ln=True, align="C")
-        pdf.ln(10)
-        pdf.set_font("Arial", size=12)
-
-        # Insertar heatmap si existe - ya no usamos un nombre fijo, sino que generamos uno temporal
-        heatmap_path = None
-        try:
-            # Generar un heatmap temporal para el informe si hay datos
-            if len(self.mediciones) >= 3:
-                # Código para generar un heatmap simplificado para el informe
-                plt.figure(figsize=(8, 4))
-                # Usar el primer SSID con datos suficientes
-                ssids_disponibles = []
-                for punto in self.mediciones:
-                    for red in punto["redes"]:
-                        if "SSID" in red and red["SSID"].strip():
-                            ssids_disponibles.append(red["SSID"])
-                
-                if ssids_disponibles:
-                    ssid_comun = max(set(ssids_disponibles), key=ssids_disponibles.count)
-                    
-                    # Recolectar datos para este SSID
-                    x, y, señal = [], [], []
-                    for punto in self.mediciones:
-                        for r in punto["redes"]:
-                            if r.get("SSID") == ssid_comun:
-                                x.append(punto["x_m"])
-                                y.append(punto["y_m"])
-                                señal.append((r["Señal"] / 2) - 100)  # dBm
-                                break
-                    
-                    if len(x) >= 3:
-                        # Crear un heatmap simple para el informe
-                        heatmap_path = tempfile.NamedTemporaryFile(delete=False, suffix='.png').name
-                        self.temp_files.append(heatmap_path)
-                        
-                        # Generar grilla e interpolar
-                        grid_x = np.linspace(min(x), max(x), 50)
-                        grid_y = np.linspace(min(y), max(y), 50)
-                        grid_x, grid_y = np.meshgrid(grid_x, grid_y)
-                        
-                        try:
-                            grid_z = griddata((x, y), señal, (grid_x, grid_y), method='cubic')
-                            grid_z = np.nan_to_num(grid_z, nan=-100)
-                            
-                            plt.contourf(grid_x, grid_y, grid_z, levels=np.linspace(-90, -30, 20), cmap="jet")
-                            plt.colorbar(label="dBm")
-                            plt.title(f"Mapa de calor de señal - {ssid_comun}")
-                            plt.savefig(heatmap_path)
-                            plt.close()
-                        except:
-                            # Si falla la interpolación, ignoramos
-                            if os.path.exists(heatmap_path):
-                                os.unlink(heatmap_path)
-                            heatmap_path = None
-        except:
-            heatmap_path = None
-
-        # Si tenemos un heatmap, lo añadimos al PDF
-        if heatmap_path and os.path.exists(heatmap_path):
-            pdf.image(heatmap_path, x=10, y=None, w=180)
-            pdf.ln(5)
-
-        total_velocidad = 0
-        total_puntos = 0
-        clasificacion_contador = {"Excelente": 0, "Buena": 0, "Regular": 0, "Mala": 0, "Crítica": 0}
-
-        for i, punto in enumerate(self.mediciones, 1):
-            x, y = punto['x_m'], punto['y_m']
-            pdf.set_font("Arial", 'B', 12)
-            pdf.cell(0, 10, f"Punto #{i} - Coordenadas: ({x} m, {y} m)", ln=True)
-
-            for red in punto['redes']:
-                ssid = red.get("SSID", "N/A")
-                bssid = red.get("BSSID", "N/A")
-                señal = red.get("Señal", 0)
-                canal = red.get("Canal", "N/A")
-                banda = self.clasificar_banda(canal)
-
-                señal_dbm = (señal / 2) - 100
-                velocidad, clasificacion, tecnologia = self.estimar_velocidad_dbm(señal_dbm)
-                pdf.set_font("Arial", size=11)
-                pdf.cell(0, 8,
-                    f"SSID: {ssid} | BSSID: {bssid} | Señal: {señal_dbm:.1f} dBm | "
-                    f"Velocidad: {velocidad} Mbps | {clasificacion} ({tecnologia}) | "
-                    f"Canal: {canal} | Banda: {banda}",
-                    ln=True
+        ruta_anexo = None
+        resumido = tipo == opciones[0]
+        if resumido:
+            respuesta = QtWidgets.QMessageBox.question(
+                self, "Anexo de lecturas", "¿Guardar también el listado completo de lecturas en un CSV aparte?"
+            )
+            if respuesta == QtWidgets.QMessageBox.Yes:
+                ruta_anexo, _ = QtWidgets.QFileDialog.getSaveFileName(
+                    self, "Guardar anexo", file_name.rsplit(".", 1)[0] + "_lecturas.csv", "CSV (*.csv)"
                 )
 
-                total_velocidad += velocidad
-                total_puntos += 1
-                clasificacion_contador[clasificacion] += 1
-            pdf.ln(4)
-
-        if total_puntos:
-            velocidad_prom = total_velocidad / total_puntos
-            pdf.set_font("Arial", 'B', 12)
-            pdf.cell(0, 10, f"Velocidad promedio estimada: {velocidad_prom:.2f} Mbps", ln=True)
-            for clas, count in clasificacion_contador.items():
-                porcentaje = (count / total_puntos) * 100
-                pdf.cell(0, 8, f"{clas}: {count} puntos ({porcentaje:.1f}%)", ln=True)
-
-        pdf.add_page()
-        pdf.set_font("Arial", 'B', 14)
-        pdf.cell(0, 10, "Tabla de referencia de velocidad estimada", ln=True)
-        pdf.set_font("Arial", size=11)
-        pdf.cell(0, 8, "Señal (dBm) | Estimación | Tecnología | Velocidad estimada", ln=True)
-        pdf.cell(0, 8, "-30 a -50    | Excelente  | 802.11ac/n 5GHz | 200-600 Mbps", ln=True)
-        pdf.cell(0, 8, "-51 a -65    | Buena      | 802.11n/g       | 50-150 Mbps", ln=True)
-        pdf.cell(0, 8, "-66 a -75    | Regular    | 802.11g/b       | 20-50 Mbps", ln=True)
-        pdf.cell(0, 8, "-76 a -85    | Mala       | 802.11b         | 1-11 Mbps", ln=True)
-        pdf.cell(0, 8, "< -85        | Crítica    | Sin conexión    | 0-1 Mbps", ln=True)
-
+        motor.limpiar_tramos("informe")
         try:
-            # Insertar gráficos por SSID
-            imagenes = self.generar_graficos_analisis()
-            for ssid, img_path in imagenes.items():
-                if os.path.exists(img_path):
-                    pdf.add_page()
-                    pdf.set_font("Arial", 'B', 14)
-                    pdf.cell(0, 10, f"Gráfico de Análisis - SSID: {ssid}", ln=True)
-                    pdf.image(img_path, x=10, y=None, w=180)
-            
-            # Guardar el PDF
-            pdf.output(file_name)
-            self.statusBar().showMessage(f"Informe PDF guardado: {file_name}")
-            
-            # Limpiar archivos temporales después de guardar
-            for temp_file in self.temp_files:
-                try:
-                    if os.path.exists(temp_file):
-                        os.unlink(temp_file)
-                except:
-                    pass
-            self.temp_files = []
-            
+            with motor.tramo("informe.total"):
+                if resumido:
+                    motor.construir_informe_resumido(self.mediciones, file_name, ruta_anexo or None,
+                                                     estadistico=self.estadistico)
+                else:
+                    motor.construir_informe_pdf(self.mediciones, file_name, estadistico=self.estadistico)
+            self.statusBar().showMessage(f"Informe PDF guardado: {file_name}. {motor.resumen_tramos('informe')}")
         except Exception as e:
             QtWidgets.QMessageBox.critical(self, "Error al guardar PDF", str(e))
-    
+
 if __name__ == "__main__":
     app = QtWidgets.QApplication(sys.argv)
     window = WifiSurveyApp()